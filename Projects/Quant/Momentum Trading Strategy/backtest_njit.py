@@ -0,0 +1,504 @@
+import math
+import numpy as np
+from numba import njit, prange
+#==========================================================================================================================
+#================== NUMBA BACKTEST KERNEL =================================================================================
+#==========================================================================================================================
+# Bar-by-bar engine behind momentum(). Mirrors the TradeManager rules (trailing stops, signal exits,
+# position health, entries) on struct-of-arrays state so the whole loop runs without touching Python objects.
+# The strategy is long-only, so trades carry no direction field; 'Long' is attached when the log is expanded.
+
+# Active trade fields, one row per field so each field is a contiguous vector over the open positions
+T_ENTRY_PRICE = 0
+T_STOP_LOSS = 1
+T_TAKE_PROFIT = 2
+T_HIGHEST_CLOSE = 3
+T_COMMISSION = 4
+T_POSITION_SIZE = 5
+N_TRADE_FLOAT_FIELDS = 6
+
+T_ENTRY_BAR = 0
+T_SHARES = 1
+T_REMAINING = 2
+T_POSITION_ID = 3
+N_TRADE_INT_FIELDS = 4
+
+# Account state
+A_PORTFOLIO_VALUE = 0
+A_ALLOCATED = 1
+
+# Counters
+C_ACTIVE = 0
+C_POSITION_ID = 1
+C_LOG = 2
+
+# Trade log fields (one row per field, one column per exit record), typed like the trade state:
+# prices and money in a float64 block, bars/shares/codes/flags in an int64 block
+L_ENTRY_PRICE = 0
+L_EXIT_PRICE = 1
+L_PNL = 2
+L_GROSS_PNL = 3
+L_ENTRY_COMMISSION = 4
+L_EXIT_COMMISSION = 5
+N_LOG_FLOAT_FIELDS = 6
+
+L_ENTRY_BAR = 0
+L_EXIT_BAR = 1
+L_SHARES = 2
+L_ORIGINAL_SHARES = 3
+L_DURATION = 4
+L_REASON = 5
+L_POSITION_ID = 6
+L_COMPLETE = 7
+L_REMAINING = 8
+N_LOG_INT_FIELDS = 9
+
+# Exit reason codes stored in the log (index into EXIT_REASONS)
+EXIT_REASONS = ('Trailing Stop', 'Immediate Exit', 'Partial Exit', 'Exit Signal', 'Partial Trim',
+                'Max Duration', 'Profit Take', 'Take Profit', 'Stop Loss')
+R_TRAILING_STOP = 0
+R_IMMEDIATE_EXIT = 1
+R_PARTIAL_EXIT = 2
+R_EXIT_SIGNAL = 3
+R_PARTIAL_TRIM = 4
+R_MAX_DURATION = 5
+R_PROFIT_TAKE = 6
+R_TAKE_PROFIT = 7
+R_STOP_LOSS = 8
+
+# Portfolio profit-take rules by ATR-adjusted momentum score: tier = number of bounds the score exceeds
+# (weak, moderate, strong, very_strong, hyper); a tier trims when the open profit factor reaches its threshold
+PROFIT_TAKE_SCORE_BOUNDS = np.array([30.0, 45.0, 60.0, 75.0])
+PROFIT_TAKE_THRESHOLDS = np.array([0.8, 1.0, 1.2, 1.5, 2.0])
+PROFIT_TAKE_TRIMS = np.array([0.5, 0.3, 0.2, 0.15, 0.1])
+
+# ADX regimes shared by entries and trailing stops: weak (< 20), normal (20-40), strong (> 40)
+ENTRY_ATR_MULTIPLIERS = np.array([1.0, 2.5, 1.5])  # Initial stop distance in ATRs
+ENTRY_RISK_SCALES = np.array([0.5, 1.0, 1.2])      # Fraction of long_risk put on the trade
+TRAILING_ATR_MULTIPLIERS = np.array([1.0, 2.0, 1.5])
+
+@njit(cache=True)
+def _commission(notional, fees):
+    """Commission on a trade's dollar notional: fees = [rate, minimum charge]; all zeros when commission is off"""
+    return max(fees[1], notional * fees[0])
+# --------------------------------------------------------------------------------------------------------------------------
+@njit(cache=True)
+def _adx_regime(adx):
+    """Index into the ADX regime tables (NaN falls through to the strong regime, as the original if/elif did)"""
+    if adx < 20:
+        return 0
+    if adx <= 40:
+        return 1
+    return 2
+# --------------------------------------------------------------------------------------------------------------------------
+@njit(cache=True)
+def _unrealized_pnl(price, tf, ti, n):
+    """Open PnL of the first n active trades (long only)"""
+    total = 0.0
+    for k in range(n):
+        total += (price - tf[T_ENTRY_PRICE, k]) * ti[T_REMAINING, k]
+    return total
+# --------------------------------------------------------------------------------------------------------------------------
+@njit(cache=True)
+def _grow_log(lf, li):
+    """Double the capacity of both trade log blocks"""
+    capacity = lf.shape[1]
+    grown_lf = np.empty((N_LOG_FLOAT_FIELDS, capacity * 2))
+    grown_li = np.empty((N_LOG_INT_FIELDS, capacity * 2), dtype=np.int64)
+    grown_lf[:, :capacity] = lf
+    grown_li[:, :capacity] = li
+    return grown_lf, grown_li
+# --------------------------------------------------------------------------------------------------------------------------
+@njit(cache=True)
+def _exit_pnl(k, snapshot_remaining, bar, days, exit_price, shares_to_exit, reason, tf, ti, lf, li, counters, fees):
+    """Book an exit of shares_to_exit from trade k and append it to the trade log. Returns the net PnL."""
+    entry_price = tf[T_ENTRY_PRICE, k]
+    gross_pnl = (exit_price - entry_price) * shares_to_exit
+    exit_commission = _commission(shares_to_exit * exit_price, fees)
+    pnl_net = gross_pnl - exit_commission
+    is_complete_exit = shares_to_exit >= snapshot_remaining
+
+    row = counters[C_LOG]
+    lf[L_ENTRY_PRICE, row] = entry_price
+    lf[L_EXIT_PRICE, row] = exit_price
+    lf[L_PNL, row] = pnl_net
+    lf[L_GROSS_PNL, row] = gross_pnl
+    lf[L_ENTRY_COMMISSION, row] = tf[T_COMMISSION, k]
+    lf[L_EXIT_COMMISSION, row] = exit_commission
+    li[L_ENTRY_BAR, row] = ti[T_ENTRY_BAR, k]
+    li[L_EXIT_BAR, row] = bar
+    li[L_SHARES, row] = shares_to_exit
+    li[L_ORIGINAL_SHARES, row] = ti[T_SHARES, k]
+    li[L_DURATION, row] = days[bar] - days[ti[T_ENTRY_BAR, k]]
+    li[L_REASON, row] = reason
+    li[L_POSITION_ID, row] = ti[T_POSITION_ID, k]
+    li[L_COMPLETE, row] = 1 if is_complete_exit else 0
+    li[L_REMAINING, row] = 0 if is_complete_exit else snapshot_remaining - shares_to_exit
+    counters[C_LOG] = row + 1
+    return pnl_net
+# --------------------------------------------------------------------------------------------------------------------------
+@njit(cache=True)
+def _process_exits(bar, days, price, trim, reason, tf, ti, acct, lf, li, counters, fees):
+    """Exit (trim > 0: partially trim) every active long trade, then apply take-profit/stop-loss to trimmed trades."""
+    n = counters[C_ACTIVE]
+    if n == 0:
+        return 0.0
+
+    exit_price = price * (1 - 0.001)
+    total_pnl = 0.0
+
+    if trim <= 0.0:
+        # Full exit: every position closes, so the book is emptied without compacting anything
+        for k in range(n):
+            current_shares = ti[T_REMAINING, k]
+            if current_shares > 0:
+                pnl = _exit_pnl(k, current_shares, bar, days, exit_price, current_shares, reason, tf, ti, lf, li, counters, fees)
+                total_pnl += pnl
+                acct[A_PORTFOLIO_VALUE] += pnl
+                acct[A_ALLOCATED] -= exit_price * current_shares
+        counters[C_ACTIVE] = 0
+        return total_pnl
+
+    write = 0  # Survivors of a partial exit are compacted in the same pass, preserving their order
+    for k in range(n):
+        current_shares = ti[T_REMAINING, k]
+        closed = current_shares <= 0
+
+        if not closed:
+            # Partial exit
+            shares_to_exit = int(current_shares * trim)
+            if shares_to_exit > 0:
+                pnl = _exit_pnl(k, current_shares, bar, days, exit_price, shares_to_exit, reason, tf, ti, lf, li, counters, fees)
+                total_pnl += pnl
+                acct[A_PORTFOLIO_VALUE] += pnl
+                acct[A_ALLOCATED] -= exit_price * shares_to_exit
+
+                remaining_shares = current_shares - shares_to_exit
+                if remaining_shares > 0:
+                    ti[T_REMAINING, k] = remaining_shares
+                else:
+                    closed = True
+
+            # Take Profit, then Stop Loss (sized on the shares held when this pass started)
+            exit_reason = -1
+            if not np.isnan(tf[T_TAKE_PROFIT, k]) and exit_price >= tf[T_TAKE_PROFIT, k]:
+                exit_reason = R_TAKE_PROFIT
+            elif exit_price <= tf[T_STOP_LOSS, k]:
+                exit_reason = R_STOP_LOSS
+            if exit_reason >= 0:
+                pnl = _exit_pnl(k, current_shares, bar, days, exit_price, current_shares, exit_reason, tf, ti, lf, li, counters, fees)
+                total_pnl += pnl
+                acct[A_PORTFOLIO_VALUE] += pnl
+                acct[A_ALLOCATED] -= exit_price * current_shares
+                closed = True
+
+        if not closed:
+            if write != k:
+                tf[:, write] = tf[:, k]
+                ti[:, write] = ti[:, k]
+            write += 1
+    counters[C_ACTIVE] = write
+    return total_pnl
+# --------------------------------------------------------------------------------------------------------------------------
+@njit(cache=True)
+def _trailing_stops(bar, days, price, atr, adx, tf, ti, acct, lf, li, counters, fees):
+    """Ratchet the ATR trailing stops; if any stop is hit, exit everything. Returns True on a hit."""
+    n = counters[C_ACTIVE]
+    if n == 0:
+        return False
+
+    # Dynamic ATR multiplier based on ADX: tight stops in weak trends, widest in normal ones
+    base_multiplier = TRAILING_ATR_MULTIPLIERS[_adx_regime(adx)]
+
+    any_hit = False
+    for k in range(n):
+        entry_price = tf[T_ENTRY_PRICE, k]
+        highest = max(tf[T_HIGHEST_CLOSE, k], price)
+        tf[T_HIGHEST_CLOSE, k] = highest
+
+        # Tiered profit locking (1.0 / 1.2 / 1.5), written as a straight-line sum of the tier tests
+        profit_pct = (highest - entry_price) / entry_price
+        profit_factor = 1.0 + 0.2 * (profit_pct > 0.05) + 0.3 * (profit_pct > 0.10)
+
+        # Never move stops backward, never give back more than 35% of open gains
+        new_stop = max(highest - base_multiplier * profit_factor * atr, tf[T_STOP_LOSS, k])
+        unrealized_gain = price - entry_price
+        if unrealized_gain > 0:
+            new_stop = max(new_stop, entry_price + unrealized_gain * 0.65)
+        tf[T_STOP_LOSS, k] = new_stop
+
+        # One hit liquidates the whole book, so the remaining stops need no update
+        if price <= new_stop:
+            any_hit = True
+            break
+
+    if any_hit:
+        _process_exits(bar, days, price, 0.0, R_TRAILING_STOP, tf, ti, acct, lf, li, counters, fees)
+    return any_hit
+# --------------------------------------------------------------------------------------------------------------------------
+@njit(cache=True)
+def _position_health(bar, days, price, atr, score, max_position_duration, tf, ti, acct, lf, li, counters, fees):
+    """Time-based exits per trade, then one portfolio-level profit-take rule chosen by momentum strength."""
+    n = counters[C_ACTIVE]
+    if n == 0:
+        return
+
+    # One pass over the book: open PnL and the risk still on the table (entry-to-stop distance per remaining share)
+    unrealized_pnls_sum = 0.0
+    current_total_risk_active = 0.0
+    for k in range(n):
+        entry_price = tf[T_ENTRY_PRICE, k]
+        remaining = ti[T_REMAINING, k]
+        unrealized_pnls_sum += (price - entry_price) * remaining
+        current_total_risk_active += abs(entry_price - tf[T_STOP_LOSS, k]) * remaining
+
+    atr_pct = atr / price if price != 0 else 0.0
+    adj_score = score * (1.2 - 0.5 * atr_pct)  # Adjust score by ATR percentage
+
+    # Time exits: positions are addressed by their slot, which shifts when earlier exits compact the arrays.
+    # Slots stay ordered by entry bar, so overdue positions form a prefix and the scan ends at the first fresh one.
+    oldest_allowed_day = days[bar] - max_position_duration
+    time_exits = False
+    for idx in range(n):
+        if idx >= counters[C_ACTIVE]:
+            break
+        if ti[T_REMAINING, idx] <= 0:
+            continue
+        if days[ti[T_ENTRY_BAR, idx]] >= oldest_allowed_day:
+            break
+        time_exits = True
+        if score > 50:
+            _process_exits(bar, days, price, 0.07, R_PARTIAL_TRIM, tf, ti, acct, lf, li, counters, fees)
+        else:
+            _process_exits(bar, days, price, 0.0, R_MAX_DURATION, tf, ti, acct, lf, li, counters, fees)
+
+    # Portfolio-level profit factor: open PnL (before time exits) over the risk still on the table,
+    # which only needs recounting when time exits changed the book
+    n = counters[C_ACTIVE]
+    if time_exits:
+        current_total_risk_active = 0.0
+        for k in range(n):
+            current_total_risk_active += abs(tf[T_ENTRY_PRICE, k] - tf[T_STOP_LOSS, k]) * ti[T_REMAINING, k]
+    profit_factor_overall = unrealized_pnls_sum / current_total_risk_active if current_total_risk_active > 0 else 0.0
+
+    # Matrix-based trimming (momentum-dependent); a NaN score compares False everywhere and lands in the weak tier
+    tier = 0
+    for bound in PROFIT_TAKE_SCORE_BOUNDS:
+        if adj_score > bound:
+            tier += 1
+
+    if n > 0 and profit_factor_overall >= PROFIT_TAKE_THRESHOLDS[tier]:
+        _process_exits(bar, days, price, PROFIT_TAKE_TRIMS[tier], R_PROFIT_TAKE, tf, ti, acct, lf, li, counters, fees)
+# --------------------------------------------------------------------------------------------------------------------------
+@njit(cache=True)
+def _process_entry(bar, entry_price, risk, atr, adx, tf, ti, acct, counters, fees):
+    """ADX-scaled stop, risk-based sizing capped at 95% exposure, then open a long position"""
+    portfolio_value = acct[A_PORTFOLIO_VALUE]
+
+    # ADX-based ATR multiplier and risk: weak trends get tighter stops and smaller size,
+    # very strong trends a closer stop to secure profits faster
+    regime = _adx_regime(adx)
+    atr_multiplier = ENTRY_ATR_MULTIPLIERS[regime]
+    risk_pct = risk * ENTRY_RISK_SCALES[regime]
+
+    initial_stop = entry_price - atr * atr_multiplier
+
+    # Position sizing
+    risk_per_share = abs(entry_price - initial_stop)
+    if risk_per_share < 1e-9:
+        return False
+    shares = int(portfolio_value * risk_pct / risk_per_share)
+    position_dollar_amount = shares * entry_price
+    actual_position_size = position_dollar_amount / portfolio_value
+
+    # Exposure check. Recounted over the open slots (at most max_positions) rather than kept as a running
+    # total, which drifts by rounding and can move capped share counts by one
+    max_total_exposure = 0.95
+    n = counters[C_ACTIVE]
+    current_exposure = 0.0
+    for k in range(n):
+        current_exposure += ti[T_REMAINING, k] * tf[T_ENTRY_PRICE, k]
+    current_exposure /= portfolio_value
+
+    if current_exposure + actual_position_size > max_total_exposure:
+        available_exposure = max_total_exposure - current_exposure
+        if available_exposure > 0:
+            shares = min(shares, int(available_exposure * portfolio_value / entry_price))
+            position_dollar_amount = shares * entry_price
+            actual_position_size = position_dollar_amount / portfolio_value
+        else:
+            return False
+
+    # Take-profit (ADX-boosted)
+    profit_multiplier = 1 + adx / 100 if adx > 40 else 1.0
+    take_profit = entry_price + 3.0 * atr * profit_multiplier
+
+    # Final checks
+    available_capital = acct[A_PORTFOLIO_VALUE] - acct[A_ALLOCATED]
+    if position_dollar_amount > available_capital or shares <= 0:
+        return False
+    if position_dollar_amount < portfolio_value * 0.001:
+        return False
+    commission = _commission(position_dollar_amount, fees)  # Only for orders that pass every check
+
+    # Create trade
+    tf[T_ENTRY_PRICE, n] = entry_price
+    tf[T_STOP_LOSS, n] = initial_stop
+    tf[T_TAKE_PROFIT, n] = take_profit
+    tf[T_HIGHEST_CLOSE, n] = entry_price
+    tf[T_COMMISSION, n] = commission
+    tf[T_POSITION_SIZE, n] = actual_position_size
+    ti[T_ENTRY_BAR, n] = bar
+    ti[T_SHARES, n] = shares
+    ti[T_REMAINING, n] = shares
+    ti[T_POSITION_ID, n] = counters[C_POSITION_ID]
+    counters[C_ACTIVE] = n + 1
+    counters[C_POSITION_ID] += 1
+
+    acct[A_ALLOCATED] += position_dollar_amount
+    acct[A_PORTFOLIO_VALUE] -= commission
+    return True
+# --------------------------------------------------------------------------------------------------------------------------
+@njit(cache=True, nogil=True)
+def run_momentum(open_, close, atr, adx, days, buy, exit_, immediate, score,
+                 initial_capital, long_risk, max_positions, max_position_duration, fees):
+    """
+    Run the momentum strategy over one price series. Signals, ATR and ADX are read from the previous bar,
+    orders fill at the current open.
+    Returns (equity, log_returns, log_float, log_int, n_log, final_unrealized_pnl, max_drawdown); the two log
+    blocks hold the L_* float and int fields of the first n_log exit records, max_drawdown is the deepest
+    peak-to-trough fall of equity as a positive fraction.
+    """
+    size = open_.shape[0]
+    equity = np.full(size, initial_capital)
+    returns = np.zeros(size)
+
+    # Open positions live in the first counters[C_ACTIVE] slots, kept in entry order (the time-exit scan relies
+    # on it), so exits compact the arrays rather than recycling slots from a free list. Slots are always
+    # written on entry before they are read, so the buffers need no initialisation.
+    capacity = max(max_positions, 1)
+    tf = np.empty((N_TRADE_FLOAT_FIELDS, capacity))
+    ti = np.empty((N_TRADE_INT_FIELDS, capacity), dtype=np.int64)
+    acct = np.array([initial_capital, 0.0])
+    counters = np.zeros(3, dtype=np.int64)
+    lf = np.empty((N_LOG_FLOAT_FIELDS, 256))
+    li = np.empty((N_LOG_INT_FIELDS, 256), dtype=np.int64)
+
+    # Drawdown is tracked as equity is written; flat stretches repeat the previous value, so only marked bars move it
+    peak_equity = initial_capital
+    min_drawdown = 0.0
+
+    i = 1
+    while i < size:
+        # Flat with no entry signal: nothing can change until the next buy bar, so carry the equity forward
+        # (log returns stay 0) and jump straight to that bar
+        if counters[C_ACTIVE] == 0 and not buy[i - 1]:
+            flat_value = max(acct[A_PORTFOLIO_VALUE], 1e-9)
+            while i < size and not buy[i - 1]:
+                equity[i] = flat_value
+                i += 1
+            continue
+
+        price = open_[i]
+        previous_day_atr = atr[i - 1]
+        previous_day_adx = adx[i - 1]
+        momentum_score = score[i - 1]
+
+        # Worst case a bar books every open position several times over
+        n = counters[C_ACTIVE]
+        while lf.shape[1] - counters[C_LOG] < 2 * n * n + 6 * n + 8:
+            lf, li = _grow_log(lf, li)
+
+        # --- Exit Conditions (Priority Order) ---
+        if counters[C_ACTIVE] > 0:
+            # 1. Trailing stop first
+            any_trailing_stop_hit = _trailing_stops(i, days, price, previous_day_atr, previous_day_adx,
+                                                    tf, ti, acct, lf, li, counters, fees)
+            if not any_trailing_stop_hit:
+                if immediate[i - 1]:
+                    _process_exits(i, days, price, 0.0, R_IMMEDIATE_EXIT, tf, ti, acct, lf, li, counters, fees)
+                elif exit_[i - 1]:
+                    if momentum_score > 50:
+                        _process_exits(i, days, price, 0.05, R_PARTIAL_EXIT, tf, ti, acct, lf, li, counters, fees)
+                    else:
+                        _process_exits(i, days, price, 0.0, R_EXIT_SIGNAL, tf, ti, acct, lf, li, counters, fees)
+
+            if counters[C_ACTIVE] > 0 and not any_trailing_stop_hit:
+                _position_health(i, days, price, previous_day_atr, momentum_score, max_position_duration,
+                                 tf, ti, acct, lf, li, counters, fees)
+
+        # --- Entry Conditions ---
+        if buy[i - 1] and counters[C_ACTIVE] < max_positions:
+            _process_entry(i, price * (1 + 0.001), long_risk, previous_day_atr, previous_day_adx,
+                           tf, ti, acct, counters, fees)
+
+        # Performance tracking
+        total_value = acct[A_PORTFOLIO_VALUE] + _unrealized_pnl(price, tf, ti, counters[C_ACTIVE])
+        equity[i] = max(total_value, 1e-9)  # Ensure positive for log
+        if equity[i - 1] > 1e-9:
+            returns[i] = math.log(equity[i] / equity[i - 1])
+        if equity[i] > peak_equity:
+            peak_equity = equity[i]
+        drawdown = (equity[i] - peak_equity) / peak_equity
+        if drawdown < min_drawdown and np.isfinite(drawdown):
+            min_drawdown = drawdown
+        i += 1
+
+    final_unrealized_pnl = _unrealized_pnl(close[size - 1], tf, ti, counters[C_ACTIVE]) if size > 0 else 0.0
+    return equity, returns, lf, li, counters[C_LOG], final_unrealized_pnl, -min_drawdown
+# --------------------------------------------------------------------------------------------------------------------------
+@njit(cache=True)
+def significance_metrics(equity, pnl, max_drawdown):
+    """
+    The metrics tested by the Monte Carlo analysis, with trade_statistics' formulas and edge cases:
+    (profit factor, expectancy % of initial equity, average win/loss ratio, max drawdown %).
+    """
+    gross_profit = 0.0
+    gross_loss = 0.0
+    n_wins = 0
+    for j in range(pnl.shape[0]):
+        if pnl[j] > 0:
+            gross_profit += pnl[j]
+            n_wins += 1
+        else:
+            gross_loss += pnl[j]
+    total_trades = pnl.shape[0]
+    n_losses = total_trades - n_wins
+
+    if gross_loss == 0:
+        profit_factor = np.inf if gross_profit > 0 else 1.0
+    else:
+        profit_factor = abs(gross_profit / gross_loss)
+
+    avg_win = gross_profit / n_wins if n_wins > 0 else 0.0
+    avg_loss = gross_loss / n_losses if n_losses > 0 else 0.0
+    win_prob = ((n_wins / total_trades) * 100 if total_trades > 0 else 0.0) / 100
+    expectancy = (win_prob * avg_win) + ((1 - win_prob) * avg_loss)
+    initial_capital = equity[0]
+    expectancy_pct = (expectancy / initial_capital) * 100 if initial_capital > 0 else 0.0
+
+    if avg_loss == 0:
+        avg_win_loss_ratio = np.inf if avg_win > 0 else 1.0
+    else:
+        avg_win_loss_ratio = abs(avg_win / avg_loss)
+    return profit_factor, expectancy_pct, avg_win_loss_ratio, max_drawdown * 100
+# --------------------------------------------------------------------------------------------------------------------------
+@njit(parallel=True, cache=True)
+def run_momentum_batch(open_, close, atr, adx, days, buy, exit_, immediate, score,
+                       initial_capital, long_risk, max_positions, max_position_duration, fees):
+    """
+    Backtest of a Monte Carlo chunk: row s of each (n_series, size) input is one resampled series (all rows share
+    `days` and the scalar settings). Only the significance_metrics of each run are kept, so the equity curves and
+    trade logs never leave the kernel. Returns an (n_series, 4) array, one row of metrics per series.
+    """
+    n_series = close.shape[0]
+    out = np.empty((n_series, 4))
+    for s in prange(n_series):
+        equity, _, log_float, _, n_log, _, max_drawdown = run_momentum(
+            open_[s], close[s], atr[s], adx[s], days, buy[s], exit_[s], immediate[s], score[s],
+            initial_capital, long_risk, max_positions, max_position_duration, fees
+        )
+        metrics = significance_metrics(equity, log_float[L_PNL, :n_log], max_drawdown)
+        for m in range(4):
+            out[s, m] = metrics[m]
+    return out
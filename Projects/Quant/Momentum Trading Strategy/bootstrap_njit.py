@@ -0,0 +1,32 @@
+import numpy as np
+from numba import njit, prange
+#==========================================================================================================================
+#================== NUMBA BOOTSTRAP KERNELS ===============================================================================
+#==========================================================================================================================
+# Resampling kernels used by the Monte Carlo significance test.
+# Replicates are independent, so they are spread across cores with prange and seeded individually.
+
+@njit(parallel=True, cache=True)
+def block_bootstrap_indices(n, block, n_days, n_reps, seeds):
+    """Stationary block bootstrap positions into a length-n source, as an (n_reps, n_days) int32 array.
+    Block lengths are geometric with mean `block`; each block is a run of consecutive (wrapping) positions."""
+    out = np.empty((n_reps, n_days), dtype=np.int32)
+    if n == 0:
+        return out
+    p = 1.0 / max(1, block)
+
+    for r in prange(n_reps):
+        np.random.seed(seeds[r])
+        t = 0
+        while t < n_days:
+            start = np.random.randint(0, n)
+            length = min(np.random.geometric(p), n_days - t, n)
+            # Write the block's positions as two straight runs: up to the end of the source, then wrapped
+            # to its start (length <= n, so it wraps at most once and the inner loops need no branch)
+            first = min(length, n - start)
+            for j in range(first):
+                out[r, t + j] = start + j
+            for j in range(first, length):
+                out[r, t + j] = start + j - n
+            t += length
+    return out
@@ -1,22 +1,36 @@
-import warnings
-warnings.filterwarnings('ignore')
 import pandas as pd
 import numpy as np
-import yfinance as yf
 from tabulate import tabulate  
-import pandas_ta as ta 
 import multiprocessing as mp
-from multiprocessing import Pool, shared_memory
-from collections import deque
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from numba import jit
-import optuna
 import tqdm as tqdm
-from functools import partial
+from functools import lru_cache
+from collections.abc import Sequence
+from types import MappingProxyType, SimpleNamespace
+import joblib
 from joblib import Parallel, delayed
 import traceback
-from scipy import stats
-import statsmodels.api as sm
-from statsmodels.tsa.stattools import acf
+import logging
+import hashlib
+import pickle
+import os
+import sys
+import time
+import math
+from datetime import date
+from indicators_njit import (rsi_wilder, atr_wilder, adx_wilder, bbands, rolling_means, weekly_ma, rolling_rank_pct,
+                             rolling_rank_pct_batch)
+from bootstrap_njit import block_bootstrap_indices
+from backtest_njit import (run_momentum, run_momentum_batch, EXIT_REASONS, L_ENTRY_BAR, L_EXIT_BAR, L_ENTRY_PRICE,
+                           L_EXIT_PRICE, L_SHARES, L_ORIGINAL_SHARES, L_PNL, L_GROSS_PNL, L_ENTRY_COMMISSION, L_EXIT_COMMISSION, L_DURATION,
+                           L_REASON, L_POSITION_ID, L_COMPLETE, L_REMAINING, N_LOG_FLOAT_FIELDS, N_LOG_INT_FIELDS)
+
+# Copy-on-Write: slices are lazy views and only copy when written, so read-only slices need no defensive .copy()
+pd.set_option("mode.copy_on_write", True)
+
+logger = logging.getLogger(__name__)
 #==========================================================================================================================
 #================== SCRIPT PARAMETERS =====================================================================================
 #==========================================================================================================================
@@ -29,15 +43,22 @@ IS_HISTORY_DAYS = 1260  # Approx 5 years, for IS operations (Opt, MC, Test)
 # TRADE CONTROL
 INITIAL_CAPITAL = 25000.0 # Initial capital for the strategy
 COMMISION = True # Set to True for commission
+COMMISSION_RATE = 0.0005 # Fraction of the trade's dollar notional
+COMMISSION_MIN = 1.0 # Minimum charge per order
+# Fee schedule handed to the backtest kernel, fixed at import so the kernel never branches on COMMISION
+COMMISSION_FEES = np.array([COMMISSION_RATE, COMMISSION_MIN] if COMMISION else [0.0, 0.0])
 
 # OPTIMIZATION CONTROL
 OPTIMIZATION = True # Set to True for optimization
 TRIALS = 150 # Number of trials for optimization
 TARGET_SCORE = 1.0
 SCORE_TOLERANCE = 0.5
+MIN_OPTIMIZATION_TRADES = 25 # Trials with fewer trades are filtered out of the results
+OPTIMIZATION_TIMEOUT = 1200 # Seconds after which no new trials are started
 
 # MONTE CARLO CONTROL
 BLOCK_SIZE = 20 # Size of blocks for random sampling
+ACF_CONFIDENCE_Z = 1.959963984540054 # Two-sided 95% normal quantile for the ACF significance bands
 
 # WALK-FORWARD CONTROL
 OPTIMIZATION_FREQUENCY = 252 # Number of days between optimizations (wfa)
@@ -48,6 +69,18 @@ WFA_HISTORY_DAYS = IS_HISTORY_DAYS + FINAL_OOS_YEARS * 252  # Full history for W
 TRADE_SUM = False # Set to True to sum trades in WFA
 
 RISK_FREE_RATE_ANNUAL = 0.04   # Annual risk-free rate
+NS_PER_DAY = 86_400_000_000_000 # DatetimeIndex.asi8 units per calendar day
+TRADING_DAYS_PER_YEAR = 252.0
+SQRT_252 = math.sqrt(TRADING_DAYS_PER_YEAR) # Annualisation factor for daily Sharpe/Sortino (a compile-time constant in Numba)
+DAYS_PER_YEAR = 365.25 # Calendar days per year for annualised returns
+
+# DATA CACHE CONTROL
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "quant") # Parquet cache for downloaded price data
+INDICATOR_CACHE_SIZE = 8 # Number of indicator frames kept in memory by prepare_data
+OPTIMIZE_CACHE = True # Set to False to always re-run Optuna instead of reusing cached Pareto fronts
+MAIN_OPTIMIZE_CACHE = False # Opt-in: let the TYPE 1-3 optimizations in main() reuse cached Pareto fronts too
+OPTIMIZE_CACHE_DIR = os.path.join(CACHE_DIR, "optimize") # Pickled Pareto front of each optimized window
+OPTIMIZE_CACHE_VERSION = 1 # Bump to invalidate every cached Pareto front
 
 #=========================================================================================================================
 #================== STRATEGY PARAMETERS ==================================================================================
@@ -60,6 +93,7 @@ OPTIMIZATION_DIRECTIONS = {
     'expectancy': 'maximize',
     'max_drawdown': 'minimize',
 }
+OBJECTIVE_NAMES = tuple(OPTIMIZATION_DIRECTIONS) # Objective order of the study values, built once
 # Optimization objectives
 OBJECTIVE_WEIGHTS = {       
     'profit_factor': 0.25, 
@@ -118,6 +152,47 @@ DEFAULT_SIGNAL_PROCESSING_PARAMS = {
 #==========================================================================================================================
 #================== DATA RETRIEVAL & HANDLING =============================================================================
 #==========================================================================================================================
+_INDICATOR_CACHE = {} # Input frame fingerprint -> indicator DataFrame
+
+# Columns packed into the float32 feature matrix consumed by the strategy loop
+FEATURE_COLS = ['Open', 'High', 'Low', 'Close', 'Volume', 'ATR', 'ADX', 'RSI']
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_COLS)}
+KERNEL_FEATURES = [FEATURE_INDEX[name] for name in ('Open', 'Close', 'ATR', 'ADX')] # Columns read by run_momentum
+def _cached_download(tickers, start, end=None):
+    """Download price data (grouped by ticker) through a same-day on-disk Parquet cache."""
+    # Imported here rather than at module level: every worker process re-imports this module and never downloads
+    import yfinance as yf
+    if isinstance(tickers, str):
+        tickers = [tickers]
+    today = date.today()
+    start_key = pd.Timestamp(start).strftime('%Y%m%d')
+    end_key = pd.Timestamp(end).strftime('%Y%m%d') if end is not None else 'latest'
+    safe_tickers = '-'.join(t.replace('^', '_') for t in tickers)
+    cache_prefix = f"{safe_tickers}_{start_key}_{end_key}_"
+    cache_path = os.path.join(CACHE_DIR, f"{cache_prefix}{today.isoformat()}.parquet")
+
+    # The file name carries the download date, so any existing file for today is a hit
+    if os.path.exists(cache_path):
+        try:
+            return pd.read_parquet(cache_path)
+        except Exception as e:
+            print(f"Warning: Could not read cache file {cache_path}. Re-downloading. Error: {e}")
+
+    # One threaded request for all tickers, columns grouped as (ticker, field)
+    data = yf.download(tickers, start=start, end=end, auto_adjust=True, group_by='ticker', threads=True)
+
+    if not data.empty:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            data.to_parquet(cache_path, compression='zstd')
+            # Earlier days' files for the same tickers and range are superseded by this one
+            for name in os.listdir(CACHE_DIR):
+                if name.startswith(cache_prefix) and name.endswith(".parquet") and name != os.path.basename(cache_path):
+                    os.remove(os.path.join(CACHE_DIR, name))
+        except Exception as e:
+            print(f"Warning: Could not write cache file {cache_path}. Error: {e}")
+    return data
+# -------------------------------------------------------------------------------------------------------------------------
 def get_data(ticker):
     """
     Download historical data for the given ticker and split it into in-sample and out-of-sample datasets.
@@ -130,14 +205,14 @@ def get_data(ticker):
     print(f"\nDownloading data for {ticker}...")
 
     try:
-        data = yf.download(ticker, start=f"{data_start_year}-01-01", auto_adjust=True)
+        raw = _cached_download([ticker, "^VIX"], start=f"{data_start_year}-01-01")
 
-        if data.empty:
+        if raw.empty or ticker not in raw.columns.get_level_values(0):
             print(f"No data downloaded for {ticker}.")
             return pd.DataFrame(), pd.DataFrame()
         
-        if isinstance(data.columns, pd.MultiIndex):
-            data.columns = data.columns.get_level_values(0)
+        data = raw[ticker].dropna(how='all').copy()
+        data.index = pd.DatetimeIndex(data.index) # Guaranteed here so downstream code never re-parses dates
 
         required_cols = ['Open', 'High', 'Low', 'Close', 'Volume']
         missing = [col for col in required_cols if col not in data.columns]
@@ -145,10 +220,9 @@ def get_data(ticker):
             print(f"Missing required columns: {missing}")
             return pd.DataFrame(), pd.DataFrame()
 
-        # Download VIX
-        vix = yf.download("^VIX", start=data.index[0], end=data.index[-1], auto_adjust=True)['Close']
-        vix = vix.reindex(data.index, method='ffill')
-        data['VIX'] = vix
+        # Align VIX from the same batched download
+        if "^VIX" in raw.columns.get_level_values(0):
+            data['VIX'] = raw["^VIX"]['Close'].reindex(data.index).ffill()
 
         core_cols = required_cols + ['VIX']
         still_missing = [col for col in core_cols if col not in data.columns]
@@ -156,22 +230,11 @@ def get_data(ticker):
             print(f"Missing core columns before dropna: {still_missing}")
             return pd.DataFrame(), pd.DataFrame()
 
-        # Ensure all core columns are numeric float32
-        for col in core_cols:
-            if col in data.columns:
-                col_data = data[col]
-                if isinstance(col_data, pd.Series):
-                    try:
-                        data[col] = pd.to_numeric(col_data, errors='coerce').astype('float32')
-                    except Exception as e:
-                        print(f"Warning: Could not convert column '{col}' to float32. Error: {e}")
-                else:
-                    print(f"Warning: Column '{col}' is not a Series. Type: {type(col_data)}")
-            else:
-                print(f"Warning: Column '{col}' not found in DataFrame before conversion.")
+        # Ensure all core columns are numeric float32 (one coercion and one cast for the whole block)
+        data[core_cols] = data[core_cols].apply(pd.to_numeric, errors='coerce').astype(np.float32, copy=False)
 
-        # Drop NaNs
-        data = data.dropna(subset=core_cols)
+        # Drop non-finite rows with one scan over the float32 block
+        data = data.iloc[np.isfinite(data[core_cols].to_numpy()).all(axis=1)]
         if data.empty:
             print("All rows dropped after NaN removal.")
             return pd.DataFrame(), pd.DataFrame()
@@ -198,338 +261,358 @@ def get_data(ticker):
         traceback.print_exc()
         return pd.DataFrame(), pd.DataFrame()
 # -------------------------------------------------------------------------------------------------------------------------
+def _validate_and_slice(df, n_rows):
+    """Keep the last n_rows and check the numeric indicators in one pass over a float32 matrix."""
+    df = df.iloc[-n_rows:].copy()
+    # Exclude boolean columns and raw components that can legitimately be all zero
+    boolean_columns = ['volume_confirmed', 'weekly_uptrend']
+    potentially_zero_raw_cols = ['price_roc_raw', 'ma_dist_raw', 'adx_slope_raw', 'atr_pct_raw']
+    numeric_columns = [col for col in df.columns 
+                       if col not in boolean_columns 
+                       and col not in potentially_zero_raw_cols
+                       and df[col].dtype in [np.float64, np.float32, np.int64, np.int32]]
+
+    values = df[numeric_columns].to_numpy(np.float32) if numeric_columns else np.empty((len(df), 0), dtype=np.float32)
+    # Invalid if any value is missing or any numeric column is entirely zero
+    has_null = not np.isfinite(values).all()
+    has_zero_in_numeric = not (values != 0).any(axis=0).all()
+    
+    if has_null or has_zero_in_numeric:
+        print("Warning: DataFrame contains null or zero values after indicator calculation. Returning empty DataFrame.")
+        return pd.DataFrame()
+    print("DataFrame is valid after indicator calculation.")
+    return df
+# -------------------------------------------------------------------------------------------------------------------------
 def prepare_data(df_input, type=None):
     """
     Prepares the data with important indicators.
     """
-    # 1. Data copy and critical checks
-    df = df_input.copy()
-    if df.empty:
+    # 1. Critical checks
+    if df_input.empty:
         print("Warning: Empty dataframe provided to prepare_data.")
-        return df
+        return df_input.copy()
     
-    if 'Close' not in df.columns or df['Close'].isnull().all():
+    if 'Close' not in df_input.columns or df_input['Close'].isnull().all():
         print("CRITICAL ERROR: 'Close' column is missing or unusable before indicator calculation.")
         return pd.DataFrame()
+
+    # 2. Indicators (memoized per input frame)
+    df = _compute_indicators(df_input)
+    if df.empty:
+        return df
     
-    # List of indicator columns that will be created
+    # 3. Data type split
+    if type == 1:
+        # In-Sample Data
+        return _validate_and_slice(df, IS_HISTORY_DAYS)
+    elif type == 2:
+        # Full Data
+        return _validate_and_slice(df, WFA_HISTORY_DAYS)
+    else:
+        print("Warning: Invalid type provided to prepare_data. Returning empty DataFrame.")
+        return pd.DataFrame()
+# -------------------------------------------------------------------------------------------------------------------------
+def _frame_fingerprint(df):
+    """SHA-1 over a frame's column names, index and every value (pandas' stable per-row hashes)"""
+    key = hashlib.sha1(repr(list(df.columns)).encode())
+    key.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return key
+# -------------------------------------------------------------------------------------------------------------------------
+def _compute_indicators(df_input):
+    """Calculate all indicator columns. Results are cached by a fingerprint of the whole input frame."""
+    # Every input column (OHLC, Volume, VIX) feeds the indicators or the returned frame, so all of them are hashed
+    cache_key = _frame_fingerprint(df_input).hexdigest()
+    cached_df = _INDICATOR_CACHE.get(cache_key)
+    if cached_df is not None:
+        return cached_df
+
+    has_vix = 'VIX' in df_input.columns
+    n = len(df_input)
+
+    # Every float indicator is written into one preallocated float32 block; the frame is built once at the end
     indicator_columns = [
         f'{FAST}_ma', f'{SLOW}_ma', 'Volume_MA20', f'Weekly_MA{WEEKLY_MA_PERIOD}',
-        'RSI', 'Upper_Band', 'Lower_Band', 'ATR', 'Close_26_ago', 'ADX',
-        'volume_confirmed', 'weekly_uptrend',
-        'price_roc_raw', 'ma_dist_raw', 'vol_accel_raw', 'adx_slope_raw', 'atr_pct_raw'
-    ]
+        'RSI', 'Upper_Band', 'Lower_Band', 'ATR', 'Close_26_ago', 'ADX', 'adx_level_raw',
+        'price_roc_raw', 'ma_dist_raw', 'vol_accel_raw', 'atr_pct_raw', 'adx_slope_raw'
+    ] + (['VIX_MA'] if has_vix else []) + ['vix_factor_raw', 'rsi_ideal_zone_raw']
+    col = {name: i for i, name in enumerate(indicator_columns)}
+    out = np.empty((n, len(indicator_columns)), dtype=np.float32)
 
-    # 2. Calculate Core Indicators
+    # Calculate Core Indicators
     try:
-        # Main Indicators
-        df[f'{FAST}_ma'] = df['Close'].rolling(window=FAST, min_periods=1).mean().fillna(0)
-        df[f'{SLOW}_ma'] = df['Close'].rolling(window=SLOW, min_periods=1).mean().fillna(0)
-        df['Volume_MA20'] = df['Volume'].rolling(window=20, min_periods=1).mean().fillna(0)
+        # Extract price arrays once for the Numba indicator kernels
+        close_arr = df_input['Close'].to_numpy(np.float32)
+        high_arr = df_input['High'].to_numpy(np.float32)
+        low_arr = df_input['Low'].to_numpy(np.float32)
+        volume_arr = df_input['Volume'].to_numpy(np.float32)
+
+        # Main Indicators (fast/slow MA, volume MA and VIX MA in one fused pass)
+        vix_input = df_input['VIX'].to_numpy(np.float32) if has_vix else np.zeros(n, dtype=np.float32)
+        fast_ma, slow_ma, volume_ma, vix_ma = rolling_means(
+            close_arr, volume_arr, vix_input,
+            FAST, SLOW, 20, VIX_MA_PERIOD
+        )
+        out[:, col[f'{FAST}_ma']] = np.nan_to_num(fast_ma, nan=0.0)
+        out[:, col[f'{SLOW}_ma']] = np.nan_to_num(slow_ma, nan=0.0)
+        out[:, col['Volume_MA20']] = np.nan_to_num(volume_ma, nan=0.0)
         
         # Weekly Moving Average
-        if not isinstance(df.index, pd.DatetimeIndex):
-            df.index = pd.to_datetime(df.index)
-        df_weekly = df['Close'].resample('W').last()
-        df[f'Weekly_MA{WEEKLY_MA_PERIOD}'] = (df_weekly.rolling(window=WEEKLY_MA_PERIOD, min_periods=1)
-            .mean().reindex(df.index, method='ffill')).fillna(0) 
-        
+        # Monday-based week number since epoch (1970-01-01 was a Thursday); each day sees the MA of completed weeks
+        week_id = (df_input.index.values.astype('datetime64[D]').astype(np.int64) + 3) // 7
+        weekly_ma_values = weekly_ma(df_input['Close'].to_numpy(np.float64), week_id, WEEKLY_MA_PERIOD)
+        out[:, col[f'Weekly_MA{WEEKLY_MA_PERIOD}']] = weekly_ma_values
+
         # Relative Strength Index
-        rsi_series = ta.rsi(df['Close'], length=RSI_LENGTH)
-        df['RSI'] = rsi_series.fillna(0) # NaNs will persist if rsi_series has them
+        out[:, col['RSI']] = np.nan_to_num(rsi_wilder(close_arr, RSI_LENGTH), nan=0.0)
         
         # Bollinger Bands
-        bb = ta.bbands(df['Close'], length=BB_LEN, std=ST_DEV)
-        if isinstance(bb, pd.DataFrame):  # If bb is a DataFrame with multiple columns
-            # Access specific columns by their proper names
-            df['Upper_Band'] = bb[f'BBU_{BB_LEN}_{ST_DEV}'].fillna(0)
-            df['Lower_Band'] = bb[f'BBL_{BB_LEN}_{ST_DEV}'].fillna(0)
-        else:
-            print(f"Warning: Bollinger Bands calculation failed or returned unexpected format: {type(bb)}")
-            # Create empty columns to avoid errors
-            df['Upper_Band'] = 0
-            df['Lower_Band'] = 0
+        upper_band, lower_band = bbands(close_arr, BB_LEN, ST_DEV)
+        out[:, col['Upper_Band']] = np.nan_to_num(upper_band, nan=0.0)
+        out[:, col['Lower_Band']] = np.nan_to_num(lower_band, nan=0.0)
 
         # Average True Range
-        df['ATR'] = ta.atr(df['High'], df['Low'], df['Close'], length=ATR_LENGTH).fillna(0)
+        atr_values = out[:, col['ATR']]
+        atr_values[:] = np.nan_to_num(atr_wilder(high_arr, low_arr, close_arr, ATR_LENGTH), nan=0.0)
 
         # Close price 26 periods ago
-        df['Close_26_ago'] = df['Close'].shift(26).fillna(0)
+        out[:26, col['Close_26_ago']] = 0
+        out[26:, col['Close_26_ago']] = close_arr[:-26]
 
         # Average Directional Index
-        adx_result = ta.adx(df['High'], df['Low'], df['Close'], length=ADX_LENGTH)
-        df['ADX'] = adx_result[f'ADX_{ADX_LENGTH}'].fillna(0)
-        df['adx_level_raw'] = df['ADX'].fillna(0)
+        adx_values = out[:, col['ADX']]
+        adx_values[:] = np.nan_to_num(adx_wilder(high_arr, low_arr, close_arr, ADX_LENGTH), nan=0.0)
+        out[:, col['adx_level_raw']] = adx_values
         
         # Volume and Weekly Trend Confirmations
-        df['volume_confirmed'] = df['Volume'] > df['Volume_MA20'].fillna(False)
+        volume_confirmed = np.empty(n, dtype=bool)
+        np.greater(volume_arr, out[:, col['Volume_MA20']], out=volume_confirmed)
         
-        weekly_ma_series = df[f'Weekly_MA{WEEKLY_MA_PERIOD}']
-        df['weekly_uptrend'] = (df['Close'] > weekly_ma_series) & \
-                                (weekly_ma_series.shift(1).ffill() < weekly_ma_series).fillna(False)
+        weekly_uptrend = np.empty(n, dtype=bool)
+        weekly_uptrend[:1] = False
+        np.greater(weekly_ma_values[1:], weekly_ma_values[:-1], out=weekly_uptrend[1:])
+        weekly_uptrend &= close_arr > weekly_ma_values
         
         # Calculate raw components for momentum score
-        df['price_roc_raw'] = df['Close'].pct_change(MOMENTUM_LOOKBACK).fillna(0)
-        
-        ma_dist_raw_values = np.where(df[f'{FAST}_ma'].values != 0, 
-                                      (df['Close'].values / df[f'{FAST}_ma'].values - 1), 0)
-        df['ma_dist_raw'] = pd.Series(ma_dist_raw_values, index=df.index).fillna(0)
-
-        vol_accel_raw_values = np.where(df['Volume_MA20'].values != 0, 
-                                        df['Volume'].values / df['Volume_MA20'].values, 1.0)
-        df['vol_accel_raw'] = pd.Series(vol_accel_raw_values, index=df.index).fillna(1.0)
-        
-        df['adx_slope_raw'] = df['ADX'].diff(MOMENTUM_LOOKBACK).fillna(0)
-        
-        atr_pct_raw_values = np.where(df['Close'].values != 0, 
-                                      df['ATR'].values / df['Close'].values, 0)
-        df['atr_pct_raw'] = pd.Series(atr_pct_raw_values, index=df.index).fillna(0)
+        # Masked divides: zero denominators keep the default instead of dividing and discarding;
+        # errstate keeps any NaN/inf inputs from raising FP warnings locally
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Rate of change over MOMENTUM_LOOKBACK bars straight from slices (no shifted Series)
+            price_roc_raw = out[:, col['price_roc_raw']]
+            price_roc_raw[:MOMENTUM_LOOKBACK] = 0
+            np.divide(close_arr[MOMENTUM_LOOKBACK:], close_arr[:-MOMENTUM_LOOKBACK], out=price_roc_raw[MOMENTUM_LOOKBACK:])
+            price_roc_raw[MOMENTUM_LOOKBACK:] -= 1
+
+            close_f64 = close_arr.astype(np.float64)
+            fast_ma_f64 = out[:, col[f'{FAST}_ma']].astype(np.float64)
+            ma_dist_raw_values = np.divide(close_f64, fast_ma_f64, out=np.ones(n), where=(fast_ma_f64 != 0)) - 1.0
+            out[:, col['ma_dist_raw']] = np.nan_to_num(ma_dist_raw_values, nan=0.0, copy=False)
+
+            volume_ma_f64 = out[:, col['Volume_MA20']].astype(np.float64)
+            vol_accel_raw_values = np.divide(volume_arr.astype(np.float64), volume_ma_f64,
+                                             out=np.ones(n), where=(volume_ma_f64 != 0))
+            out[:, col['vol_accel_raw']] = np.nan_to_num(vol_accel_raw_values, nan=1.0, copy=False)
+
+            atr_pct_raw_values = np.divide(atr_values.astype(np.float64), close_f64,
+                                           out=np.zeros(n), where=(close_f64 != 0))
+            out[:, col['atr_pct_raw']] = np.nan_to_num(atr_pct_raw_values, nan=0.0, copy=False)
+        
+        adx_slope_raw = out[:, col['adx_slope_raw']]
+        adx_slope_raw[:MOMENTUM_LOOKBACK] = 0
+        np.subtract(adx_values[MOMENTUM_LOOKBACK:], adx_values[:-MOMENTUM_LOOKBACK], out=adx_slope_raw[MOMENTUM_LOOKBACK:])
 
         # VIX Factor Calculation
-        if 'VIX' in df.columns:
-            df['VIX_MA'] = df['VIX'].rolling(window=VIX_MA_PERIOD, min_periods=1).mean().fillna(method='bfill').fillna(0)
+        if has_vix:
+            vix_ma_values = out[:, col['VIX_MA']]
+            vix_ma_values[:] = np.nan_to_num(vix_ma, nan=0.0)
             # Factor: VIX_MA / VIX. Higher is "better" (VIX below its MA).
             # Add a small epsilon to VIX to prevent division by zero, though VIX is rarely zero.
-            df['vix_factor_raw'] = np.where(df['VIX'].values > 1e-6, 
-                                            df['VIX_MA'].values / (df['VIX'].values + 1e-6), 
-                                            1.0) # Default to 1.0 if VIX is near zero
-            df['vix_factor_raw'] = df['vix_factor_raw'].fillna(1.0) # Fill any remaining NaNs
+            vix_f64 = vix_input.astype(np.float64)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                vix_factor_raw_values = np.divide(vix_ma_values.astype(np.float64), vix_f64 + 1e-6,
+                                                  out=np.ones(n), where=(vix_f64 > 1e-6)) # Default to 1.0 if VIX is near zero
+            out[:, col['vix_factor_raw']] = np.nan_to_num(vix_factor_raw_values, nan=1.0, copy=False) # Fill any remaining NaNs
         else:
             print("Warning: VIX column not found. Cannot calculate VIX factor.")
-            df['vix_factor_raw'] = 1.0 # Neutral value if VIX is not available
+            out[:, col['vix_factor_raw']] = 1.0 # Neutral value if VIX is not available
 
         # Define RSI ideal zone parameters
-        rsi_values = df['RSI']
+        rsi_values = out[:, col['RSI']]
         rsi_lower_taper_end = 20.0  # RSI values below this will have a score of 0
         rsi_ideal_low = 40.0       # Start of the ideal zone (score 1)
         rsi_ideal_high = 70.0      # End of the ideal zone (score 1)
         rsi_upper_taper_end = 90.0  # RSI values above this will have a score of 0
 
-        # Conditions for np.select
-        conditions = [
-            (rsi_values >= rsi_ideal_low) & (rsi_values <= rsi_ideal_high),              # In ideal zone
-            (rsi_values >= rsi_lower_taper_end) & (rsi_values < rsi_ideal_low),        # Tapering up to ideal zone
-            (rsi_values > rsi_ideal_high) & (rsi_values <= rsi_upper_taper_end)          # Tapering down from ideal zone
-        ]
-
-        # Corresponding choices for scores
-        # Ensure no division by zero if taper_end equals ideal_low/high (though not the case here)
-        choices = [
-            1.0,
-            (rsi_values - rsi_lower_taper_end) / (rsi_ideal_low - rsi_lower_taper_end) 
-                if (rsi_ideal_low - rsi_lower_taper_end) != 0 else 0.0,
-            (rsi_upper_taper_end - rsi_values) / (rsi_upper_taper_end - rsi_ideal_high)
-                if (rsi_upper_taper_end - rsi_ideal_high) != 0 else 0.0
-        ]
-        
-        # Apply conditions to calculate raw score, default to 0.0 outside defined tapers
-        rsi_zone_scores = np.select(conditions, choices, default=0.0)
+        # Trapezoid in one fused pass: min(rising ramp, falling ramp, plateau) clipped to [0, 1]
+        rising_ramp = (rsi_values - rsi_lower_taper_end) / (rsi_ideal_low - rsi_lower_taper_end)
+        falling_ramp = (rsi_upper_taper_end - rsi_values) / (rsi_upper_taper_end - rsi_ideal_high)
+        rsi_zone_scores = np.clip(np.minimum(np.minimum(rising_ramp, falling_ramp), 1.0), 0.0, 1.0)
         
-        df['rsi_ideal_zone_raw'] = pd.Series(rsi_zone_scores, index=df.index).clip(0, 1).fillna(0.5)
+        out[:, col['rsi_ideal_zone_raw']] = np.nan_to_num(rsi_zone_scores, nan=0.5)
 
-        # Check if all expected indicator columns were created
-        missing_calculated_indicators = [col for col in indicator_columns if col not in df.columns and col not in ['volume_confirmed', 'weekly_uptrend']] # Booleans have defaults
-        if missing_calculated_indicators:
-            print(f"CRITICAL ERROR in prepare_data: The following indicator columns were expected but not created: {missing_calculated_indicators}. Aborting preparation.")
-            return pd.DataFrame()
+        # One frame construction: source columns, the float32 indicator block, then the boolean flags
+        df = pd.concat([
+            df_input,
+            pd.DataFrame(out, index=df_input.index, columns=indicator_columns, copy=False),
+            pd.DataFrame({'volume_confirmed': volume_confirmed, 'weekly_uptrend': weekly_uptrend}, index=df_input.index)
+        ], axis=1)
 
     except Exception as e:
         print(f"CRITICAL ERROR during indicator calculation in prepare_data: {e}. Aborting preparation.")
         traceback.print_exc()
         return pd.DataFrame()
-    
-    # 3. Data type split
-    if type == 1:
-        # In-Sample Data
-        df = df.iloc[-IS_HISTORY_DAYS:].copy()
-        # Modify check to exclude boolean columns from zero value check
-        boolean_columns = ['volume_confirmed', 'weekly_uptrend']
-        potentially_zero_raw_cols = ['price_roc_raw', 'ma_dist_raw', 'adx_slope_raw', 'atr_pct_raw']
-        numeric_columns = [col for col in df.columns 
-                                          if col not in boolean_columns 
-                                          and col not in potentially_zero_raw_cols
-                                          and df[col].dtype in [np.float64, np.float32, np.int64, np.int32]]
-        
-        # Check if df has null values in any column or zero values in numeric columns only
-        has_null = df.isnull().any().any()
-        has_zero_in_numeric = (df[numeric_columns] == 0).all().any() if numeric_columns else False
-        
-        if has_null or has_zero_in_numeric:
-            print("Warning: DataFrame contains null or zero values after indicator calculation. Returning empty DataFrame.")
-            
-            return pd.DataFrame()
-        else:
-            print("DataFrame is valid after indicator calculation.")
-        return df
-    elif type == 2:
-        # Full Data
-        df = df.iloc[-WFA_HISTORY_DAYS:].copy()
-        # Modify check to exclude boolean columns from zero value check
-        boolean_columns = ['volume_confirmed', 'weekly_uptrend']
-        potentially_zero_raw_cols = ['price_roc_raw', 'ma_dist_raw', 'adx_slope_raw', 'atr_pct_raw']
-        numeric_columns = [col for col in df.columns 
-                                          if col not in boolean_columns 
-                                          and col not in potentially_zero_raw_cols
-                                          and df[col].dtype in [np.float64, np.float32, np.int64, np.int32]]
-        
-        # Check if df has null values in any column or zero values in numeric columns only
-        has_null = df.isnull().any().any()
-        has_zero_in_numeric = (df[numeric_columns] == 0).all().any() if numeric_columns else False
-        
-        if has_null or has_zero_in_numeric:
-            print("Warning: DataFrame contains null or zero values after indicator calculation. Returning empty DataFrame.")
-            
-            return pd.DataFrame()
-        else:
-            print("DataFrame is valid after indicator calculation.")
-        return df
-    else:
-        print("Warning: Invalid type provided to prepare_data. Returning empty DataFrame.")
-        return pd.DataFrame()
+
+    # Keep the cache small; callers only ever slice copies out of the cached frame
+    if len(_INDICATOR_CACHE) >= INDICATOR_CACHE_SIZE:
+        _INDICATOR_CACHE.pop(next(iter(_INDICATOR_CACHE)))
+    _INDICATOR_CACHE[cache_key] = df
+    return df
+
+# -------------------------------------------------------------------------------------------------------------------------
+def feature_matrix(df):
+    """Contiguous row-major float32 matrix of FEATURE_COLS; index columns with FEATURE_INDEX."""
+    return np.ascontiguousarray(df[FEATURE_COLS].to_numpy(np.float32))
+# -------------------------------------------------------------------------------------------------------------------------
+def _rolling_rank_pct(arr, window):
+    """Equivalent of rolling(window, min_periods=1).rank(pct=True).fillna(0.5), per column for 2-D input"""
+    arr = np.asarray(arr, dtype=np.float64)
+    if arr.ndim == 1:
+        return rolling_rank_pct(arr, window)
+    return np.column_stack([rolling_rank_pct(np.ascontiguousarray(arr[:, j]), window) for j in range(arr.shape[1])])
+# -------------------------------------------------------------------------------------------------------------------------
+def _create_shared_array(values):
+    """Copy an array into a new shared-memory block. Returns (shm, meta); workers attach with _attach_shared_array."""
+    shm = shared_memory.SharedMemory(create=True, size=max(1, values.nbytes))
+    shared_values = np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)
+    shared_values[:] = values
+    return shm, {'name': shm.name, 'shape': values.shape, 'dtype': values.dtype.str}
+# -------------------------------------------------------------------------------------------------------------------------
+def _attach_shared_array(meta):
+    """Attach to a block created by _create_shared_array and view it as an ndarray (zero-copy). Returns (shm, array).
+    Worker processes inherit the creating process's resource tracker, so attaching must not unregister the block:
+    that would drop the creator's registration and make its final unlink fail."""
+    shm = shared_memory.SharedMemory(name=meta['name'])
+    return shm, np.ndarray(meta['shape'], dtype=np.dtype(meta['dtype']), buffer=shm.buf)
+# -------------------------------------------------------------------------------------------------------------------------
+def _create_shared_frame(df):
+    """Copy a prepared DataFrame into one contiguous float32 shared-memory block. Returns (shm, meta)."""
+    shm, meta = _create_shared_array(np.ascontiguousarray(df.to_numpy(dtype=np.float32)))
+    meta.update({
+        'columns': list(df.columns),
+        'bool_columns': [col for col in df.columns if df[col].dtype == bool],
+        'index': df.index.values
+    })
+    return shm, meta
+# -------------------------------------------------------------------------------------------------------------------------
+def _attach_shared_frame(meta):
+    """Attach to a shared-memory block created by _create_shared_frame and rebuild the DataFrame zero-copy."""
+    shm, values = _attach_shared_array(meta)
+    df = pd.DataFrame(values, index=pd.DatetimeIndex(meta['index']), columns=meta['columns'], copy=False)
+    for col in meta['bool_columns']:
+        df[col] = df[col].astype(bool)
+    return shm, df
 
 #==========================================================================================================================
 #================== TRADING STRATEGY ======================================================================================
 #==========================================================================================================================
+# Columns read by signals(): ranked components (one shared lookback window) and raw condition inputs
+SIGNAL_RANK_COLS = ['price_roc_raw', 'ma_dist_raw', 'rsi_ideal_zone_raw', 'adx_slope_raw', 'vol_accel_raw', 'vix_factor_raw']
+SIGNAL_CONDITION_COLS = ['ADX', f"{FAST}_ma", f"{SLOW}_ma", 'VIX', 'RSI']
+SIGNAL_REQUIRED_COLS = [
+    f"{FAST}_ma", f"{SLOW}_ma", 'RSI', 'Close', 'Volume', 'High', 'Low',
+    'ATR', 'ADX', 'Volume_MA20', 'Open', 'volume_confirmed', 'weekly_uptrend'
+]
+
 def signals(df, adx_threshold, params):
-    
-    # Initialize signals DataFrame with the same index
-    signals_df = pd.DataFrame(index=df.index)
-    
-    # Setup signal parameters
-    fast_ma_col = f"{FAST}_ma"
-    slow_ma_col = f"{SLOW}_ma"
-    
+    """
+    Build the per-bar signal arrays from an indicator DataFrame (df is read, never modified).
+    Returns a tuple (buy_signal, exit_signal, immediate_exit, momentum_score) of NumPy arrays.
+    """
     # Validate required columns exist in the dataframe
-    required_indicator_cols = [
-        fast_ma_col, slow_ma_col, 'RSI', 'Close', 'Volume', 'High', 'Low',
-        'ATR', 'ADX', 'Volume_MA20', 'Open', 'volume_confirmed', 'weekly_uptrend'
-    ]
-    
-    missing_cols = [col for col in required_indicator_cols if col not in df.columns]
+    missing_cols = [col for col in SIGNAL_REQUIRED_COLS if col not in df.columns]
     if missing_cols:
         print(f"Warning: Missing columns for signals: {missing_cols}. Returning default signals.")
-        return signals_df
+        no_signal = np.zeros(len(df), dtype=bool)
+        return no_signal, no_signal, no_signal, np.zeros(len(df))
     
     # Extract weights, thresholds, and lookbacks from params
-    weights = params.get('weights', DEFAULT_SIGNAL_PROCESSING_PARAMS['weights'])
-    thresholds = params.get('thresholds', DEFAULT_SIGNAL_PROCESSING_PARAMS['thresholds'])
     current_ranking_lookback_window = params.get('ranking_lookback_window', DEFAULT_SIGNAL_PROCESSING_PARAMS['ranking_lookback_window'])
     current_momentum_volatility_lookback = params.get('momentum_volatility_lookback', DEFAULT_SIGNAL_PROCESSING_PARAMS['momentum_volatility_lookback'])
 
-    # Extract NumPy arrays for performance
-    close_np = df['Close'].values
-    adx_np = df['ADX'].values
-    fast_ma_np = df[fast_ma_col].values
-    slow_ma_np = df[slow_ma_col].values
-    vix_np = df['VIX'].values
-
-    # Define signal conditions
-    conditions = {
-        # Primary trend conditions
-        'trend_signal': (fast_ma_np > slow_ma_np),
-        'trend_strength_ok': adx_np > adx_threshold,
-        'vix_regime_permissive': vix_np < VIX_ENTRY_THRESHOLD
-        }
+    # Extract every condition input in one float32 block (all sources are float32), unpacked as column views
+    conditions = df[SIGNAL_CONDITION_COLS].to_numpy(np.float32).T
 
     # ---- Rank Raw Components ----
-    # Element 1 related (Trend Identification)
-    df['price_roc'] = df['price_roc_raw'].rolling(
-        window=current_ranking_lookback_window, min_periods=1).rank(pct=True).fillna(0.5)
-    df['ma_dist'] = df['ma_dist_raw'].rolling(
-        window=current_ranking_lookback_window, min_periods=1).rank(pct=True).fillna(0.5)
-    
-    # Element 2 related (Momentum Confirmation - RSI)
-    df['rsi_ideal_zone_ranked'] = df['rsi_ideal_zone_raw'].rolling(
-        window=current_ranking_lookback_window, min_periods=1).rank(pct=True).fillna(0.5)
-    
-    # Element 3 related (Trend Strength Filter - ADX)
-    df['adx_slope'] = df['adx_slope_raw'].rolling(
-        window=current_ranking_lookback_window, min_periods=1).rank(pct=True).fillna(0.5)
-    
-    # Element 4 related (Volume Confirmation)
-    df['vol_accel'] = df['vol_accel_raw'].rolling(
-        window=current_ranking_lookback_window, min_periods=1).rank(pct=True).fillna(0.5)
+    # Elements 1-5 share one lookback window, so all six components are ranked in a single batched pass:
+    # price trend (ROC, MA distance), RSI zone, ADX slope, volume acceleration and VIX factor
+    ranked = _rolling_rank_pct(df[SIGNAL_RANK_COLS].to_numpy(), current_ranking_lookback_window).T
 
     # ---- Volatility Adjustment Component ----
-    df['vol_adjustment_rank'] = df['atr_pct_raw'].rolling(
-        current_momentum_volatility_lookback, min_periods=1).rank(pct=True).fillna(0.5) # Use param
-    df['vol_adjustment'] = (1 - df['vol_adjustment_rank']).clip(0.5, 1.5)
+    vol_rank = _rolling_rank_pct(df['atr_pct_raw'].to_numpy(), current_momentum_volatility_lookback) # Use param
 
-    # Element 5 related (Market Sentiment - VIX)
-    df['vix_factor_ranked'] = df['vix_factor_raw'].rolling(
-        window=current_ranking_lookback_window, min_periods=1).rank(pct=True).fillna(0.5)
-    
+    return combine_signals(ranked, vol_rank, conditions, adx_threshold, params)
+# --------------------------------------------------------------------------------------------------------------------------
+def combine_signals(ranked, vol_rank, conditions, adx_threshold, params):
+    """
+    Momentum score and signal masks from the ranked components (SIGNAL_RANK_COLS order), the volatility rank and
+    the float32 condition inputs (SIGNAL_CONDITION_COLS order). Every step is elementwise, so the inputs can be
+    single series or (n_samples, size) batches. vol_rank is overwritten.
+    Returns a tuple (buy_signal, exit_signal, immediate_exit, momentum_score) of NumPy arrays.
+    """
+    weights = params.get('weights', DEFAULT_SIGNAL_PROCESSING_PARAMS['weights'])
+    thresholds = params.get('thresholds', DEFAULT_SIGNAL_PROCESSING_PARAMS['thresholds'])
+    adx_np, fast_ma_np, slow_ma_np, vix_np, rsi_np = conditions
+    price_roc, ma_dist, rsi_ideal_zone_ranked, adx_slope, vol_accel, vix_factor_ranked = ranked
+
+    vol_adjustment = vol_rank
+    np.subtract(1, vol_adjustment, out=vol_adjustment)
+    np.clip(vol_adjustment, 0.5, 1.5, out=vol_adjustment)
 
     # ---- Calculate Momentum Score ----
-    raw_score = (
-        weights['price_trend'] * (df['price_roc'] * 0.6 + df['ma_dist'] * 0.4) +   
-        weights['rsi_zone'] * df['rsi_ideal_zone_ranked'] +                               
-        weights['adx_slope'] * df['adx_slope'] +                        
-        weights['vol_accel'] * df['vol_accel'] +
-        weights['vix_factor'] * df['vix_factor_ranked']               
-    ) 
-    
+    # Accumulated in place into one buffer (plus one scratch array) instead of a temporary per operator;
+    # the terms are added in the same order, so the result is unchanged
+    scratch = np.empty_like(price_roc)
+    momentum_score_values = np.multiply(price_roc, 0.6)
+    momentum_score_values += np.multiply(ma_dist, 0.4, out=scratch)
+    momentum_score_values *= weights['price_trend']
+    for weight_key, component in (('rsi_zone', rsi_ideal_zone_ranked), ('adx_slope', adx_slope),
+                                  ('vol_accel', vol_accel), ('vix_factor', vix_factor_ranked)):
+        momentum_score_values += np.multiply(component, weights[weight_key], out=scratch)
+
     # Apply volatility adjustment
-    momentum_score_values = ((raw_score * df['vol_adjustment']).clip(0, 1) * 100).values
-    
-    buy_signal = (
-        (conditions['trend_signal']) &
-        (conditions['trend_strength_ok']) &
-        (conditions['vix_regime_permissive']) &
-        (momentum_score_values > thresholds['buy_score']) 
-    )
-    
-    exit_signal = (
-        (momentum_score_values < thresholds['exit_score']) | (df['RSI'].values > 70)
-    )
+    momentum_score_values *= vol_adjustment
+    np.clip(momentum_score_values, 0, 1, out=momentum_score_values)
+    momentum_score_values *= 100
     
-    immediate_exit = (
-        (momentum_score_values < thresholds['immediate_exit_score']) | 
-        (adx_np < adx_threshold/2) |
-        (df['RSI'].values > 80)
-    )
-    
-    # Assign all signals to the DataFrame
-    signals_df['buy_signal'] = buy_signal
-    signals_df['exit_signal'] = exit_signal
-    signals_df['momentum_score'] = momentum_score_values
-    signals_df['immediate_exit'] = immediate_exit
+    # ---- Signal Masks ----
+    # Each mask is combined in place; every comparison writes into one reusable scratch mask
+    mask = np.empty(momentum_score_values.shape, dtype=bool)
 
-    return signals_df
-# --------------------------------------------------------------------------------------------------------------------------
-def process_signals(signals_df, i, previous_day_atr, previous_day_adx):
-    """Extract signal processing logic to a separate function"""
-    current_date = signals_df.index[i]
-    buy_signal = signals_df['buy_signal'].iloc[i-1]
-    exit_signal = signals_df['exit_signal'].iloc[i-1]
-    immediate_exit = signals_df['immediate_exit'].iloc[i-1]
-    momentum_score = signals_df['momentum_score'].iloc[i-1]
-    
-    return {
-        'current_date': current_date,
-        'buy_signal': buy_signal,
-        'exit_signal': exit_signal,
-        'immediate_exit': immediate_exit,
-        'momentum_score': momentum_score,
-        'previous_day_atr': previous_day_atr,
-        'previous_day_adx': previous_day_adx,
-    }
-# --------------------------------------------------------------------------------------------------------------------------
-def momentum(df_with_indicators, 
-             long_risk=DEFAULT_LONG_RISK, 
-             max_positions=MAX_OPEN_POSITIONS, 
-             adx_threshold=ADX_THRESHOLD_DEFAULT, 
-             max_position_duration=MAX_POSITION_DURATION, 
-             params=None):
+    # Entry: trend up, trend strong enough, VIX regime permissive and a high enough score
+    buy_signal = np.greater(fast_ma_np, slow_ma_np)
+    buy_signal &= np.greater(adx_np, adx_threshold, out=mask)
+    buy_signal &= np.less(vix_np, VIX_ENTRY_THRESHOLD, out=mask)
+    buy_signal &= np.greater(momentum_score_values, thresholds['buy_score'], out=mask)
 
-    if df_with_indicators.empty and df_with_indicators.index.empty:
-        print("Warning: Empty dataframe (df_with_indicators) provided to momentum.")
-        return [], {}, pd.Series(dtype='float64'), pd.Series(dtype='float64')
-    
-    # --- Determine current strategy and signal parameters ---
+    exit_signal = np.less(momentum_score_values, thresholds['exit_score'])
+    exit_signal |= np.greater(rsi_np, 70, out=mask)
+
+    immediate_exit = np.less(momentum_score_values, thresholds['immediate_exit_score'])
+    immediate_exit |= np.less(adx_np, adx_threshold/2, out=mask)
+    immediate_exit |= np.greater(rsi_np, 80, out=mask)
+
+    return buy_signal, exit_signal, immediate_exit, momentum_score_values
+# --------------------------------------------------------------------------------------------------------------------------
+def strategy_params(params=None,
+                    long_risk=DEFAULT_LONG_RISK,
+                    max_positions=MAX_OPEN_POSITIONS,
+                    adx_threshold=ADX_THRESHOLD_DEFAULT,
+                    max_position_duration=MAX_POSITION_DURATION):
+    """
+    Resolve the flat parameter dict (Optuna naming) against the defaults. Returns (long_risk, max_positions,
+    adx_threshold, max_position_duration, signal_params), where signal_params is the nested dict for signals().
+    """
     current_signal_processing_params = {} # This will be the nested dict for signals()
     
-    # These will be the actual parameters used in this run of momentum
     current_long_risk = long_risk
     current_max_positions = max_positions
     current_adx_threshold = adx_threshold
@@ -561,75 +644,74 @@ def momentum(df_with_indicators,
     else: # params is None, use defaults for everything
         # Strategy parameters are already set to defaults above
         current_signal_processing_params = DEFAULT_SIGNAL_PROCESSING_PARAMS # Use the global default nested dict
-    # --- End parameter setup ---
+
+    return (current_long_risk, current_max_positions, current_adx_threshold, current_max_position_duration,
+            current_signal_processing_params)
+# --------------------------------------------------------------------------------------------------------------------------
+_FLAT_STATS = None  # trade_statistics of a zero-trade run, computed on first use
+
+def flat_result(index):
+    """momentum() result for a run that never trades: empty log, equity flat at INITIAL_CAPITAL, zero returns.
+    Its statistics depend on neither the prices nor the parameters, so they are computed once and reused."""
+    global _FLAT_STATS
+    returns_np = np.zeros(len(index))
+    equity_curve = pd.Series(np.full(len(index), INITIAL_CAPITAL), index=index)
+    returns_series = pd.Series(returns_np, index=index)
+    trade_log = TradeLog()
+    if _FLAT_STATS is None:
+        _FLAT_STATS = trade_statistics(equity_curve, trade_log, log_returns=returns_np,
+                                       max_drawdown=-0.0) # As run_momentum reports a flat curve
+
+    final_equity_value = equity_curve.iloc[-1] if not equity_curve.empty else INITIAL_CAPITAL
+    stats_dict = dict(_FLAT_STATS, **{
+        'Exit Reason Counts': {},
+        'Equity Final': final_equity_value,
+        'Open Position Value': 0.0,
+        'Total Portfolio Value': final_equity_value
+    })
+    return trade_log, stats_dict, equity_curve, returns_series
+# --------------------------------------------------------------------------------------------------------------------------
+def momentum(df_with_indicators, 
+             long_risk=DEFAULT_LONG_RISK, 
+             max_positions=MAX_OPEN_POSITIONS, 
+             adx_threshold=ADX_THRESHOLD_DEFAULT, 
+             max_position_duration=MAX_POSITION_DURATION, 
+             params=None):
+
+    if df_with_indicators.empty and df_with_indicators.index.empty:
+        print("Warning: Empty dataframe (df_with_indicators) provided to momentum.")
+        return [], {}, pd.Series(dtype='float64'), pd.Series(dtype='float64')
+    
+    # --- Determine current strategy and signal parameters ---
+    (current_long_risk, current_max_positions, current_adx_threshold, current_max_position_duration,
+     current_signal_processing_params) = strategy_params(params, long_risk, max_positions, adx_threshold, max_position_duration)
 
     # 1. Generate signals using the indicator-laden DataFrame
-    signals_df = signals(df_with_indicators.copy(), adx_threshold=current_adx_threshold, params=current_signal_processing_params)
-
-    # 2. Initialize Trade Managers and Tracking
-    trade_manager = TradeManager(INITIAL_CAPITAL, current_max_positions) 
-    equity_curve = pd.Series(INITIAL_CAPITAL, index=df_with_indicators.index)
-    returns_series = pd.Series(0.0, index=df_with_indicators.index)
-
-    # Pre-allocate numpy arrays for critical data for faster access
-    prices = df_with_indicators['Open'].values
-    atrs = df_with_indicators['ATR'].values
-    adxs = df_with_indicators['ADX'].values
-
-    # 3. Main Processing Loop
-    for i in range(1, len(df_with_indicators)):
-        transaction_price = prices[i]
-        current_date = df_with_indicators.index[i]
-
-        # Process signals for this step
-        signal_data = process_signals(signals_df, i, atrs[i-1], adxs[i-1])
-
-        # --- Exit Conditions (Priority Order) ---
-        if trade_manager.position_count > 0:
-            # 1. Check trailing stop first
-            any_trailing_stop_hit = trade_manager.trailing_stops(
-                transaction_price, current_date, signal_data['previous_day_atr'], signal_data['previous_day_adx']
-            )
-            if not any_trailing_stop_hit:
-                if signal_data['immediate_exit']:
-                    trade_manager.process_exits(current_date, transaction_price, direction_to_exit='Long', Trim=0.0, reason_override="Immediate Exit")
-                elif signal_data['exit_signal']:
-                    trim_amount = 0.05 if signal_data['momentum_score'] > 50 else 0.0
-                    reason = "Partial Exit" if trim_amount > 0 else "Exit Signal"
-                    trade_manager.process_exits(current_date, transaction_price, direction_to_exit='Long', Trim=trim_amount, reason_override=reason)
-            
-            if trade_manager.position_count > 0 and not any_trailing_stop_hit: # Re-check count
-                trade_manager.position_health( # position_health now returns a dict, but its return value isn't directly used here to alter flow
-                    transaction_price, signal_data['previous_day_atr'], current_date,  
-                    signal_data['momentum_score'], current_max_position_duration # Use determined duration
-                )
-                
-        # --- Entry Conditions ---
-        if (signal_data['buy_signal'] and trade_manager.position_count < current_max_positions):
-            entry_params = {
-                'price': transaction_price * (1 + 0.001),
-                'portfolio_value': trade_manager.portfolio_value,
-                'risk': current_long_risk, # Use determined risk
-                'atr': signal_data['previous_day_atr'],
-                'adx': signal_data['previous_day_adx']
-            }
-            trade_manager.process_entry(current_date, entry_params, direction='Long')
-        
-        # Performance Tracking
-        total_value = trade_manager.portfolio_value + trade_manager.unrealized_pnl(transaction_price)
-        equity_curve.iloc[i] = max(total_value, 1e-9)  # Ensure positive for log
-
-        # Calculate periodic log returns
-        prev_equity_val = equity_curve.iloc[i-1]
-        current_equity_val = equity_curve.iloc[i]
-        if prev_equity_val > 1e-9: # Avoid division by zero or log of zero/negative
-            returns_series.iloc[i] = np.log(current_equity_val / prev_equity_val)
-        else:
-            returns_series.iloc[i] = 0.0
+    buy_np, exit_np, immediate_np, score_np = signals(df_with_indicators, adx_threshold=current_adx_threshold, params=current_signal_processing_params)
+
+    # The kernel acts on the previous bar's buy signal; with none to act on the book never leaves cash,
+    # so the zero-trade result is returned without running the backtest
+    if not buy_np[:-1].any():
+        return flat_result(df_with_indicators.index)
+
+    # 2. Pull every per-bar input into flat arrays. The kernel works in float64 end to end, so the float32
+    #    feature columns are cast once into contiguous rows (the score is already float64 from the ranking)
+    X = feature_matrix(df_with_indicators)
+    open_np, close_np, atr_np, adx_np = np.array(X[:, KERNEL_FEATURES].T, dtype=np.float64, order='C')
+    days_np = df_with_indicators.index.asi8 // NS_PER_DAY
+
+    # 3. Main Processing Loop (compiled; see backtest_njit.run_momentum)
+    equity_np, returns_np, log_float, log_int, n_log, final_unrealized_pnl, max_drawdown = run_momentum(
+        open_np, close_np, atr_np, adx_np, days_np,
+        buy_np, exit_np, immediate_np, score_np,
+        INITIAL_CAPITAL, float(current_long_risk), int(current_max_positions),
+        int(current_max_position_duration), COMMISSION_FEES
+    )
+    equity_curve = pd.Series(equity_np, index=df_with_indicators.index)
+    returns_series = pd.Series(returns_np, index=df_with_indicators.index)
+    trade_log = TradeLog(log_float, log_int, n_log, df_with_indicators.index)
 
     # Final portfolio value calculation
-    final_close = df_with_indicators['Close'].iloc[-1] if not df_with_indicators.empty else INITIAL_CAPITAL
-    final_unrealized_pnl = trade_manager.unrealized_pnl(final_close)
     final_equity_value = equity_curve.iloc[-1] if not equity_curve.empty else INITIAL_CAPITAL
     
     # Calculate statistics
@@ -641,595 +723,126 @@ def momentum(df_with_indicators,
     
     stats_dict = trade_statistics(
         equity_curve, 
-        trade_manager.trade_log, 
-        trade_manager.wins, 
-        trade_manager.losses, 
+        trade_log, 
+        log_returns=returns_np,
+        max_drawdown=max_drawdown
     )
     stats_dict.update(final_stats)
 
-    return trade_manager.trade_log, stats_dict, equity_curve, returns_series
+    return trade_log, stats_dict, equity_curve, returns_series
 # --------------------------------------------------------------------------------------------------------------------------
-class TradeManager:
-    def __init__(self, initial_capital, max_positions):
-        self.portfolio_value = initial_capital
-        self.max_positions = max_positions
-        self.position_count = 0
-        self.allocated_capital = 0
-        self.position_counter = 0
-        self.trade_log = deque()
-        self.wins = deque()
-        self.losses = deque()
-        self.lengths = deque()
-
-        # Define column dtypes for better memory usage
-        self.dtypes = {
-            'entry_date': 'datetime64[ns]',
-            'direction': 'category', 
-            'entry_price': 'float32',
-            'stop_loss': 'float32',
-            'take_profit': 'float32',
-            'position_size': 'float32',
-            'share_amount': 'int32',
-            'highest_close_since_entry': 'float32',
-            'lowest_close_since_entry': 'float32',
-            'position_id': 'int32',
-            'remaining_shares': 'int32'
-        }
-        
-        # Initialize active trades DataFrame with proper dtypes
-        self.active_trades = pd.DataFrame(columns=self.dtypes.keys()).astype(self.dtypes)
-     # ----------------------------------------------------------------------------------------------------------
-    # ----------------------------------------------------------------------------------------------------------
-    def unrealized_pnl(self, current_price):
-        if self.active_trades.empty: return 0.0
-        pnl_values = (current_price - self.active_trades['entry_price']) * \
-                 self.active_trades['remaining_shares'] * \
-                 self.active_trades['multiplier']  # Assuming 'multiplier' column exists and is correct
-        
-        return pnl_values.sum()
-    # ----------------------------------------------------------------------------------------------------------
-    def position_health(self, current_price, current_atr, current_date, current_score, max_position_duration):
-        """
-        Assess position health and take appropriate exit actions based on analysis.
-        Returns a combined dictionary with health metrics and total PnL from any health-based exits.
-        """
-        # Initialize return value
-        total_pnl_from_health_exits = 0.0
-        
-        if self.active_trades.empty:
-            # Return empty health metrics if no positions
-            return {
-                'profit_factor': 0.0, 
-                'strength': 'none', 
-                'position_duration': {}, 
-                'take_profit_levels': {},
-                'health_pnl': total_pnl_from_health_exits
-            }
-            
-        # Cast inputs to proper types
-        current_price_np = np.float32(current_price)
-        current_atr_np = np.float32(current_atr)
-        current_score_np = np.float32(current_score)
-
-        # Calculate unrealized PnL for all active trades (vectorized)
-        unrealized_pnls_series = (
-            (current_price_np - self.active_trades['entry_price']) * 
-            self.active_trades['remaining_shares'] * 
-            self.active_trades['multiplier']
-        )
-        unrealized_pnls_sum = unrealized_pnls_series.sum()
-
-        # Calculate total initial risk for all active trades (vectorized)
-        # Assuming stop_loss is per share and fixed at entry for this calculation
-        total_initial_risk_at_entry = (
-            abs(self.active_trades['entry_price'] - self.active_trades['stop_loss'].astype(float)) * 
-            self.active_trades['share_amount'] # Use original share_amount for initial total risk
-        ).sum()
-        
-        strength_label = 'none'  # Default strength label
-        atr_pct = current_atr_np / current_price_np if current_price_np != 0 else 0.0 
-        adj_score  = current_score_np * (1.2 - 0.5 * atr_pct)  # Adjust score by ATR percentage
-        if adj_score > 75:
-            strength_label = 'hyper'
-        elif adj_score > 60:
-            strength_label = 'very_strong'
-        elif adj_score > 45:
-            strength_label = 'strong'
-        elif adj_score > 30:
-            strength_label = 'moderate'
-        else:
-            strength_label = 'weak'
-        
-        position_durations = {} # Keyed by active_trades DataFrame index
-        take_profit_levels = {} # Keyed by active_trades DataFrame index
-        
-        # Create a list of indices to iterate over, as self.active_trades can change size during iteration
-        indices_to_iterate = self.active_trades.index.tolist()
-
-        for idx in indices_to_iterate:
-            # Check if trade still exists in active_trades (it might have been removed by process_exits)
-            if idx not in self.active_trades.index:
-                continue
-            
-            trade = self.active_trades.loc[idx]
-
-            if trade['direction'] == 'Long': # Assuming only long for now
-                # Calculate duration
-                duration = 0
-                if isinstance(trade['entry_date'], pd.Timestamp) and isinstance(current_date, pd.Timestamp):
-                    duration = (current_date - trade['entry_date']).days
-                position_durations[idx] = duration
-
-                # Skip if already exited (e.g. remaining_shares became 0 from a previous health check in this same call)
-                if trade['remaining_shares'] <= 0:
-                    continue
-
-                # --- Dynamic Exit Logic ---
-                # 1. Time Exit (only if momentum faded)
-                if duration > max_position_duration:
-                    if current_score_np > 50:
-                        if idx in self.active_trades.index:
-                            pnl = self.process_exits(
-                                current_date, current_price_np, 
-                                direction_to_exit='Long',
-                                Trim=0.07,
-                                reason_override="Partial Trim"
-                            )
-                            total_pnl_from_health_exits += pnl
-                    else:
-                    # Ensure position still exists before trying to exit
-                        if idx in self.active_trades.index:
-                            pnl = self.process_exits(
-                                current_date, current_price_np, 
-                                direction_to_exit='Long',
-                                Trim=0.0, # Full exit
-                                reason_override="Max Duration"
-                            )
-                            total_pnl_from_health_exits += pnl
-                    continue # Move to next trade if this one was exited
-
-                # Calculate risk per share for R-multiple calculation
-                risk_per_share = abs(trade['entry_price'] - float(trade['stop_loss']))
-                
-                current_profit_per_share = (current_price_np - trade['entry_price'])
-                r_multiple = 0.0
-                if risk_per_share > 1e-9: # Avoid division by zero
-                    r_multiple = current_profit_per_share / risk_per_share
-                
-                # Store take profit levels keyed by DataFrame index 'idx'
-                # R-multiple targets (momentum-scaled)
-                take_profit_levels[idx] = {
-                    '1R_target': trade['entry_price'] + risk_per_share * (1 + current_score_np/100),
-                    '2R_target': trade['entry_price'] + risk_per_share * (2 + current_score_np/50),
-                    'current_r_multiple': r_multiple,
-                    # Original R levels for reference if needed
-                    'static_1R': trade['entry_price'] + risk_per_share * 1,
-                    'static_2R': trade['entry_price'] + risk_per_share * 2,
-                    'static_3R': trade['entry_price'] + risk_per_share * 3,
-                }
-        
-        # --- Portfolio-Level Profit-Taking Rules (based on overall profit factor) ---
-        # Calculate current total risk based on remaining shares and current stop losses
-        current_total_risk_active = (
-            abs(self.active_trades['entry_price'] - self.active_trades['stop_loss'].astype(float)) * 
-            self.active_trades['remaining_shares']
-        ).sum()
-
-        profit_factor_overall = unrealized_pnls_sum / current_total_risk_active if current_total_risk_active > 0 else 0.0
-
-        # Matrix-based trimming (momentum-dependent)
-        PROFIT_RULES = {
-            'hyper': {'pf_thresholds': [2.0, 3.0], 'trim_pcts': [0.1, 0.2]},
-            'very_strong': {'pf_thresholds': [1.5, 2.5], 'trim_pcts': [0.15, 0.25]},
-            'strong': {'pf_thresholds': [1.2, 2.0], 'trim_pcts': [0.2, 0.3]},
-            'moderate': {'pf_thresholds': [1.0], 'trim_pcts': [0.3]},
-            'weak': {'pf_thresholds': [0.8], 'trim_pcts': [0.5]}  # Aggressive exit
-        }
-        
-        rules = PROFIT_RULES.get(strength_label, {})
-        if not self.active_trades.empty: # Only apply if there are active trades
-            for threshold_pf, trim_pct in zip(rules.get('pf_thresholds', []), 
-                                        rules.get('trim_pcts', [])):
-                if profit_factor_overall >= threshold_pf:
-                    # This process_exits call might affect self.active_trades
-                    # It will iterate through trades and apply trimming if applicable
-                    pnl_from_trimming = self.process_exits(
-                        current_date, current_price_np,
-                        direction_to_exit='Long', # Assuming long only for now
-                        Trim=trim_pct,
-                        reason_override="Profit Take"
-                    )
-                    total_pnl_from_health_exits += pnl_from_trimming
-                    break # Apply only one rule per call
-            
-        return {
-            'profit_factor': profit_factor_overall, # Use overall profit factor
-            'strength': strength_label, 
-            'position_duration': position_durations, 
-            'take_profit_levels': take_profit_levels,
-            'health_pnl': total_pnl_from_health_exits
-        }
-    # ----------------------------------------------------------------------------------------------------------
-    def trailing_stops(self, current_price, current_date, current_atr, adx_value):
-        """
-        Simplified trailing stop implementation using vectorized operations.
-        """
-        if self.active_trades.empty:
-            return False
-
-        # Vectorized operations for performance
-        current_price_arr = np.float32(current_price)
-        current_atr_arr = np.float32(current_atr)
-        
-        # Update highest prices since entry
-        self.active_trades['highest_close_since_entry'] = np.maximum(
-            self.active_trades['highest_close_since_entry'],
-            current_price_arr
-        )
-
-        # --- 1. Dynamic ATR Multiplier Based on ADX ---
-        if adx_value < 20:  # Weak trend: tight stops
-            base_multiplier = 1.0  
-        elif 20 <= adx_value <= 40:  # Normal trend
-            base_multiplier = 2.0  
-        else:  # Strong trend (ADX > 40): wider stops
-            base_multiplier = 1.5  
-
-        # --- 2. Profit-Based Multiplier Boosts ---
-        profit_pct = ((self.active_trades['highest_close_since_entry'] - 
-                    self.active_trades['entry_price']) / self.active_trades['entry_price'])
-        
-        # Tiered profit locking (adjust thresholds as needed)
-        profit_factor = np.where(
-            profit_pct > 0.10, 1.5,  # Lock in profits aggressively after +10%
-            np.where(
-                profit_pct > 0.05, 1.2,  # Moderate locking after +5%
-                1.0  # Default
-            )
-        )
-        
-        # --- 3. Calculate Final Stops ---
-        final_multiplier = base_multiplier * profit_factor
-        new_stops = self.active_trades['highest_close_since_entry'] - (final_multiplier * current_atr)
-
-        # --- 4. Apply Stop Rules ---
-        # Rule 1: Never move stops backward
-        new_stops = np.maximum(new_stops, self.active_trades['stop_loss'])
-        
-        # Rule 2: Never risk giving back >50% of unrealized gains
-        unrealized_gains = current_price - self.active_trades['entry_price']
-        new_stops = np.where(
-            unrealized_gains > 0,
-            np.maximum(new_stops, self.active_trades['entry_price'] + (unrealized_gains * 0.65)),
-            new_stops
-        )
-
-        # Update stops
-        self.active_trades['stop_loss'] = new_stops
-        
-        # Check for exits
-        stops_hit = current_price_arr <= self.active_trades['stop_loss'].values
-        
-        if np.any(stops_hit):
-            hit_indices = np.where(stops_hit)[0]
-            total_pnl = 0.0
-
-            for idx in hit_indices:
-                if idx < len(self.active_trades):
-                    trade_idx = self.active_trades.index[idx]
-                    trade = self.active_trades.loc[trade_idx]
-
-                    pnl = self.process_exits(
-                    current_date, 
-                    current_price, 
-                    direction_to_exit='Long', 
-                    Trim=0.0,  # Full exit
-                    reason_override='Trailing Stop'
-                    )
-                    total_pnl += pnl
-            return True
-        return False
-    # ----------------------------------------------------------------------------------------------------------
-    def process_exits(self, current_date, current_price, direction_to_exit, Trim=0.0, reason_override=None): 
-
-        if self.active_trades.empty:
-            return 0.0
-
-        # Convert inputs to proper types
-        current_price = np.float32(current_price)*(1 - 0.001)
-        total_pnl = 0.0
-        
-        # Initialize removal mask
-        indices_to_remove = []
-        
-        # Get relevant trades (long only)
-        long_trades = self.active_trades[self.active_trades['direction'] == 'Long']
-        
-        for idx, trade in long_trades.iterrows():
-            current_shares = trade['remaining_shares']
-            
-            if current_shares <= 0:
-                if idx not in indices_to_remove:
-                    indices_to_remove.append(idx)
-                continue
-
-            # Priority 3: Signal-based Exits (Full or Partial)
-            base_signal_exit_reason = 'Full Signal Exit'
-            if Trim > 0.0:
-                base_signal_exit_reason = 'Partial Signal Exit'
-            
-            # Use override if provided, otherwise use base
-            final_exit_reason = reason_override if reason_override else base_signal_exit_reason
-            if Trim > 0.0:
-                # Partial exit
-                shares_to_exit = int(current_shares * Trim)
-                if shares_to_exit > 0:
-                    pnl = self.exit_pnl(
-                        trade, 
-                        current_date, 
-                        current_price,
-                        shares_to_exit, 
-                        final_exit_reason
-                    )
-                    total_pnl += pnl
-                    self.portfolio_value += pnl
-                    self.allocated_capital -= (current_price * shares_to_exit)
-                    
-                    remaining_shares = current_shares - shares_to_exit
-                    if remaining_shares > 0:
-                        self.active_trades.loc[idx, 'remaining_shares'] = remaining_shares
-                    else:
-                        indices_to_remove.append(idx)
-                        self.position_count -= 1
-            else:
-                # Full exit
-                pnl = self.exit_pnl(
-                    trade, 
-                    current_date, 
-                    current_price,
-                    current_shares, 
-                    final_exit_reason
-                )
-                total_pnl += pnl
-                self.portfolio_value += pnl
-                self.allocated_capital -= (current_price * current_shares)
-                self.position_count -= 1
-                indices_to_remove.append(idx)
-                continue
-            
-            # Priority 2: Take Profit Check
-            if pd.notna(trade['take_profit']) and current_price >= trade['take_profit']:
-                pnl = self.exit_pnl(
-                    trade, 
-                    current_date, 
-                    current_price,
-                    current_shares, 
-                    'Take Profit'
-                )
-                total_pnl += pnl
-                self.portfolio_value += pnl
-                self.allocated_capital -= (current_price * current_shares)
-                self.position_count -= 1
-                indices_to_remove.append(idx)
-                continue
-
-            # Priority 1: Stop Loss Check
-            if current_price <= trade['stop_loss']:
-                pnl = self.exit_pnl(
-                    trade, 
-                    current_date, 
-                    current_price,
-                    current_shares, 
-                    'Stop Loss'
-                )
-                total_pnl += pnl
-                self.portfolio_value += pnl
-                self.allocated_capital -= (current_price * current_shares)
-                self.position_count -= 1
-                indices_to_remove.append(idx)
-                continue
-
-        
-        # Remove closed positions
-        if indices_to_remove:
-            self.active_trades = self.active_trades.drop(index=indices_to_remove).reset_index(drop=True)
-            
-        return total_pnl
-    # ----------------------------------------------------------------------------------------------------------
-    def process_entry(self, current_date, entry_params, direction=None):
-        is_long = direction == 'Long'
-        direction_mult = 1 if is_long else -1
-
-        # --- 1. ADX-Based ATR Multiplier & Stop-Loss ---
-        adx = entry_params['adx']
-        atr = entry_params['atr']
-        
-        # Dynamic ATR Multiplier (adjust based on ADX)
-        if adx < 20:  # Weak trend: tighter stops, smaller size
-            atr_multiplier = 1.0  
-            risk_pct = entry_params['risk'] * 0.5  # Halve risk in choppy markets
-        elif 20 <= adx <= 40:  # Strong trend: default
-            atr_multiplier = 2.5  
-            risk_pct = entry_params['risk']
-        else:  # Very strong trend: secure profits faster
-            atr_multiplier = 1.5  
-            risk_pct = entry_params['risk'] * 1.2  # Slightly increase risk
-        
-        stop_distance = atr * atr_multiplier
-        initial_stop = entry_params['price'] - (stop_distance * direction_mult)
-
-        # --- 2. Position Sizing ---
-        risk_per_share = abs(entry_params['price'] - initial_stop)
-        if risk_per_share < 1e-9:
-            return False
-
-        max_risk_amount = entry_params['portfolio_value'] * risk_pct  # Now ADX-adjusted
-        shares_by_risk = int(max_risk_amount / risk_per_share)
-
-        # Cap shares by available capital and exposure
-        shares = shares_by_risk
-        position_dollar_amount = shares * entry_params['price']
-        actual_position_size = position_dollar_amount / entry_params['portfolio_value']
-
-        # Exposure check (unchanged)
-        max_total_exposure = 0.95
-        current_exposure = 0.0
-        if not self.active_trades.empty:
-            current_prices = self.active_trades['entry_price'].astype(np.float32)
-            remaining_shares = self.active_trades['remaining_shares'].astype(np.float32)
-            current_exposure = (remaining_shares * current_prices).sum() / entry_params['portfolio_value']
-
-        total_exposure = current_exposure + actual_position_size
-        if total_exposure > max_total_exposure:
-            available_exposure = max_total_exposure - current_exposure
-            if available_exposure > 0:
-                adjusted_shares = int((available_exposure * entry_params['portfolio_value']) / entry_params['price'])
-                shares = min(shares, adjusted_shares)
-                position_dollar_amount = shares * entry_params['price']
-                actual_position_size = position_dollar_amount / entry_params['portfolio_value']
-            else:
-                return False
-
-        # --- 3. Take-Profit Calculation (ADX-Boosted) ---
-        base_profit_distance = 3.0 * atr  # Default 3:1 reward:risk
-        if adx > 40:  # Strong trend: wider profit target
-            profit_multiplier = 1 + (adx / 100)  # Up to 1.4x
-        else:
-            profit_multiplier = 1.0
-
-        take_profit = entry_params['price'] + (base_profit_distance * profit_multiplier * direction_mult)
-
-        # --- 4. Final Checks ---
-        available_capital = self.portfolio_value - self.allocated_capital
-        if position_dollar_amount > available_capital or shares <= 0:
-            return False
-
-        commission = self.calculate_commission(shares, entry_params['price'])
-        min_position_value = entry_params['portfolio_value'] * 0.001
-        if position_dollar_amount < min_position_value:
-            return False
-
-        self.position_count += 1
-
-        # 5. Create Trade
-        new_trade = pd.DataFrame([{
-            'entry_date': current_date,
-            'direction': direction,
-            'multiplier': direction_mult,
-            'entry_price': entry_params['price'],
-            'stop_loss': initial_stop,
-            'take_profit': take_profit,
-            'position_size': actual_position_size,
-            'share_amount': shares,
-            'commission': commission,
-            'highest_close_since_entry': entry_params['price'] if is_long else np.nan,
-            'lowest_close_since_entry': entry_params['price'] if not is_long else np.nan,
-            'position_id': self.position_counter,  # Add position ID
-            'remaining_shares': shares  # Track initial shares
-        }])
-        
-        # Apply dtypes after creating the DataFrame
-        for col in new_trade.columns:
-            if col in self.dtypes:
-                new_trade[col] = new_trade[col].astype(self.dtypes[col])
-        
-        # Concatenate and maintain dtypes
-        if self.active_trades.empty:
-            self.active_trades = new_trade
-        else:
-            self.active_trades = pd.concat([self.active_trades, new_trade], ignore_index=True)
-        
-        self.allocated_capital += position_dollar_amount
-        self.portfolio_value -= commission
-        self.position_counter += 1
-        return True
-    # ----------------------------------------------------------------------------------------------------------    
-    def calculate_commission(self, shares, price):
-        if COMMISION:
-            # Fixed commission model
-            fixed_fee = 5.00  # $5 per trade
-            
-            # Per-share commission model
-            per_share_fee = 0.005 * shares  # 0.5 cents per share
-            
-            # Percentage-based model
-            percentage_fee = shares * price * 0.0005  # 0.1% of trade value
-            
-            # Tiered model example
-            if shares * price < 5000:
-                tiered_fee = 5.00
-            elif shares * price < 10000:
-                tiered_fee = 7.50
-            else:
-                tiered_fee = 10.00
-            
-            # Choose your model
-            commission = percentage_fee  # or per_share_fee, percentage_fee, tiered_fee
-            
-            # Add minimum commission if needed
-            return max(1.0, commission)  # Minimum $1.00 commission
-        else:
-            return 0.0
-    # ----------------------------------------------------------------------------------------------------------
-    def exit_pnl(self, trade_series, exit_date, exit_price, shares_to_exit, reason):
-        
-        entry_price = trade_series['entry_price']
-        entry_date = trade_series['entry_date']
-        trade_direction = trade_series['direction']
-        position_id = trade_series['position_id']
-        original_shares = trade_series['share_amount']
-        entry_commission = trade_series['commission']
-        exit_price = exit_price
-
-        # Calculate if this is a complete exit
-        is_complete_exit = (shares_to_exit >= trade_series['remaining_shares'])
-
-        gross_pnl = 0
-        if trade_direction == 'Long':
-            gross_pnl = (exit_price - entry_price) * shares_to_exit
-        else:  # Short
-            gross_pnl = (entry_price - exit_price) * shares_to_exit
-
-        duration = 0
-        # Ensure entry_date is a Timestamp if it's not already
-        if not isinstance(entry_date, pd.Timestamp):
-            entry_date = pd.Timestamp(entry_date)
-        if pd.notnull(entry_date) and pd.notnull(exit_date):
-            if not isinstance(exit_date, pd.Timestamp): # Ensure exit_date is also Timestamp
-                exit_date = pd.Timestamp(exit_date)
-            duration = (exit_date - entry_date).days
-        
-        self.lengths.append(duration)
-
-        exit_commission = self.calculate_commission(shares_to_exit, exit_price)
-
-        pnl_net = gross_pnl - exit_commission
+def momentum_runs(runs, workers=None):
+    """
+    Run momentum() over independent (prepared DataFrame, params) pairs on joblib's loky workers.
+    Returns the (trade_log, stats, equity_curve, returns) results in the order of `runs`.
+    The loky executor is shared with monte_carlo(), so a Full Run reuses its warm workers, and batch_size='auto'
+    lets idle workers pick up the remaining runs.
+    """
+    workers = max(1, min(workers or mp.cpu_count(), len(runs)))
+    if workers == 1:
+        return [momentum(frame, params=params) for frame, params in runs]
+    return Parallel(n_jobs=workers, backend='loky', batch_size='auto')(
+        delayed(momentum)(frame, params=params) for frame, params in runs
+    )
+# --------------------------------------------------------------------------------------------------------------------------
+DIRECTION_DTYPE = pd.CategoricalDtype(['Long', 'Short'])
+EXIT_REASON_DTYPE = pd.CategoricalDtype(list(EXIT_REASONS)) # Category codes match the kernel's exit reason codes
 
-        if pnl_net > 0:
-            self.wins.append(pnl_net)
+class TradeLog(Sequence):
+    """
+    Columnar trade log: one NumPy array per field, one entry per exit record, straight from the kernel's buffer.
+    Statistics read the columns directly; len(), iteration and indexing still yield the per-trade dicts
+    (built on demand) for code that works record by record.
+    """
+    def __init__(self, log_float=None, log_int=None, n_log=0, index=None):
+        # The kernel's log blocks are already typed (float64 money, int64 bars/shares/codes): one compact copy each
+        float_fields = log_float[:, :n_log].copy() if n_log else np.empty((N_LOG_FLOAT_FIELDS, 0))
+        int_fields = log_int[:, :n_log].copy() if n_log else np.empty((N_LOG_INT_FIELDS, 0), dtype=np.int64)
+        self.entry_price = float_fields[L_ENTRY_PRICE]
+        self.exit_price = float_fields[L_EXIT_PRICE]
+        self.pnl = float_fields[L_PNL]
+        self.gross_pnl = float_fields[L_GROSS_PNL]
+        self.entry_commission = float_fields[L_ENTRY_COMMISSION]
+        self.exit_commission = float_fields[L_EXIT_COMMISSION]
+        self.shares = int_fields[L_SHARES]
+        self.original_shares = int_fields[L_ORIGINAL_SHARES]
+        self.duration = int_fields[L_DURATION].astype(np.int32) # Calendar days
+        self.position_id = int_fields[L_POSITION_ID]
+        self.remaining = int_fields[L_REMAINING]
+        self.reason = int_fields[L_REASON].astype(np.int8) # Code into EXIT_REASONS
+        self.complete = int_fields[L_COMPLETE] > 0
+        if n_log:
+            self.entry_dates = index[int_fields[L_ENTRY_BAR]]
+            self.exit_dates = index[int_fields[L_EXIT_BAR]]
         else:
-            self.losses.append(pnl_net)
-
-        self.trade_log.append({
-            'Entry Date': entry_date,
-            'Exit Date': exit_date,
-            'Direction': trade_direction,
-            'Entry Price': entry_price,
-            'Exit Price': exit_price,
-            'Shares': shares_to_exit,
-            'Original Shares': original_shares,
-            'PnL': pnl_net, 
-            'Gross PnL': gross_pnl, 
-            'Entry Commission Initial': entry_commission, 
-            'Exit Commission Current': exit_commission, 
-            'Duration': duration,
-            'Exit Reason': reason,
-            'Position ID': position_id,
-            'Is Complete Exit': is_complete_exit,
-            'Remaining Shares': trade_series['remaining_shares'] - shares_to_exit if not is_complete_exit else 0
+            self.entry_dates = self.exit_dates = pd.DatetimeIndex([])
+
+    def __len__(self):
+        return len(self.pnl)
+
+    def __getitem__(self, j):
+        if isinstance(j, slice):
+            return [self[k] for k in range(*j.indices(len(self)))]
+        n = len(self)
+        if j < 0:
+            j += n
+        if not 0 <= j < n:
+            raise IndexError("trade log index out of range")
+        return next(self._records(j, j + 1))
+
+    def __iter__(self):
+        return self._records(0, None)
+
+    def to_frame(self):
+        """One row per exit record, Direction and Exit Reason as categoricals built straight from the int8 codes"""
+        n = len(self)
+        return pd.DataFrame({
+            'Entry Date': self.entry_dates,
+            'Exit Date': self.exit_dates,
+            'Direction': pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), dtype=DIRECTION_DTYPE),
+            'Entry Price': self.entry_price,
+            'Exit Price': self.exit_price,
+            'Shares': self.shares,
+            'Original Shares': self.original_shares,
+            'PnL': self.pnl,
+            'Gross PnL': self.gross_pnl,
+            'Entry Commission Initial': self.entry_commission,
+            'Exit Commission Current': self.exit_commission,
+            'Duration': self.duration,
+            'Exit Reason': pd.Categorical.from_codes(self.reason, dtype=EXIT_REASON_DTYPE),
+            'Position ID': self.position_id,
+            'Is Complete Exit': self.complete,
+            'Remaining Shares': self.remaining
         })
-        return pnl_net
-    # ----------------------------------------------------------------------------------------------------------
+
+    def _records(self, start, stop):
+        """Yield the trade dicts for records start:stop, converting each column to Python scalars once"""
+        columns = [col[start:stop].tolist() for col in (
+            self.entry_price, self.exit_price, self.shares, self.original_shares, self.pnl, self.gross_pnl,
+            self.entry_commission, self.exit_commission, self.duration, self.reason, self.position_id,
+            self.complete, self.remaining)]
+        for entry_date, exit_date, (entry_price, exit_price, shares, original_shares, pnl_net, gross_pnl,
+                                    entry_commission, exit_commission, duration, reason, position_id,
+                                    complete, remaining) in zip(self.entry_dates[start:stop],
+                                                                self.exit_dates[start:stop], zip(*columns)):
+            yield {
+                'Entry Date': entry_date,
+                'Exit Date': exit_date,
+                'Direction': 'Long',
+                'Entry Price': entry_price,
+                'Exit Price': exit_price,
+                'Shares': shares,
+                'Original Shares': original_shares,
+                'PnL': pnl_net, 
+                'Gross PnL': gross_pnl, 
+                'Entry Commission Initial': entry_commission, 
+                'Exit Commission Current': exit_commission, 
+                'Duration': duration,
+                'Exit Reason': EXIT_REASONS[reason],
+                'Position ID': position_id,
+                'Is Complete Exit': complete,
+                'Remaining Shares': remaining
+            }
 # --------------------------------------------------------------------------------------------------------------------------
 @jit(nopython=True)
 def risk_metrics(returns_array, risk_free_daily):
@@ -1237,58 +850,152 @@ def risk_metrics(returns_array, risk_free_daily):
     if len(returns_array) <= 1:
         return 0.0, 0.0
     
-    unique_values = np.unique(returns_array)
-    if len(unique_values) <= 1:
+    # One Welford pass gives the mean/std of all returns and of the downside returns, and spots constant series
+    first = returns_array[0]
+    all_same = True
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+    down_count = 0
+    down_mean = 0.0
+    down_m2 = 0.0
+    for i in range(returns_array.shape[0]):
+        r = returns_array[i]
+        if r != first:
+            all_same = False
+        count += 1
+        delta = r - mean
+        mean += delta / count
+        m2 += delta * (r - mean)
+        if r < 0:
+            down_count += 1
+            down_delta = r - down_mean
+            down_mean += down_delta / down_count
+            down_m2 += down_delta * (r - down_mean)
+
+    # Constant returns carry no risk information
+    if all_same:
         return 0.0, 0.0
-    
-    excess_returns = returns_array - risk_free_daily
-    returns_mean = np.mean(excess_returns)
-    returns_std = np.std(excess_returns)
+
+    # Subtracting the risk-free rate shifts the mean but leaves the spread unchanged
+    returns_mean = mean - risk_free_daily
+    returns_std = math.sqrt(m2 / count)
     
     # Sharpe Ratio with safeguards
     # Add minimum threshold for standard deviation to prevent explosion
     min_std_threshold = 1e-8  # Adjust based on your typical return values
     
     if returns_std > min_std_threshold:
-        sharpe = (returns_mean / returns_std) * np.sqrt(252)
+        sharpe = (returns_mean / returns_std) * SQRT_252
         # Bound extreme values
     else:
         # Near-zero std scenario - use sign of mean to determine direction
         sharpe = 0.0 if returns_mean == 0 else (np.sign(returns_mean) * 5.0)
     
     # Sortino Ratio with similar safeguards  
-    downside_returns = returns_array[returns_array < 0]
-    downside_std = np.std(downside_returns) if len(downside_returns) > 0 else 0
+    downside_std = math.sqrt(down_m2 / down_count) if down_count > 0 else 0.0
     
     if downside_std > min_std_threshold:
-        sortino = ((np.mean(returns_array) - risk_free_daily) / downside_std) * np.sqrt(252)
+        sortino = (returns_mean / downside_std) * SQRT_252
     else:
         sortino = 0.0 if returns_mean == 0 else (np.sign(returns_mean) * 5.0)
     
     return sharpe, sortino
 # --------------------------------------------------------------------------------------------------------------------------
-def trade_statistics(equity, trade_log, wins, losses, risk_free_rate=RISK_FREE_RATE_ANNUAL):
-    """Vectorized trade statistics calculation using NumPy and Numba"""
-    
-    # Convert lists to NumPy arrays
-    wins_array = np.array(wins, dtype=float) if wins else np.array([0.0], dtype=float)
-    losses_array = np.array(losses, dtype=float) if losses else np.array([0.0], dtype=float)
-    
-    # Basic trade statistics (vectorized)
+# Exit reasons that count towards the hit rate, by name and by code into EXIT_REASONS
+HIT_REASONS = frozenset({'Take Profit', 'Trailing Stop', 'Max Duration', 'Profit Take'})
+HIT_REASON_CODES = np.array([code for code, reason in enumerate(EXIT_REASONS) if reason in HIT_REASONS], dtype=np.int8)
+
+@jit(nopython=True, nogil=True, cache=True)
+def stats_kernel(equity, log_returns, pnl, reason, n_reasons, risk_free_daily, known_drawdown):
+    """
+    Fused trade and equity statistics: one pass over the trade PnL/reason columns and one over the equity curve.
+    log_returns may be empty, in which case they are built from equity during the drawdown pass.
+    known_drawdown is the backtest's max drawdown as a positive fraction (negative if unknown); with it and
+    log_returns both supplied the equity pass is skipped.
+    Returns (gross_profit, gross_loss, n_wins, n_losses, reason_counts, reason_first_seen,
+    max_drawdown, sharpe, sortino).
+    """
+    # Trades: PnL split and a bincount of the exit reasons (with the first record of each reason)
+    reason_counts = np.zeros(n_reasons, dtype=np.int64)
+    reason_first_seen = np.full(n_reasons, -1, dtype=np.int64)
+    gross_profit = 0.0
+    gross_loss = 0.0
+    n_wins = 0
+    for j in range(pnl.shape[0]):
+        if pnl[j] > 0:
+            gross_profit += pnl[j]
+            n_wins += 1
+        else:
+            gross_loss += pnl[j]
+        code = reason[j]
+        if reason_first_seen[code] < 0:
+            reason_first_seen[code] = j
+        reason_counts[code] += 1
+    n_losses = pnl.shape[0] - n_wins
+
+    # Equity: running peak and the deepest drawdown, non-finite drawdowns count as 0
+    size = equity.shape[0]
+    build_returns = log_returns.shape[0] != size
+    returns = np.empty(size) if build_returns else log_returns
+    min_drawdown = -known_drawdown if known_drawdown >= 0 else 0.0
+    running_max = -np.inf
+    previous_log = 0.0
+    for i in range(size if known_drawdown < 0 or build_returns else 0):
+        value = equity[i]
+        if known_drawdown < 0:
+            if value > running_max:
+                running_max = value
+            drawdown = (value - running_max) / running_max
+            if drawdown < min_drawdown and np.isfinite(drawdown):
+                min_drawdown = drawdown
+        if build_returns:
+            # Each log is taken once and carried to the next bar (epsilon avoids log(0))
+            current_log = math.log(max(value, 1e-9))
+            if i > 0:
+                returns[i] = current_log - previous_log
+            previous_log = current_log
+    max_drawdown = -min_drawdown * 100
+
+    if size > 1:
+        sharpe, sortino = risk_metrics(returns[1:], risk_free_daily)
+    else:
+        sharpe, sortino = 0.0, 0.0
+    return (gross_profit, gross_loss, n_wins, n_losses, reason_counts, reason_first_seen,
+            max_drawdown, sharpe, sortino)
+# --------------------------------------------------------------------------------------------------------------------------
+def trade_statistics(equity, trade_log, risk_free_rate=RISK_FREE_RATE_ANNUAL, log_returns=None, max_drawdown=None):
+    """Trade statistics from the fused Numba stats_kernel (trade_log: TradeLog;
+    log_returns / max_drawdown: per-bar log returns and max drawdown fraction of equity, if already known)"""
+    # Stays float64: the backtest produces float64 equity, so a float32 copy would cost a full extra pass
+    # and shift the optimiser's drawdown/Sharpe objectives for no bandwidth gain
+    equity_values = equity.to_numpy(np.float64)
+    (gross_profit, gross_loss, n_wins, n_losses, reason_counts, reason_first_seen,
+     max_drawdown, sharpe_ratio, sortino_ratio) = stats_kernel(
+        equity_values,
+        np.asarray(log_returns, dtype=np.float64) if log_returns is not None else np.empty(0), # Reuse the backtest's buffer
+        trade_log.pnl, trade_log.reason, len(EXIT_REASONS),
+        risk_free_rate / TRADING_DAYS_PER_YEAR,
+        max_drawdown if max_drawdown is not None else -1.0
+    )
+
+    # Basic trade statistics
     total_trades = len(trade_log)
-    win_rate = (len(wins) / total_trades) * 100 if total_trades > 0 else 0.0
-    
-    # Profit metrics (vectorized)
-    gross_profit = np.sum(wins_array)
-    gross_loss = np.sum(losses_array) # Note: losses_array contains non-positive PnL values
+    win_rate = (n_wins / total_trades) * 100 if total_trades > 0 else 0.0
+    hit_count = int(reason_counts[HIT_REASON_CODES].sum())
+    hit_rate = (hit_count / total_trades * 100) if total_trades > 0 else 0.0
     net_profit = gross_profit + gross_loss # gross_loss is typically negative or zero
+
+    # Exit reason counts, keyed in order of first occurrence
+    seen = np.flatnonzero(reason_counts)
+    exit_reason_counts = {EXIT_REASONS[code]: int(reason_counts[code]) for code in seen[np.argsort(reason_first_seen[seen])]}
     
-    # Portfolio metrics (vectorized)
-    initial_capital = equity.iloc[0]
-    final_capital = equity.iloc[-1]
+    # Portfolio metrics
+    initial_capital = float(equity_values[0])
+    final_capital = float(equity_values[-1])
     net_profit_pct = ((final_capital / initial_capital) - 1) * 100 if initial_capital > 0 else 0.0
     
-    # Risk metrics (vectorized)
+    # Risk metrics
     if gross_loss == 0:
         # If there are no losses (or only zero-value losses)
         profit_factor = np.inf if gross_profit > 0 else 1.0 
@@ -1297,29 +1004,13 @@ def trade_statistics(equity, trade_log, wins, losses, risk_free_rate=RISK_FREE_R
         # gross_loss is negative, so abs() is important if not already handled by convention
         profit_factor = abs(gross_profit / gross_loss) 
     
-    # Expectancy calculation (vectorized)
-    avg_win = np.mean(wins_array) if len(wins) > 0 else 0.0
-    avg_loss = np.mean(losses_array) if len(losses) > 0 else 0.0 # avg_loss will be <= 0
+    # Expectancy calculation
+    avg_win = gross_profit / n_wins if n_wins > 0 else 0.0
+    avg_loss = gross_loss / n_losses if n_losses > 0 else 0.0 # avg_loss will be <= 0
     win_prob = win_rate / 100
     expectancy = (win_prob * avg_win) + ((1 - win_prob) * avg_loss) # avg_loss is non-positive
     expectancy_pct = (expectancy / initial_capital) * 100 if initial_capital > 0 else 0.0
 
-    hit_count = 0
-    # Hit Rate calculation
-    if trade_log:
-        for trade in trade_log:
-            if 'Exit Reason' in trade:
-                if trade['Exit Reason'] in ['Take Profit', 'Trailing Stop', 'Max Duration', 'Profit Take']:
-                    hit_count += 1
-    
-    hit_rate = (hit_count / total_trades * 100) if total_trades > 0 else 0.0
-
-    exit_reason_counts = {}
-    if trade_log:
-        for trade in trade_log:
-            reason = trade.get('Exit Reason', 'Unknown') # Use .get() for safety
-            exit_reason_counts[reason] = exit_reason_counts.get(reason, 0) + 1
-
     # Average Win/Loss Ratio
     if avg_loss == 0:
         # If average loss is zero (no losing trades or all losses were PnL=0)
@@ -1329,32 +1020,17 @@ def trade_statistics(equity, trade_log, wins, losses, risk_free_rate=RISK_FREE_R
         # avg_loss is non-positive. abs() ensures positive ratio.
         avg_win_loss_ratio = abs(avg_win / avg_loss) 
     
-    # Drawdown calculation (vectorized)
-    equity_values = equity.values
-    running_max = np.maximum.accumulate(equity_values)
-    drawdowns = ((equity_values - running_max) / running_max) * 100
-    # Handle cases where running_max could be zero if initial capital is zero and first trades are losses
-    drawdowns = np.nan_to_num(drawdowns, nan=0.0, posinf=0.0, neginf=0.0)
-    max_drawdown = abs(np.min(drawdowns)) if len(drawdowns) > 0 else 0.0
-    
     # Time-based metrics
-    if len(equity.index) > 1:
-        days = (equity.index[-1] - equity.index[0]).days
-        years = days / 365.25
+    if len(equity_values) > 1:
+        index_ns = equity.index.asi8
+        days = int(index_ns[-1] - index_ns[0]) // NS_PER_DAY
+        years = days / DAYS_PER_YEAR
         annualized_return = ((final_capital / initial_capital) ** (1/years) - 1) * 100 if years > 0 and initial_capital > 0 else 0.0
     else:
         days = 0
         years = 0
         annualized_return = 0.0
 
-    # Calculate risk ratios using Numba-optimized function
-    if len(equity_values) > 1:
-        daily_returns = np.diff(np.log(np.maximum(equity_values, 1e-9))) # Add epsilon to avoid log(0)
-        daily_rf_rate = risk_free_rate / 252.0 # Ensure float division
-        sharpe_ratio, sortino_ratio = risk_metrics(daily_returns, daily_rf_rate)
-    else:
-        sharpe_ratio, sortino_ratio = 0.0, 0.0
-
     # Calculate Calmar Ratio
     if max_drawdown > 0:
         calmar_ratio = annualized_return / max_drawdown
@@ -1383,8 +1059,40 @@ def trade_statistics(equity, trade_log, wins, losses, risk_free_rate=RISK_FREE_R
 #==========================================================================================================================
 #================== OPTIMIZING STRATEGY ===================================================================================
 #==========================================================================================================================
-def objectives(trial, base_df):
-    """Objective function for Optuna optimization that directly tests parameters"""
+# Optuna search space: parameter -> (kind, low, high, step), sampled in this order
+SEARCH_SPACE = {
+    # Basic parameters
+    'long_risk': ('float', 0.02, 0.10, 0.01),
+
+    # Technical parameters
+    'max_open_positions': ('int', 2, 30, 1),
+    'adx_threshold': ('float', 20.0, 35.0, 1.0),
+    'max_position_duration': ('int', 5, 30, 1),
+
+    'weight_price_trend': ('float', 0.1, 0.4, 0.05),
+    'weight_rsi_zone': ('float', 0.1, 0.4, 0.05),
+    'weight_adx_slope': ('float', 0.1, 0.4, 0.05),
+    'weight_vol_accel': ('float', 0.1, 0.4, 0.05),
+    'weight_vix_factor': ('float', 0.1, 0.4, 0.05),
+
+    'threshold_buy_score': ('int', 45, 70, 1),
+    'threshold_exit_score': ('int', 25, 45, 1),
+    'threshold_immediate_exit_score': ('int', 15, 30, 1),
+
+    'ranking_lookback_window_opt': ('int', 20, 120, 10),
+    'momentum_volatility_lookback_opt': ('int', 10, 60, 5),
+}
+
+def _suggest_params(trial):
+    """Sample one strategy parameter set from an Optuna trial"""
+    return {
+        name: (trial.suggest_float if kind == 'float' else trial.suggest_int)(name, low, high, step=step)
+        for name, (kind, low, high, step) in SEARCH_SPACE.items()
+    }
+# -------------------------------------------------------------------------------------------------------------------------
+def _evaluate_params(optuna_params_dict, base_df, trial_num=None):
+    """Backtest one parameter set. Returns (objective values, user attributes) and needs no Optuna trial,
+    so it can run inside a worker process."""
     # Define bad metrics template
     bad_metrics_template = []
     for metric_name in OPTIMIZATION_DIRECTIONS: # Ensure order matches OPTIMIZATION_DIRECTIONS
@@ -1393,47 +1101,21 @@ def objectives(trial, base_df):
         else: # minimize
             bad_metrics_template.append(np.inf)
 
-    # Define parameter ranges for optimization
-    optuna_params_dict = {
-        # Basic parameters
-        'long_risk': trial.suggest_float('long_risk', 0.02, 0.10, step=0.01),
-        
-        # Technical parameters
-        'max_open_positions': trial.suggest_int('max_open_positions', 2, 30, step=1), # Changed step
-        'adx_threshold': trial.suggest_float('adx_threshold', 20.0, 35.0, step=1.0),
-        'max_position_duration': trial.suggest_int('max_position_duration', 5, 30, step=1), # Changed step
-
-        'weight_price_trend': trial.suggest_float('weight_price_trend', 0.1, 0.4, step=0.05),
-        'weight_rsi_zone': trial.suggest_float('weight_rsi_zone', 0.1, 0.4, step=0.05),
-        'weight_adx_slope': trial.suggest_float('weight_adx_slope', 0.1, 0.4, step=0.05),
-        'weight_vol_accel': trial.suggest_float('weight_vol_accel', 0.1, 0.4, step=0.05),
-        'weight_vix_factor': trial.suggest_float('weight_vix_factor', 0.1, 0.4, step=0.05),
-        
-        'threshold_buy_score': trial.suggest_int('threshold_buy_score', 45, 70, step=1), # Changed step
-        'threshold_exit_score': trial.suggest_int('threshold_exit_score', 25, 45, step=1), # Changed step
-        'threshold_immediate_exit_score': trial.suggest_int('threshold_immediate_exit_score', 15, 30, step=1), # Changed step
-
-        'ranking_lookback_window_opt': trial.suggest_int('ranking_lookback_window_opt', 20, 120, step=10), # Changed step
-        'momentum_volatility_lookback_opt': trial.suggest_int('momentum_volatility_lookback_opt', 10, 60, step=5) # Changed step
-    }
-    
-    # For debugging  
-    trial_num = trial.number
-
+    user_attrs = {}
     try:
         # Direct evaluation
+        # momentum() only reads the frame, so trials share base_df instead of copying it
         trade_log, stats, equity_curve, returns_series = momentum(
-            base_df.copy(), # Pass a copy
+            base_df,
             params=optuna_params_dict 
         )
         
         # Ensure stats dictionary is not None and contains all required keys
         if not stats:
-            return bad_metrics_template
+            return bad_metrics_template, user_attrs
 
         # Process metrics according to OPTIMIZATION_DIRECTIONS keys
         metrics_for_optuna = []
-        all_metrics_present = True
         for key in OPTIMIZATION_DIRECTIONS.keys():
             metric_value = np.nan
             if key == 'profit_factor':
@@ -1449,128 +1131,119 @@ def objectives(trial, base_df):
             
             if np.isnan(metric_value) or (key != 'max_drawdown' and np.isinf(metric_value) and metric_value < 0) or \
                (key == 'max_drawdown' and np.isinf(metric_value) and metric_value > 0): # Check for bad initial values
-                all_metrics_present = False
-                break
+                return bad_metrics_template, user_attrs
             metrics_for_optuna.append(metric_value)
-            trial.set_user_attr(key, metric_value) # Set user attribute for each optimized metric
-
-        if not all_metrics_present:
-            return bad_metrics_template
+            user_attrs[key] = metric_value # User attribute for each optimized metric
             
         # Store additional non-optimized attributes in trial for later analysis
-        trial.set_user_attr('num_trades', len(trade_log) if trade_log else 0)
-        trial.set_user_attr('sharpe_ratio', stats.get('Sharpe Ratio', np.nan)) # Store Sharpe for reference
-        trial.set_user_attr('return_pct', stats.get('Return (%)', np.nan)) # Store Return for reference
+        user_attrs['num_trades'] = len(trade_log) if trade_log else 0
+        user_attrs['sharpe_ratio'] = stats.get('Sharpe Ratio', np.nan) # Store Sharpe for reference
+        user_attrs['return_pct'] = stats.get('Return (%)', np.nan) # Store Return for reference
         
         avg_duration_val = np.nan
-        if trade_log:
-            durations = [t['Duration'] for t in trade_log if t.get('Duration') is not None]
-            if durations:
-                avg_duration_val = np.mean(durations)
-        trial.set_user_attr('avg_trade_duration', avg_duration_val)
-        
         total_pnl_val = np.nan
         if trade_log:
-            pnls = [t['PnL'] for t in trade_log if t.get('PnL') is not None]
-            if pnls:
-                total_pnl_val = sum(pnls)
-        trial.set_user_attr('total_pnl', total_pnl_val)
+            avg_duration_val = float(trade_log.duration.mean())
+            total_pnl_val = float(trade_log.pnl.sum())
+        user_attrs['avg_trade_duration'] = avg_duration_val
+        user_attrs['total_pnl'] = total_pnl_val
+        user_attrs['stats'] = stats # Full-series stats, reused as the Monte Carlo baseline
             
-        return metrics_for_optuna
+        return metrics_for_optuna, user_attrs
 
-    except optuna.exceptions.TrialPruned:
-        raise
     except Exception as e:
         print(f"Error in parameter evaluation for trial {trial_num}: {e}")
         traceback.print_exc()
-        return bad_metrics_template
+        return bad_metrics_template, user_attrs
+# -------------------------------------------------------------------------------------------------------------------------
+def objectives(trial, base_df):
+    """Objective function for Optuna optimization that directly tests parameters"""
+    metrics_for_optuna, user_attrs = _evaluate_params(_suggest_params(trial), base_df, trial.number)
+    for key, value in user_attrs.items():
+        trial.set_user_attr(key, value)
+    return metrics_for_optuna
+# -------------------------------------------------------------------------------------------------------------------------
+_OPTIMIZE_FRAME = None  # Prepared data attached by each optimization worker process
+_OPTIMIZE_SHM = None
+
+def _init_optimize_worker(shared_meta):
+    """ProcessPoolExecutor initializer: attach the shared prepared data once per worker"""
+    global _OPTIMIZE_FRAME, _OPTIMIZE_SHM
+    _OPTIMIZE_SHM, _OPTIMIZE_FRAME = _attach_shared_frame(shared_meta)
+# -------------------------------------------------------------------------------------------------------------------------
+def _optimize_worker(optuna_params_dict, trial_num):
+    """Evaluate one asked trial against the worker's shared prepared data"""
+    return _evaluate_params(optuna_params_dict, _OPTIMIZE_FRAME, trial_num)
 # -------------------------------------------------------------------------------------------------------------------------
 def optimize(prepared_data):
     """Optimizing function to find the best parameters for the strategy"""
     # Define optimization parameters
-    target_metrics = list(OPTIMIZATION_DIRECTIONS.keys())
+    target_metrics = OBJECTIVE_NAMES
     opt_directions = [OPTIMIZATION_DIRECTIONS[metric] for metric in target_metrics]
     n_trials=TRIALS
-    timeout=1200
+    timeout=OPTIMIZATION_TIMEOUT
 
     data = prepared_data.copy()
     if data.empty:
         print("Warning: Empty dataframe provided to optimize.")
         return None
     
+    import optuna  # Only the optimizing TYPEs need Optuna, so a TYPE 5 test run never pays for its import
     optuna.logging.set_verbosity(optuna.logging.WARNING)
 
-    # Create Optuna study with pruning
+    # Create Optuna study (multivariate TPE models parameter interactions jointly). No pruner: each trial is one
+    # full backtest scored on several objectives, and Optuna has no intermediate reports for multi-objective studies
     study = optuna.create_study(
         directions=opt_directions,  # Direction for each metric
         study_name=f"strategy_optimization",
-        pruner=optuna.pruners.HyperbandPruner(
-            min_resource=5, max_resource=n_trials, reduction_factor=3),
-        sampler=optuna.samplers.NSGAIIISampler(seed=42, population_size=60)  # Use NSGA-III for multi-objective
+        sampler=optuna.samplers.TPESampler(multivariate=True, group=True, n_startup_trials=8, seed=42)
     )
 
-    # Define the objective function
-    objective_func = partial(objectives, base_df=data)
-        
-    # Run optimization with progress bar
+    # Ask/tell loop: the sampler stays in this process while momentum() runs in worker processes, so the
+    # pandas/NumPy glue around the compiled kernels no longer serialises trials on the GIL.
+    # Workers attach the prepared data from shared memory once instead of receiving it with every trial.
+    workers = max(1, mp.cpu_count() - 1)
+    shm, shared_meta = _create_shared_frame(data)
+    start_time = time.monotonic()
     try:
-        study.optimize(objective_func, n_trials=n_trials, timeout=timeout, 
-                n_jobs=max(1, mp.cpu_count() - 1))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_optimize_worker,
+                                 initargs=(shared_meta,)) as executor:
+            pending = {}
+            asked = 0
+            while asked < n_trials or pending:
+                # Keep one trial in flight per worker until the trial budget or the timeout runs out
+                while asked < n_trials and len(pending) < workers and time.monotonic() - start_time < timeout:
+                    trial = study.ask()
+                    future = executor.submit(_optimize_worker, _suggest_params(trial), trial.number)
+                    pending[future] = trial
+                    asked += 1
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    trial = pending.pop(future)
+                    try:
+                        metrics_for_optuna, user_attrs = future.result()
+                    except Exception as e:
+                        print(f"Error in parameter evaluation for trial {trial.number}: {e}")
+                        study.tell(trial, state=optuna.trial.TrialState.FAIL)
+                        continue
+                    for key, value in user_attrs.items():
+                        trial.set_user_attr(key, value)
+                    study.tell(trial, metrics_for_optuna)
     except Exception as e:
         print(f"Optimization error: {e}")
+    finally:
+        shm.close()
+        shm.unlink()
     
-    # Get Pareto front solutions
-    all_trials = study.trials
-    # Filter out failed trials and sort by custom criteria
+    # Get Pareto front solutions first; fall back to every trial if none of them pass the filters
     filtered_trials_with_data = [] # Renamed to avoid confusion
-
-    for trial in all_trials:
-        if trial.state == optuna.trial.TrialState.COMPLETE and trial.values is not None:
-            if any(np.isinf(v) for v in trial.values): # Skip trials with inf values
-                continue
-
-            num_trades = trial.user_attrs.get('num_trades', 0)
-            # Skip trials with zero trades (already implemented based on previous request)
-            if num_trades == 0:
-                continue
-            
-            metrics_dict = {}
-            valid_trial_values = True
-            for i, key in enumerate(target_metrics): # target_metrics is list(OPTIMIZATION_DIRECTIONS.keys())
-                if i < len(trial.values):
-                    metrics_dict[key] = trial.values[i]
-                else: # Should not happen if Optuna runs correctly
-                    metrics_dict[key] = -np.inf if OPTIMIZATION_DIRECTIONS[key] == 'maximize' else np.inf
-                    valid_trial_values = False # Mark as invalid if values are missing
-            
-            if not valid_trial_values:
-                continue
-
-            combined_score = 0
-            for key in target_metrics:
-                weight = OBJECTIVE_WEIGHTS.get(key, 0)
-                value = metrics_dict.get(key, 0)
-                
-                if key == 'max_drawdown':
-                    combined_score -= weight * abs(value) 
-                else: 
-                    if key == 'profit_factor':
-                        value = min(value, 100) 
-                    combined_score += weight * value
-            
-            lower_bound_with_tolerance = TARGET_SCORE - SCORE_TOLERANCE
-            upper_bound_with_tolerance = TARGET_SCORE + SCORE_TOLERANCE
-
-            if not (lower_bound_with_tolerance <= combined_score <= upper_bound_with_tolerance):
-                # If the score is not within the target range (inclusive of tolerance), skip this trial
-                continue
-
-            # Filter: Skip trials with less than 25 trades
-            if num_trades < 25:
-                continue
-
-            # Store trial, num_trades, and combined_score (if needed)
-            filtered_trials_with_data.append({'trial': trial, 'num_trades': num_trades, 'combined_score': combined_score})
+    for candidate_trials in (study.best_trials, study.trials):
+        filtered_trials_with_data = _filter_trials(candidate_trials, target_metrics)
+        if filtered_trials_with_data:
+            break
 
     # Sort by number of trades in descending order, then by combined_score in descending order
     filtered_trials_with_data.sort(key=lambda x: (x['num_trades'], x['combined_score']), reverse=True)
@@ -1582,6 +1255,45 @@ def optimize(prepared_data):
         return []
         
     return pareto_front[:15]
+# -------------------------------------------------------------------------------------------------------------------------
+def _filter_trials(all_trials, target_metrics):
+    """Filter out failed trials and attach trade count and weighted combined score"""
+    import optuna
+    # Completed trials with every objective value and enough trades (zero-trade trials drop out here too)
+    n_metrics = len(target_metrics)
+    candidates = [trial for trial in all_trials
+                  if trial.state == optuna.trial.TrialState.COMPLETE and trial.values is not None
+                  and len(trial.values) >= n_metrics and trial.user_attrs.get('num_trades', 0) >= MIN_OPTIMIZATION_TRADES]
+    if not candidates:
+        return []
+
+    # One row of objective values per trial; rows with inf values are skipped before scoring
+    values_matrix = np.array([trial.values[:n_metrics] for trial in candidates], dtype=np.float64)
+    finite_rows = np.flatnonzero(~np.isinf(values_matrix).any(axis=1))
+    values_matrix = values_matrix[finite_rows]
+
+    # Combined score as one matrix-vector product: profit factor capped at 100, drawdown counts against the score
+    weights = np.array([OBJECTIVE_WEIGHTS.get(key, 0) for key in target_metrics], dtype=np.float64)
+    if 'profit_factor' in target_metrics:
+        col = target_metrics.index('profit_factor')
+        np.minimum(values_matrix[:, col], 100, out=values_matrix[:, col])
+    if 'max_drawdown' in target_metrics:
+        col = target_metrics.index('max_drawdown')
+        values_matrix[:, col] = -np.abs(values_matrix[:, col])
+    combined_scores = values_matrix @ weights
+
+    # Keep only scores within the target range (inclusive of tolerance)
+    lower_bound_with_tolerance = TARGET_SCORE - SCORE_TOLERANCE
+    upper_bound_with_tolerance = TARGET_SCORE + SCORE_TOLERANCE
+    in_range = (combined_scores >= lower_bound_with_tolerance) & (combined_scores <= upper_bound_with_tolerance)
+
+    # Store trial, num_trades, and combined_score (if needed)
+    filtered_trials_with_data = []
+    for row in np.flatnonzero(in_range):
+        trial = candidates[finite_rows[row]]
+        filtered_trials_with_data.append({'trial': trial, 'num_trades': trial.user_attrs['num_trades'],
+                                          'combined_score': float(combined_scores[row])})
+    return filtered_trials_with_data
 
 #==========================================================================================================================
 #================== VIEW STRATEGY =========================================================================================
@@ -1591,61 +1303,68 @@ def visualize(pareto_front, base_df):
         print("No Pareto front trials to visualize.")
         return
 
-    target_metrics_keys = list(OPTIMIZATION_DIRECTIONS.keys()) # Get the order of objectives
+    target_metrics_keys = OBJECTIVE_NAMES # Order of the objectives
     # OBJECTIVE_WEIGHTS is a global dictionary, accessible here
 
-    while True:
-        trial_metrics_display = []
-        for i, trial in enumerate(pareto_front, 1):
-            metrics_row = {'Trial': i}
-            current_trial_combined_score = 0.0 # For combined score calculation
-            
-            if trial.values: # Ensure trial.values is not None
-                for j, key in enumerate(target_metrics_keys):
-                    display_name = key.replace('_', ' ').title()
-                    value = trial.values[j]
-                    
-                    # For combined score calculation
-                    weight = OBJECTIVE_WEIGHTS.get(key, 0)
-                    
-                    if key == 'max_drawdown':
-                        display_name = 'MaxDD(%)'
-                        metrics_row[display_name] = f"{abs(value):.1f}"
-                        current_trial_combined_score -= weight * abs(value)
-                    elif key == 'avg_win_loss_ratio':
-                        display_name = 'AvgWinL(%)'
-                        metrics_row[display_name] = f"{value:.1f}"
-                        current_trial_combined_score += weight * value
-                    elif key == 'profit_factor':
-                        metrics_row[display_name] = f"{value:.2f}"
-                        value_for_score = min(value, 100) # Cap profit factor for score
-                        current_trial_combined_score += weight * value_for_score
-                    else: # For other metrics like 'expectancy'
-                        metrics_row[display_name] = f"{value:.2f}"
-                        current_trial_combined_score += weight * value
-                metrics_row['Combined Score'] = f"{current_trial_combined_score:.2f}"
-            else: # trial.values is None
-                for key in target_metrics_keys:
-                    display_name = key.replace('_', ' ').title()
-                    if key == 'max_drawdown': display_name = 'MaxDD(%)'
-                    if key == 'avg_win_loss_ratio': display_name = 'AvgWinL(%)'
-                    metrics_row[display_name] = "N/A"
-                metrics_row['Combined Score'] = "N/A"
-
-            metrics_row['Trades'] = trial.user_attrs.get('num_trades', 0)
-            trial_metrics_display.append(metrics_row)
+    trial_metrics_display = []
+    for i, trial in enumerate(pareto_front, 1):
+        metrics_row = {'Trial': i}
+        current_trial_combined_score = 0.0 # For combined score calculation
+        
+        if trial.values: # Ensure trial.values is not None
+            for j, key in enumerate(target_metrics_keys):
+                display_name = key.replace('_', ' ').title()
+                value = trial.values[j]
+                
+                # For combined score calculation
+                weight = OBJECTIVE_WEIGHTS.get(key, 0)
+                
+                if key == 'max_drawdown':
+                    display_name = 'MaxDD(%)'
+                    metrics_row[display_name] = f"{abs(value):.1f}"
+                    current_trial_combined_score -= weight * abs(value)
+                elif key == 'avg_win_loss_ratio':
+                    display_name = 'AvgWinL(%)'
+                    metrics_row[display_name] = f"{value:.1f}"
+                    current_trial_combined_score += weight * value
+                elif key == 'profit_factor':
+                    metrics_row[display_name] = f"{value:.2f}"
+                    value_for_score = min(value, 100) # Cap profit factor for score
+                    current_trial_combined_score += weight * value_for_score
+                else: # For other metrics like 'expectancy'
+                    metrics_row[display_name] = f"{value:.2f}"
+                    current_trial_combined_score += weight * value
+            metrics_row['Combined Score'] = f"{current_trial_combined_score:.2f}"
+        else: # trial.values is None
+            for key in target_metrics_keys:
+                display_name = key.replace('_', ' ').title()
+                if key == 'max_drawdown': display_name = 'MaxDD(%)'
+                if key == 'avg_win_loss_ratio': display_name = 'AvgWinL(%)'
+                metrics_row[display_name] = "N/A"
+            metrics_row['Combined Score'] = "N/A"
+
+        metrics_row['Trades'] = trial.user_attrs.get('num_trades', 0)
+        trial_metrics_display.append(metrics_row)
+
+    # The table does not change between selections, so it is rendered once and reprinted
+    if not trial_metrics_display:
+        table = "No trial metrics to display."
+    else:
+        # tabulate will use the keys from the first dictionary in trial_metrics_display as headers
+        table = tabulate(
+            trial_metrics_display,
+            headers='keys', 
+            tablefmt='grid',
+            floatfmt='.2f'
+        )
 
+    while True:
         print("\n=== Optimization Results (Pareto Front) ===")
-        if not trial_metrics_display:
-            print("No trial metrics to display.")
-        else:
-            # tabulate will use the keys from the first dictionary in trial_metrics_display as headers
-            print(tabulate(
-                trial_metrics_display,
-                headers='keys', 
-                tablefmt='grid',
-                floatfmt='.2f'
-            ))
+        print(table)
+
+        # Batch/headless runs (stdin is not a terminal) only get the table instead of blocking on input()
+        if not sys.stdin.isatty():
+            break
 
         try:
             choice = input("\nEnter trial number to test (or 'exit' to quit): ").strip().lower()
@@ -1659,12 +1378,14 @@ def visualize(pareto_front, base_df):
                 
                 print(f"\nTesting Trial {trial_num_input + 1} Parameters: {selected_trial.params}")
                 test(
-                    base_df.copy(), # Pass a copy of base_df
+                    base_df,
                     params_to_test=selected_trial.params # Pass the flat dictionary
                 )
                 input("\nPress Enter to return to trial selection...")
             else:
                 print(f"Invalid trial number. Please select 1-{len(pareto_front)}")
+        except EOFError:
+            break
         except ValueError:
             print("Invalid input. Please enter a number or 'exit'.")
         except Exception as e:
@@ -1674,7 +1395,7 @@ def visualize(pareto_front, base_df):
 # -------------------------------------------------------------------------------------------------------------------------
 def test(df_input, params_to_test=None): 
     
-    df = df_input.copy()
+    df = df_input.copy(deep=False) # Copy-on-Write: column changes here never reach the caller's frame
     
     # These will be used for display, extracted from params_to_test or defaults
     long_risk_disp = DEFAULT_LONG_RISK
@@ -1704,29 +1425,31 @@ def test(df_input, params_to_test=None):
     # Convert equity curve to returns for comparison
     df.loc[:, 'Strategy_Returns'] = returns_series.cumsum()
 
-    first_close = df['Close'].iloc[0]
-    last_close = df['Close'].iloc[-1]
+    # Scalars read once from the underlying arrays instead of repeated .iloc/.index lookups
+    close_values = df['Close'].to_numpy()
+    equity_values = equity_curve.to_numpy()
+    index_ns = df.index.asi8
+    first_close = close_values[0]
+    last_close = close_values[-1]
     buy_hold_return = ((last_close / first_close) - 1) * 100
 
-    peak_equity = equity_curve.max()
-    exposure_time = (df.index[-1] - df.index[0]).days
+    starting_equity = float(equity_values[0])
+    peak_equity = equity_values.max()
+    exposure_time = int(index_ns[-1] - index_ns[0]) // NS_PER_DAY
 
     total_entry_commission = 0
     total_exit_commission = 0
     # Extract trade metrics from trade log
     if trade_log:
-        best_trade_pct = max([t['PnL'] for t in trade_log if t['PnL'] is not None], default=0) / equity_curve.iloc[0] * 100 if equity_curve.iloc[0] !=0 else 0
-        worst_trade_pct = min([t['PnL'] for t in trade_log if t['PnL'] is not None], default=0) / equity_curve.iloc[0] * 100 if equity_curve.iloc[0] !=0 else 0
-        avg_trade_pnl_values = [t['PnL'] for t in trade_log if t['PnL'] is not None]
-        avg_trade_pct = (sum(avg_trade_pnl_values) / len(avg_trade_pnl_values) / equity_curve.iloc[0] * 100) if avg_trade_pnl_values and equity_curve.iloc[0] !=0 else 0
-
-        durations = [t['Duration'] for t in trade_log if t['Duration'] is not None]
-        max_duration = max(durations) if durations else 0
-        avg_duration = sum(durations) / len(durations) if durations else 0
+        best_trade_pct = trade_log.pnl.max() / starting_equity * 100 if starting_equity != 0 else 0
+        worst_trade_pct = trade_log.pnl.min() / starting_equity * 100 if starting_equity != 0 else 0
+        avg_trade_pct = trade_log.pnl.mean() / starting_equity * 100 if starting_equity != 0 else 0
+
+        max_duration = int(trade_log.duration.max())
+        avg_duration = trade_log.duration.mean()
         # Calculate total commissions
-        for t in trade_log:
-            total_entry_commission += t.get('Entry Commission Initial', 0) # .get for safety if key missing
-            total_exit_commission += t.get('Exit Commission Current', 0)   # .get for safety
+        total_entry_commission = trade_log.entry_commission.sum()
+        total_exit_commission = trade_log.exit_commission.sum()
     else:
         best_trade_pct = worst_trade_pct = avg_trade_pct = max_duration = avg_duration = 0
         total_entry_commission = 0
@@ -1743,10 +1466,10 @@ def test(df_input, params_to_test=None):
     print(f"Lookback Window: {params_to_test.get('ranking_lookback_window_opt', 0)} days, Momentum/Volatility Lookback: {params_to_test.get('momentum_volatility_lookback_opt', 0)} days")
     
     metrics = [
-        ["Start", f"{df.index[0].strftime('%Y-%m-%d')}"],
-        ["End", f"{df.index[-1].strftime('%Y-%m-%d')}"],
+        ["Start", f"{df.index[0]:%Y-%m-%d}"],
+        ["End", f"{df.index[-1]:%Y-%m-%d}"],
         ["Duration [days]", f"{exposure_time}"],
-        ["Starting Capital [$]", f"{equity_curve.iloc[0]:,.2f}"],
+        ["Starting Capital [$]", f"{starting_equity:,.2f}"],
         ["Ending Cash [$]", f"{stats['Equity Final']:,.2f}"],
         ["Open Position Value [$]", f"{stats['Open Position Value']:,.2f}"],
         ["Total Portfolio Value [$]", f"{stats['Total Portfolio Value']:,.2f}"],
@@ -1767,21 +1490,14 @@ def test(df_input, params_to_test=None):
         exit_reasons_data = []
         total_exits_for_percentage = sum(stats['Exit Reason Counts'].values())
         
-        # Create dictionaries to track PnL and wins by exit reason
-        pnl_by_reason = {}
-        wins_by_reason = {}
-        total_by_reason = {}
-        
-        # Calculate PnL and win counts by exit reason
-        if trade_log:
-            for trade in trade_log:
-                reason = trade.get('Exit Reason', 'Unknown') 
-                pnl = trade.get('PnL', 0.0)
-                is_win = pnl > 0
-                
-                pnl_by_reason[reason] = pnl_by_reason.get(reason, 0.0) + pnl
-                wins_by_reason[reason] = wins_by_reason.get(reason, 0) + (1 if is_win else 0)
-                total_by_reason[reason] = total_by_reason.get(reason, 0) + 1
+        # PnL, wins and trade counts per exit reason in one pass each over the reason codes
+        n_reasons = len(EXIT_REASONS)
+        pnl_totals = np.bincount(trade_log.reason, weights=trade_log.pnl, minlength=n_reasons)
+        win_totals = np.bincount(trade_log.reason, weights=trade_log.pnl > 0, minlength=n_reasons)
+        trade_totals = np.bincount(trade_log.reason, minlength=n_reasons)
+        pnl_by_reason = dict(zip(EXIT_REASONS, pnl_totals.tolist()))
+        wins_by_reason = dict(zip(EXIT_REASONS, win_totals.astype(np.int64).tolist()))
+        total_by_reason = dict(zip(EXIT_REASONS, trade_totals.tolist()))
         
         # Sort by count for better readability
         sorted_exit_reasons = sorted(stats['Exit Reason Counts'].items(), key=lambda item: item[1], reverse=True)
@@ -1831,44 +1547,46 @@ def test(df_input, params_to_test=None):
 #==========================================================================================================================
 #================== STRATEGY SIGNIFICANCE TESTING =========================================================================
 #==========================================================================================================================
-def determine_optimal_block_length(series, max_lag=50, default_block_size=BLOCK_SIZE):
+def _acf_fft(values, max_lag):
+    """Sample autocorrelations for lags 0..max_lag via one zero-padded rFFT (Wiener-Khinchin), as statsmodels' acf(fft=True)"""
+    x = values - values.mean()
+    n_fft = 1 << int(2 * len(x) - 1).bit_length() # Power of two >= 2n-1, so the circular correlation does not wrap
+    spectrum = np.fft.rfft(x, n_fft)
+    autocov = np.fft.irfft(spectrum * np.conj(spectrum), n_fft)[:max_lag + 1]
+    return autocov / autocov[0]
+# -------------------------------------------------------------------------------------------------------------------------
+def determine_optimal_block_length(values, max_lag=50, default_block_size=BLOCK_SIZE):
     """
     Determines an optimal block length for stationary bootstrap using ACF decay.
     The block length is chosen as the first lag where the ACF is no longer
     statistically significant (i.e., its confidence interval contains zero).
+    `values` is a 1-D float64 array of finite returns.
     """
-    if not isinstance(series, pd.Series):
-        print(f"Warning: Input to determine_optimal_block_length is not a Series. Type: {type(series)}. Using default: {default_block_size}")
-        return default_block_size
-    if series.empty or len(series) < max_lag + 1 or series.var() == 0: # Added variance check for constant series
+    if len(values) < max_lag + 1 or np.var(values) == 0: # Added variance check for constant series
         print(f"Warning: Series too short, empty, or constant for ACF-based block length. Using default: {default_block_size}")
         return default_block_size
 
     try:
-        # Calculate ACF and confidence intervals
-        # acf_values is a tuple: (acf_array, confint_array)
-        acf_result = acf(series, nlags=max_lag, fft=True, alpha=0.05) 
-        
-        actual_acf_values = acf_result[0]
-        confint = acf_result[1]
+        # Calculate ACF and 95% confidence intervals with Bartlett's standard errors (same bands as statsmodels' acf)
+        actual_acf_values = _acf_fft(values, max_lag)
+        bartlett_var = np.ones(max_lag + 1) / len(values)
+        bartlett_var[0] = 0.0 # Lag 0 is exact
+        bartlett_var[2:] *= 1 + 2 * np.cumsum(actual_acf_values[1:-1] ** 2)
+        half_width = ACF_CONFIDENCE_Z * np.sqrt(bartlett_var)
+        confint = np.column_stack([actual_acf_values - half_width, actual_acf_values + half_width])
 
         # We ignore lag 0 (ACF is always 1)
-        # Find the first lag k (from 1 to max_lag) where the CI for ACF_k contains 0.
-        for k in range(1, len(actual_acf_values)):
-            lower_ci_k = confint[k, 0]
-            upper_ci_k = confint[k, 1]
-            
-            # If the confidence interval for ACF at lag k contains 0,
-            # it means ACF_k is not statistically significantly different from 0.
-            if lower_ci_k <= 0 and upper_ci_k >= 0:
-                optimal_length = k
-                optimal_length = max(1, optimal_length) # Ensure min block length
-                optimal_length = min(optimal_length, max_lag) 
-                print(f"Determined optimal block length: {optimal_length} (ACF at lag {k}: {actual_acf_values[k]:.3f} is not significant, CI: [{lower_ci_k:.3f}, {upper_ci_k:.3f}])")
-                # Optional: Plot ACF for visual inspection if needed for debugging
-                # sm.graphics.tsa.plot_acf(series, lags=max_lag)
-                # plt.show() # Requires matplotlib.pyplot as plt
-                return optimal_length
+        # Find the first lag k (from 1 to max_lag) where the CI for ACF_k contains 0, i.e. ACF_k is not
+        # statistically significantly different from 0.
+        contains_zero = (confint[1:, 0] <= 0) & (confint[1:, 1] >= 0)
+        if contains_zero.any():
+            k = int(np.argmax(contains_zero)) + 1
+            optimal_length = min(max(1, k), max_lag) # Ensure min block length
+            print(f"Determined optimal block length: {optimal_length} (ACF at lag {k}: {actual_acf_values[k]:.3f} is not significant, CI: [{confint[k, 0]:.3f}, {confint[k, 1]:.3f}])")
+            # Optional: Plot ACF for visual inspection if needed for debugging
+            # sm.graphics.tsa.plot_acf(series, lags=max_lag) # Requires statsmodels.api as sm
+            # plt.show() # Requires matplotlib.pyplot as plt
+            return optimal_length
         
         print(f"Warning: ACF remained significant up to {max_lag} lags. Using max_lag: {max_lag} as block length.")
         return max_lag # Fallback if no such lag is found
@@ -1877,55 +1595,187 @@ def determine_optimal_block_length(series, max_lag=50, default_block_size=BLOCK_
         traceback.print_exc()
         return default_block_size
 # -------------------------------------------------------------------------------------------------------------------------
-def stationary_bootstrap(data, block_size, num_samples= 1000, sample_length = None, seed = None): 
-    n = len(data)
+def bootstrap_indices(n, block_size, num_samples=1000, sample_length=None, seed=None):
+    """Stationary-bootstrap source positions for num_samples resamples of a length-n series, as an int32
+    (num_samples, sample_length) array. The same seed always yields the same positions."""
     if sample_length is None:
         sample_length = n
-    
-    # Generate all random indices at once
     current_block_size = max(1, int(block_size)) # Ensure block_size is at least 1 and an integer
-    p = 1.0 / current_block_size
-    
-    all_random_starts = np.random.randint(0, n, size=(num_samples, sample_length))
-    all_random_continues = np.random.random(size=(num_samples, sample_length)) < p
+
+    # Generate all random indices at once (one seed per replicate so the kernel can run them in parallel)
+    rng = np.random.default_rng(seed)
+    replicate_seeds = rng.integers(0, 2**31 - 1, size=num_samples)
+    return block_bootstrap_indices(n, current_block_size, sample_length, num_samples, replicate_seeds)
+# -------------------------------------------------------------------------------------------------------------------------
+# Metrics tested by the Monte Carlo analysis: internal key -> trade_statistics key (column order of the simulation arrays,
+# as returned by backtest_njit.significance_metrics)
+MC_METRIC_KEYS = {
+    'profit_factor': 'Profit Factor',
+    'expectancy_pct': 'Expectancy (%)',
+    'avg_win_loss_ratio': 'Avg Win/Loss Ratio',
+    'max_drawdown': 'Max Drawdown (%)'
+}
+
+def _mc_sample_metrics(values, columns, index, rows, params):
+    """
+    Backtest one parameter set on a batch of bootstrap samples straight from the source matrix, without building
+    a DataFrame per sample. values is the float32 source (one column per name in `columns`), rows a
+    (n_samples, sample_length) array of positions into it. Every sample is dated with the source's first
+    sample_length dates (index[:sample_length]), whatever rows it was drawn from. Ranking and the backtest each run as one parallel kernel over the whole batch, with the
+    same arithmetic as momentum() on every gathered sample. Returns an (n_samples, len(MC_METRIC_KEYS)) array.
+    """
+    long_risk, max_positions, adx_threshold, max_position_duration, signal_params = strategy_params(params)
+    position = {col: j for j, col in enumerate(columns)}
+
+    def gather(cols, dtype):
+        # Cast only the needed source columns, then fancy-index them into a (samples, bars, cols) block
+        return values[:, [position[col] for col in cols]].astype(dtype)[rows]
+
+    missing_cols = [col for col in SIGNAL_REQUIRED_COLS if col not in position]
+    if missing_cols:
+        print(f"Warning: Missing columns for signals: {missing_cols}. Returning default signals.")
+        buy = np.zeros(rows.shape, dtype=bool)
+        exit_signal, immediate_exit, score = buy, buy, np.zeros(rows.shape)
+    else:
+        ranked = rolling_rank_pct_batch(gather(SIGNAL_RANK_COLS, np.float64), signal_params['ranking_lookback_window'])
+        vol_rank = rolling_rank_pct_batch(gather(['atr_pct_raw'], np.float64), signal_params['momentum_volatility_lookback'])[0]
+        conditions = np.ascontiguousarray(np.moveaxis(gather(SIGNAL_CONDITION_COLS, np.float32), 2, 0))
+        buy, exit_signal, immediate_exit, score = combine_signals(ranked, vol_rank, conditions, adx_threshold, signal_params)
+
+    open_np, close_np, atr_np, adx_np = np.ascontiguousarray(
+        np.moveaxis(gather([FEATURE_COLS[j] for j in KERNEL_FEATURES], np.float64), 2, 0))
+    days_np = index[:rows.shape[1]].astype(np.int64) // NS_PER_DAY
+    # Max drawdown is path dependent and needs the backtest anyway; the trade-moment metrics fall out of the same
+    # pass, so all of them are tested on the block-bootstrap paths (reweighting the observed trades would not
+    # save a single backtest, and would test the trades against themselves rather than against resampled markets)
+    return run_momentum_batch(
+        open_np, close_np, atr_np, adx_np, days_np,
+        buy, exit_signal, immediate_exit, score,
+        INITIAL_CAPITAL, float(long_risk), int(max_positions), int(max_position_duration), COMMISSION_FEES
+    )
+# -------------------------------------------------------------------------------------------------------------------------
+def _mc_simulate_chunk(current_full_params_for_momentum, shared_meta, indices_meta, start, stop):
+    """Run one parameter set on bootstrap samples start:stop of the shared data (runs inside a loky worker).
+    Returns a (stop - start, len(MC_METRIC_KEYS)) array of simulated metrics."""
+    shm, values = _attach_shared_array(shared_meta)
+    indices_shm, sample_indices = _attach_shared_array(indices_meta)
+    try:
+        # Every parameter set is tested on the same bootstrap samples, gathered from the shared positions
+        return _mc_sample_metrics(values, shared_meta['columns'], shared_meta['index'],
+                                  sample_indices[start:stop], current_full_params_for_momentum)
+    finally:
+        del values, sample_indices
+        shm.close()
+        indices_shm.close()
+# -------------------------------------------------------------------------------------------------------------------------
+def _mc_summarize(param_idx, current_full_params_for_momentum, observed_stats, sim_matrix):
+    """p-values, percentiles and distribution statistics of one parameter set's simulated metrics"""
+    # Get observed metrics using the mapping
+    observed_metrics = {}
+    for internal_key, original_key in MC_METRIC_KEYS.items():
+        if original_key in observed_stats:
+            observed_metrics[internal_key] = observed_stats[original_key]
+        else:
+            observed_metrics[internal_key] = np.nan
+
+    sim_metrics = {internal_key: sim_matrix[:, m] for m, internal_key in enumerate(MC_METRIC_KEYS)}
+
+    # Moments of the *finite* simulated values for every metric at once (masked column reductions).
+    # Biased estimators, as np.std / stats.skew / stats.kurtosis; degenerate spreads give NaN as in scipy.
+    # The float32 simulations are accumulated in float64 (as scipy does) so the higher moments keep their precision.
+    finite = np.isfinite(sim_matrix)
+    finite_counts = finite.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        finite_means = np.where(finite, sim_matrix, 0.0).sum(axis=0, dtype=np.float64) / finite_counts
+        deviations = np.where(finite, sim_matrix - finite_means, 0.0)
+        m2 = (deviations ** 2).sum(axis=0) / finite_counts
+        m3 = (deviations ** 3).sum(axis=0) / finite_counts
+        m4 = (deviations ** 4).sum(axis=0) / finite_counts
+        degenerate = m2 <= (np.finfo(np.float64).resolution * finite_means) ** 2
+        finite_stds = np.where(finite_counts > 1, np.sqrt(m2), np.nan) # std needs at least 2 points
+        finite_skews = np.where((finite_counts > 2) & ~degenerate, m3 / m2 ** 1.5, np.nan)
+        finite_kurts = np.where((finite_counts > 3) & ~degenerate, m4 / m2 ** 2 - 3.0, np.nan)
+    finite_means[finite_counts == 0] = np.nan
+    
+    results = {
+        'parameter_set': param_idx + 1,
+        'params': current_full_params_for_momentum,
+        'p_values': {},
+        'percentiles': {},
+        'observed_metrics': observed_metrics,
+        'simulation_metrics': {}
+    }
     
-    # Process in batches
-    bootstrap_samples = []
-    batch_size = 50  # Process 50 samples at a time to manage memory
+    # --- Observed Value Handling (Inf capped at +/-1e9 for comparison; an inf drawdown is very bad) ---
+    # Rounded to the simulations' float32 so a simulation that reproduces the observed value still compares equal
+    observed_for_comparison = np.array([observed_metrics[internal_key] for internal_key in MC_METRIC_KEYS], dtype=np.float32)
+    higher_is_better = np.array([internal_key != 'max_drawdown' for internal_key in MC_METRIC_KEYS])
+    observed_inf = np.isinf(observed_for_comparison)
+    observed_for_comparison[observed_inf] = np.where(higher_is_better & (observed_for_comparison < 0), -1e9, 1e9)[observed_inf]
+
+    # --- p-values and percentiles for every metric at once ---
+    # NaN simulations are excluded (they compare False and are left out of the counts);
+    # Inf is treated as a very large (good or bad) number.
+    cap = np.float32(1e9)
+    capped = np.where(np.isposinf(sim_matrix), cap, np.where(np.isneginf(sim_matrix), -cap, sim_matrix))
+    valid_counts = (~np.isnan(sim_matrix)).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Two comparisons give every count: NaN compares False in both, so ">=" is the valid rest of "<"
+        below = (capped < observed_for_comparison).sum(axis=0)
+        at_or_below = below + (capped == observed_for_comparison).sum(axis=0)
+        # Higher is better for all but Max Drawdown, which is positive and lower is better
+        p_values = np.where(higher_is_better, valid_counts - below, at_or_below) / valid_counts
+        # Percentile of the observed value (scipy percentileofscore, kind='rank')
+        percentiles_of_observed = (below + at_or_below + (at_or_below > below)) * 50.0 / valid_counts
+    # 5th and 95th percentiles of the simulated distribution; these include the capped infinities
+    tails = np.full((2, len(MC_METRIC_KEYS)), np.nan)
+    has_sims = valid_counts > 0
+    if has_sims.any():
+        tails[:, has_sims] = np.nanpercentile(capped[:, has_sims], [5, 95], axis=0)
+
+    for m, internal_key in enumerate(sim_metrics):
+        # --- Calculations ---
+        if np.isnan(observed_metrics[internal_key]) or valid_counts[m] == 0:
+            results['p_values'][internal_key] = np.nan
+            results['percentiles'][internal_key] = np.nan # Percentile of observed value
+            results['simulation_metrics'][internal_key] = {
+                'mean': np.nan, 'std': np.nan, 'skew': np.nan, 'kurtosis': np.nan,
+                'p5': np.nan, 'p95': np.nan
+            }
+            continue
+        
+        results['p_values'][internal_key] = p_values[m]
+        results['percentiles'][internal_key] = percentiles_of_observed[m]
+        
+        # Descriptive stats (mean, std, etc.) use only *finite* simulated values, computed above for all metrics
+        results['simulation_metrics'][internal_key] = {
+            'mean': finite_means[m],
+            'std': finite_stds[m],
+            'skew': finite_skews[m],
+            'kurtosis': finite_kurts[m],
+            'p5': tails[0, m],  # These are from the distribution including capped infinities
+            'p95': tails[1, m]
+        }
     
-    for batch_idx in range(0, num_samples, batch_size):
-        batch_end = min(batch_idx + batch_size, num_samples)
-        batch_samples = []
-        
-        for i in range(batch_idx, batch_end):
-            indices = np.zeros(sample_length, dtype=int)
-            if n == 0: # Handle empty data case
-                if isinstance(data, pd.DataFrame):
-                    batch_samples.append(pd.DataFrame(columns=data.columns, index=data.index[:0]))
-                elif isinstance(data, pd.Series):
-                     batch_samples.append(pd.Series(dtype=data.dtype, index=data.index[:0]))
-                else: # Fallback for other types, though DataFrame is expected
-                    batch_samples.append(data[:0])
-                continue
-
-            t = all_random_starts[i, 0]
-            indices[0] = t
-            
-            for j in range(1, sample_length):
-                if all_random_continues[i, j]:
-                    t = all_random_starts[i, j]
-                else:
-                    t = (t + 1) % n
-                indices[j] = t
-            
-            # Create sample more efficiently
-            bootstrap_sample = data.iloc[indices]
-            bootstrap_sample.index = data.index[:len(bootstrap_sample)] # Preserve original index type for resampling
-            batch_samples.append(bootstrap_sample)
-        
-        bootstrap_samples.extend(batch_samples)
-        
-    return bootstrap_samples
+    return results
+# -------------------------------------------------------------------------------------------------------------------------
+# Per-metric fields of the Monte Carlo summary table: "<metric>_<field>" columns next to the parameter set number
+MC_SUMMARY_FIELDS = ('observed', 'mean', 'std', 'p5', 'p95', 'p_value')
+MC_SUMMARY_DTYPE = np.dtype([('parameter_set', 'i4')] +
+                            [(f"{metric}_{field}", 'f8') for metric in MC_METRIC_KEYS for field in MC_SUMMARY_FIELDS])
+
+def _mc_summary_table(mc_results):
+    """Flatten the numeric fields of _mc_summarize results into a MC_SUMMARY_DTYPE structured array"""
+    summary = np.empty(len(mc_results), dtype=MC_SUMMARY_DTYPE)
+    for row, result in zip(summary, mc_results):
+        row['parameter_set'] = result['parameter_set']
+        for metric in MC_METRIC_KEYS:
+            sim_stats = result['simulation_metrics'][metric]
+            row[f"{metric}_observed"] = result['observed_metrics'][metric]
+            row[f"{metric}_p_value"] = result['p_values'][metric]
+            for field in ('mean', 'std', 'p5', 'p95'):
+                row[f"{metric}_{field}"] = sim_stats[field]
+    return summary
 #--------------------------------------------------------------------------------------------------------------------------  
 def monte_carlo(prepared_data, pareto_front, num_simulations=1500):
     """Monte Carlo analysis with improved statistical visualization"""
@@ -1936,195 +1786,69 @@ def monte_carlo(prepared_data, pareto_front, num_simulations=1500):
     # Convert trial parameters to proper format once
     param_sets = []
     for trial in pareto_front:
-        # Store the full flat dictionary from Optuna
-        current_full_params = trial.params.copy()
-        
-        # Ensure main strategy parameters have correct types for robustness,
-        # although Optuna usually returns correct types.
-        # The momentum function's .get() method will handle missing keys with defaults.
-        if 'long_risk' in current_full_params:
-            current_full_params['long_risk'] = float(current_full_params['long_risk'])
-        if 'max_open_positions' in current_full_params: # Optuna uses 'max_open_positions'
-            current_full_params['max_open_positions'] = int(current_full_params['max_open_positions'])
-        if 'adx_threshold' in current_full_params:
-            current_full_params['adx_threshold'] = float(current_full_params['adx_threshold'])
-        if 'max_position_duration' in current_full_params:
-            current_full_params['max_position_duration'] = int(current_full_params['max_position_duration'])
-        # Other parameters (weights, thresholds, lookbacks) will be used as is from trial.params
-        
-        param_sets.append(current_full_params)
+        # Store the full flat dictionary from Optuna; suggest_float/suggest_int already type the values, and
+        # momentum() casts the kernel scalars itself. Its .get() handles missing keys with defaults.
+        param_sets.append(trial.params.copy())
     
     # Determine optimal block length based on ACF of prepared_data returns
     dynamic_block_size = BLOCK_SIZE # Default
     if not prepared_data.empty and 'Close' in prepared_data.columns and len(prepared_data['Close']) > 1:
-        returns_for_acf = prepared_data['Close'].pct_change().dropna()
-        if not returns_for_acf.empty:
+        close = prepared_data['Close'].to_numpy(np.float64)
+        returns_for_acf = np.diff(close) / close[:-1]
+        returns_for_acf = returns_for_acf[np.isfinite(returns_for_acf)]
+        if returns_for_acf.size:
             dynamic_block_size = determine_optimal_block_length(returns_for_acf, max_lag=50, default_block_size=BLOCK_SIZE)
         else:
             print(f"Warning: Returns series for ACF calculation is empty. Using default block size: {BLOCK_SIZE}")
     else:
         print(f"Warning: 'prepared_data' is empty or lacks 'Close' column for ACF. Using default block size: {BLOCK_SIZE}")
-    
-    dynamic_block_size = 10
 
-    # Generate bootstrap samples once
+    # Draw the bootstrap positions once, then place them and the prepared data in shared memory;
+    # workers attach by name instead of regenerating the samples or unpickling the frame
     print(f"\nGenerating bootstrap samples with block_size: {dynamic_block_size}...")
-    bootstrap_samples = stationary_bootstrap(
-        data=prepared_data,
-        block_size=dynamic_block_size, # Use dynamically determined block size
-        num_samples=num_simulations,
-        sample_length=None,
-        seed=42
-    )
+    sample_indices = bootstrap_indices(len(prepared_data), dynamic_block_size, num_simulations, seed=42)
+    shm, shared_meta = _create_shared_frame(prepared_data)
+    indices_shm, indices_meta = _create_shared_array(sample_indices)
 
-    def process_parameter_set(param_idx):
-        """Process a single parameter set"""
-        current_full_params_for_momentum = param_sets[param_idx]
-        
-        # Run original strategy to get baseline performance
-        trade_log, observed_stats, _, _ = momentum(
-            prepared_data.copy(), 
-            params=current_full_params_for_momentum # Pass the full flat dictionary
-        )
-        
-        # Define a mapping from internal keys (used in this function) to original stat keys
-        metric_key_map = {
-            'profit_factor': 'Profit Factor',
-            'expectancy_pct': 'Expectancy (%)',
-            'avg_win_loss_ratio': 'Avg Win/Loss Ratio',
-            'max_drawdown': 'Max Drawdown (%)'
-        }
-        
-        # Get observed metrics using the mapping
-        observed_metrics = {}
-        for internal_key, original_key in metric_key_map.items():
-            if original_key in observed_stats:
-                observed_metrics[internal_key] = observed_stats[original_key]
-            else:
-                observed_metrics[internal_key] = np.nan
+    # Run parallel processing with progress bar
+    print(f"\nRunning Monte Carlo Analysis across {len(param_sets)} parameter sets...")
+    print(f"Total parameter sets: {total_iterations}")
 
-        sim_metrics = {internal_key: [] for internal_key in metric_key_map.keys()}
-    
-        num_bootstrap_samples = len(bootstrap_samples)
-        pbar = tqdm.tqdm(
-            total=num_bootstrap_samples,
-            desc=f"Set {param_idx+1}",
-            position=param_idx,
-            leave=True,
-            ncols=80  # Fixed width
+    # Baseline performance for every parameter set: reuse the stats optimize() stored on the trial
+    # (same prepared_data), and only backtest trials that carry none (e.g. the default-parameter mock)
+    observed_stats_per_set = [trial.user_attrs['stats'] if 'stats' in getattr(trial, 'user_attrs', {})
+                              else momentum(prepared_data, params=params)[1]
+                              for trial, params in zip(pareto_front, param_sets)]
+
+    # Work units are (parameter set, run of samples) so a small Pareto front still keeps every core busy;
+    # a few units per worker balance the load without paying IPC per sample
+    n_sets = len(param_sets)
+    chunk_size = max(1, math.ceil(n_sets * num_simulations / (4 * joblib.cpu_count())))
+    tasks = [(i, start, min(start + chunk_size, num_simulations))
+             for i in range(n_sets) for start in range(0, num_simulations, chunk_size)]
+    # float32 is ample for diagnostic metrics and halves the matrix the summaries reduce over
+    sim_matrices = np.empty((n_sets, num_simulations, len(MC_METRIC_KEYS)), dtype=np.float32)
+
+    pbar = tqdm.tqdm(total=n_sets * num_simulations, desc="Monte Carlo", ncols=80)
+    try:
+        chunk_results = Parallel(n_jobs=-1, backend='loky', return_as='generator')(
+            delayed(_mc_simulate_chunk)(param_sets[i], shared_meta, indices_meta, start, stop)
+            for i, start, stop in tasks
         )
-
-        for sample_idx, sample in enumerate(bootstrap_samples):
-            _, sim_stats_run, _, _ = momentum(
-                sample.copy(), 
-                params=current_full_params_for_momentum
-            )
-            
-            for internal_key, original_key in metric_key_map.items():
-                if original_key in sim_stats_run:
-                    sim_metrics[internal_key].append(sim_stats_run[original_key])
-                else:
-                    sim_metrics[internal_key].append(np.nan)
-            
-            pbar.update(1)
-        
+        for (i, start, stop), sim_chunk in zip(tasks, chunk_results):
+            sim_matrices[i, start:stop] = sim_chunk
+            pbar.update(stop - start)
+    finally:
         pbar.close()
-        
-        results = {
-            'parameter_set': param_idx + 1,
-            'params': current_full_params_for_momentum,
-            'p_values': {},
-            'percentiles': {},
-            'observed_metrics': observed_metrics,
-            'simulation_metrics': {}
-        }
-        
-        for internal_key in sim_metrics:
-            sim_array_raw = np.array(sim_metrics[internal_key], dtype=float)
-
-            # --- Prepare array for p-value and overall distribution percentiles (5th, 95th) ---
-            # Here, Inf is treated as a very large (good or bad) number.
-            sim_array_for_pvalue_and_percentiles = sim_array_raw[~np.isnan(sim_array_raw)]
-
-            if internal_key in ['profit_factor', 'expectancy_pct', 'avg_win_loss_ratio']: # Higher is better
-                sim_array_for_pvalue_and_percentiles[sim_array_for_pvalue_and_percentiles == np.inf] = 1e9
-                sim_array_for_pvalue_and_percentiles[sim_array_for_pvalue_and_percentiles == -np.inf] = -1e9
-            elif internal_key == 'max_drawdown': # Lower is better
-                # For max_drawdown, inf means a terrible drawdown.
-                sim_array_for_pvalue_and_percentiles[sim_array_for_pvalue_and_percentiles == np.inf] = 1e9 # Represents a very large (bad) drawdown
-                sim_array_for_pvalue_and_percentiles[sim_array_for_pvalue_and_percentiles == -np.inf] = -1e9 # Represents a very small (good) drawdown, unlikely
-            # No else needed if all relevant internal_keys are covered above
-
-            # --- Prepare array for calculating mean, std, skew, kurtosis of *finite* outcomes ---
-            sim_array_for_finite_stats = sim_array_raw[np.isfinite(sim_array_raw)] # Only finite values
-
-            # --- Observed Value Handling (similar capping for p-value comparison) ---
-            observed_value = observed_metrics.get(internal_key, np.nan)
-            observed_value_for_comparison = observed_value 
-
-            if pd.notna(observed_value_for_comparison) and np.isinf(observed_value_for_comparison):
-                if internal_key in ['profit_factor', 'expectancy_pct', 'avg_win_loss_ratio']:
-                    observed_value_for_comparison = 1e9 if observed_value_for_comparison > 0 else -1e9
-                elif internal_key == 'max_drawdown': # Max drawdown is positive
-                    observed_value_for_comparison = 1e9 # Inf drawdown is very bad
-
-            # --- Calculations ---
-            if np.isnan(observed_value) or len(sim_array_for_pvalue_and_percentiles) == 0:
-                results['p_values'][internal_key] = np.nan
-                results['percentiles'][internal_key] = np.nan # Percentile of observed value
-                results['simulation_metrics'][internal_key] = {
-                    'mean': np.nan, 'std': np.nan, 'skew': np.nan, 'kurtosis': np.nan,
-                    'p5': np.nan, 'p95': np.nan
-                }
-                continue
-            
-            # Calculate p-value using the array where Inf is capped
-            if internal_key in ['profit_factor', 'expectancy_pct', 'avg_win_loss_ratio']: # Higher is better
-                p_value = np.mean(sim_array_for_pvalue_and_percentiles >= observed_value_for_comparison)
-            elif internal_key == 'max_drawdown':  # Lower is better (Max Drawdown is positive)
-                p_value = np.mean(sim_array_for_pvalue_and_percentiles <= observed_value_for_comparison)
-            else: 
-                p_value = np.nan
-            
-            # Calculate percentile of observed value using the array where Inf is capped
-            percentile_of_observed = stats.percentileofscore(sim_array_for_pvalue_and_percentiles, observed_value_for_comparison)
-            
-            # Calculate 5th and 95th percentiles of the simulated distribution (where Inf is capped)
-            # These reflect the spread of the distribution including extreme (capped inf) values.
-            p5 = np.percentile(sim_array_for_pvalue_and_percentiles, 5) if len(sim_array_for_pvalue_and_percentiles) > 0 else np.nan
-            p95 = np.percentile(sim_array_for_pvalue_and_percentiles, 95) if len(sim_array_for_pvalue_and_percentiles) > 0 else np.nan
-            
-            results['p_values'][internal_key] = p_value
-            results['percentiles'][internal_key] = percentile_of_observed
-            
-            # Calculate descriptive stats (mean, std, etc.) using only *finite* simulated values
-            mean_finite = np.mean(sim_array_for_finite_stats) if len(sim_array_for_finite_stats) > 0 else np.nan
-            std_finite = np.std(sim_array_for_finite_stats) if len(sim_array_for_finite_stats) > 1 else np.nan # std needs at least 2 points
-            skew_finite = stats.skew(sim_array_for_finite_stats) if len(sim_array_for_finite_stats) > 2 else np.nan
-            kurt_finite = stats.kurtosis(sim_array_for_finite_stats) if len(sim_array_for_finite_stats) > 3 else np.nan
+        for block in (shm, indices_shm):
+            block.close()
+            block.unlink()
 
-            results['simulation_metrics'][internal_key] = {
-                'mean': mean_finite,
-                'std': std_finite,
-                'skew': skew_finite,
-                'kurtosis': kurt_finite,
-                'p5': p5,  # These are from the distribution including capped infinities
-                'p95': p95
-            }
-        
-        return results
-    
-    # Run parallel processing with progress bar
-    print(f"\nRunning Monte Carlo Analysis across {len(param_sets)} parameter sets...")
-    print(f"Total parameter sets: {total_iterations}")
-    
-    mc_results = Parallel(n_jobs=-1)(
-        delayed(process_parameter_set)(i) 
-        for i in range(len(param_sets))
-    )
+    mc_results = [_mc_summarize(i, param_sets[i], observed_stats_per_set[i], sim_matrices[i]) for i in range(n_sets)]
         
-    # Convert results to DataFrame for analysis
-    results_df = pd.DataFrame(mc_results)
+    # Numeric summary fields as one typed record per parameter set; the printed tables read these columns
+    summary = _mc_summary_table(mc_results)
+    metric_keys_for_summary = list(MC_METRIC_KEYS)
     
     # Print new formatted summary statistics
     print("\n=== BOOTSTRAP MONTE CARLO RESULTS ===")
@@ -2136,26 +1860,23 @@ def monte_carlo(prepared_data, pareto_front, num_simulations=1500):
     
     # Additional data for summary
     total_obs_metrics = {}
-    metric_keys_for_summary = ['profit_factor', 'expectancy_pct', 'avg_win_loss_ratio', 'max_drawdown']
     for metric in metric_keys_for_summary:
-        values = [result['observed_metrics'][metric] for result in mc_results 
-                  if pd.notna(result['observed_metrics'].get(metric))] # Use .get for safety
-        if values:
-            total_obs_metrics[metric] = np.mean(values)
+        observed = summary[f"{metric}_observed"]
+        if not np.isnan(observed).all():
+            total_obs_metrics[metric] = np.nanmean(observed)
     
     if all(metric in total_obs_metrics for metric in metric_keys_for_summary):
         print(f"   - Avg Observed Profit Factor: {total_obs_metrics['profit_factor']:.2f} | " + f"Avg Observed Win/Loss Ration: {total_obs_metrics['avg_win_loss_ratio']:.2f} | " + f"Avg Observed Expectancy: {total_obs_metrics['expectancy_pct']:.2f}% | " + 
               f"Max DD: {total_obs_metrics['max_drawdown']:.2f}%")
     
-    # Get significant metric counts
+    # Get significant metric counts (NaN p-values compare False, so they count as not significant)
     sig_counts_p_lt_0_10 = {}
     marg_sig_counts_p_lt_0_20 = {}
 
     for metric in metric_keys_for_summary:
-        sig_counts_p_lt_0_10[metric] = sum(1 for result in mc_results
-                                     if result['p_values'].get(metric, 1.0) < 0.10)
-        marg_sig_counts_p_lt_0_20[metric] = sum(1 for result in mc_results
-                                          if 0.10 <= result['p_values'].get(metric, 1.0) < 0.20)
+        p_values = summary[f"{metric}_p_value"]
+        sig_counts_p_lt_0_10[metric] = int((p_values < 0.10).sum())
+        marg_sig_counts_p_lt_0_20[metric] = int(((p_values >= 0.10) & (p_values < 0.20)).sum())
     
     print(f"   - Significant Results (p<0.10): " + 
           f"PF: {sig_counts_p_lt_0_10.get('profit_factor',0)}/{len(mc_results)}, " +
@@ -2180,30 +1901,14 @@ def monte_carlo(prepared_data, pareto_front, num_simulations=1500):
     for metric_num, metric in enumerate(metric_keys_for_summary, 2):
         print(f"\n{metric_num}. Null Distribution - {metric_display_names[metric]}:")
         
-        # Create table data for this metric
-        table_data = []
+        # Create table data for this metric (sets whose observed value is NaN are left out)
         headers = ['Set', 'Observed', 'Mean', 'Std Dev', '5th %ile', '95th %ile', 'p-value']
-        
-        for result in mc_results:
-            param_set = result['parameter_set']
-            observed = result['observed_metrics'].get(metric, np.nan)
-            sim_stats = result['simulation_metrics'].get(metric, {})
-            
-            if not sim_stats or np.isnan(observed): # Check if sim_stats is empty or observed is NaN
-                continue
-                
-            p_value = result['p_values'].get(metric, np.nan)
-            
-            row = [
-                f"{param_set}",
-                f"{observed:.2f}",
-                f"{sim_stats.get('mean', np.nan):.2f}",
-                f"{sim_stats.get('std', np.nan):.2f}",
-                f"{sim_stats.get('p5', np.nan):.2f}",
-                f"{sim_stats.get('p95', np.nan):.2f}",
-                f"{p_value:.3f}"
-            ]
-            table_data.append(row)
+        columns = [summary[f"{metric}_{field}"] for field in MC_SUMMARY_FIELDS]
+        table_data = [
+            [f"{param_set}", f"{observed:.2f}", f"{mean:.2f}", f"{std:.2f}", f"{p5:.2f}", f"{p95:.2f}", f"{p_value:.3f}"]
+            for param_set, observed, mean, std, p5, p95, p_value in zip(summary['parameter_set'].tolist(), *(col.tolist() for col in columns))
+            if not np.isnan(observed)
+        ]
         
         # Print table for this metric
         if table_data:
@@ -2211,132 +1916,246 @@ def monte_carlo(prepared_data, pareto_front, num_simulations=1500):
         else:
             print("   No valid simulation data available for this metric")
     
-    # Find best parameter set overall (lowest combined p-values)
+    # Find best parameter set overall (lowest combined p-values, a missing p-value counts as 1.0)
     if mc_results:
-        p_value_sums = []
-        for res in mc_results:
-            current_sum = 0
-            for key in metric_keys_for_summary: # Use the same keys for consistency
-                p_val = res['p_values'].get(key, 1.0) # Default to 1.0 if missing
-                current_sum += float(p_val) if pd.notna(p_val) else 1.0
-            p_value_sums.append(current_sum)
-
-        if p_value_sums:
-            best_set_idx = np.argmin(p_value_sums)
-            best_set_result = mc_results[best_set_idx]
-            best_set_num = best_set_result['parameter_set']
+        p_value_matrix = np.column_stack([summary[f"{metric}_p_value"] for metric in metric_keys_for_summary])
+        p_value_sums = np.where(np.isnan(p_value_matrix), 1.0, p_value_matrix).sum(axis=1)
+        best_set_row = summary[np.argmin(p_value_sums)]
+        best_set_num = best_set_row['parameter_set']
+        
+        print(f"\nBest Overall Parameter Set (by sum of p-values): #{best_set_num}")
+        print("Key Performance Metrics:")
+        
+        best_metrics_table = []
+        for metric in metric_keys_for_summary:
+            observed = best_set_row[f"{metric}_observed"]
+            p_val = best_set_row[f"{metric}_p_value"]
+            sim_mean = best_set_row[f"{metric}_mean"]
             
-            print(f"\nBest Overall Parameter Set (by sum of p-values): #{best_set_num}")
-            print("Key Performance Metrics:")
-            
-            best_metrics_table = []
-            for metric in metric_keys_for_summary:
-                observed = best_set_result['observed_metrics'].get(metric, np.nan)
-                p_val = best_set_result['p_values'].get(metric, np.nan)
-                sim_mean = best_set_result['simulation_metrics'].get(metric, {}).get('mean', np.nan)
-                
-                sig_marker = ''
-                if pd.notna(p_val):
-                    p_val_float = float(p_val)
-                    if p_val_float < 0.10:
-                        sig_marker = '*'  # Significant
-                    elif 0.10 <= p_val_float < 0.20:
-                        sig_marker = '~'  # Marginally Significant
-                
-                best_metrics_table.append([
-                    f"{metric_display_names[metric]}{sig_marker}", 
-                    f"{observed:.2f}",
-                    f"{sim_mean:.2f}",
-                    f"{observed - sim_mean:.2f}" if pd.notna(observed) and pd.notna(sim_mean) else "N/A"
-                ])
+            sig_marker = ''
+            if p_val < 0.10:
+                sig_marker = '*'  # Significant
+            elif 0.10 <= p_val < 0.20:
+                sig_marker = '~'  # Marginally Significant
             
-            print(tabulate(best_metrics_table, headers=['Metric', 'Observed', 'Sim Mean', 'Edge'], tablefmt='simple'))
-        else:
-            print("   Could not determine best parameter set due to missing p-value data.")
+            best_metrics_table.append([
+                f"{metric_display_names[metric]}{sig_marker}", 
+                f"{observed:.2f}",
+                f"{sim_mean:.2f}",
+                f"{observed - sim_mean:.2f}" if not (np.isnan(observed) or np.isnan(sim_mean)) else "N/A"
+            ])
+        
+        print(tabulate(best_metrics_table, headers=['Metric', 'Observed', 'Sim Mean', 'Edge'], tablefmt='simple'))
     
+    # Full per-set results (nested p-value/metric dicts) for the callers; every row's 'p_values' is a dict
+    # (built in _mc_summarize), so callers only need to check the columns exist
+    results_df = pd.DataFrame(mc_results)
     return results_df
+# -------------------------------------------------------------------------------------------------------------------------
+def _pvals_matrix(p_values):
+    """Stack a column of {metric: p-value} dicts into a (rows, metrics) float64 array (NaN where a metric is missing).
+    json_normalize turns the dicts into one column per metric in a single pass. Returns (matrix, metric names)."""
+    p_frame = pd.json_normalize(list(p_values))
+    return p_frame.to_numpy(np.float64, na_value=np.nan), list(p_frame.columns)
+# -------------------------------------------------------------------------------------------------------------------------
+def _select_best_mc(mc_results_df):
+    """Parameters of the Monte Carlo set with the lowest sum of p-values, and whether any of its p-values is
+    significant (< 0.10) or marginally significant (0.10-0.20). A missing (NaN) p-value counts as 1.0 in the sum,
+    the same rule monte_carlo uses for its "Best Overall Parameter Set", and fails every significance comparison.
+    Returns (params, is_significant, is_marginally_significant)."""
+    p_matrix, _ = _pvals_matrix(mc_results_df['p_values'])
+    best = int(np.argmin(np.where(np.isnan(p_matrix), 1.0, p_matrix).sum(axis=1)))
+    best_p = p_matrix[best]
+    return mc_results_df['params'].iloc[best], bool(np.any(best_p < 0.10)), bool(np.any((best_p >= 0.10) & (best_p < 0.20)))
 
 #==========================================================================================================================
 #================== STRATEGY ROBUSTNESS TESTING ===========================================================================
 #==========================================================================================================================
-def walk_forward_analysis(initial_is_data_raw, full_oos_data_raw, initial_parameters, risk_free_annual=RISK_FREE_RATE_ANNUAL):
+@jit(nopython=True, cache=True)
+def _oos_metrics(log_returns, risk_free_daily, state):
+    """
+    Streaming pass over one OOS chunk's log returns, continuing the state of the chunks before it.
+    state is (active_days, count, mean_excess, m2_excess, total_log_return, running_max, max_drawdown_pct): the non-zero
+    return count, the Welford mean and sum of squared deviations of the excess returns, the summed log return, and the
+    peak and deepest drawdown (%, <= 0) of the compounded curve; start from OOS_METRICS_START. Returns the updated state.
+    """
+    active_days, count, mean, m2, cumulative, running_max, max_drawdown_pct = state
+    for i in range(log_returns.shape[0]):
+        r = log_returns[i]
+        if r != 0:
+            active_days += 1
+        count += 1
+        delta = (r - risk_free_daily) - mean
+        mean += delta / count
+        m2 += delta * ((r - risk_free_daily) - mean)
+
+        # Drawdown of the compounded return curve relative to its running peak
+        cumulative += r
+        growth = math.expm1(cumulative)
+        if growth > running_max:
+            running_max = growth
+        drawdown = (growth - running_max) / (running_max + 1) * 100
+        if drawdown < max_drawdown_pct:
+            max_drawdown_pct = drawdown
+    return active_days, count, mean, m2, cumulative, running_max, max_drawdown_pct
+
+OOS_METRICS_START = (0, 0, 0.0, 0.0, 0.0, -np.inf, np.inf)
+# -------------------------------------------------------------------------------------------------------------------------
+# Summary classifications: a value gets the label of the number of bin edges it strictly exceeds
+_DECAY_BINS = np.array([0.1, 0.3, 0.5, 0.7])
+_DECAY_LABELS = np.array(["MINIMAL", "MODERATE", "SIGNIFICANT", "SEVERE", "CATASTROPHIC"])
+_DECAY_VOL_BINS = np.array([0.1, 0.2, 0.4])
+_DECAY_VOL_LABELS = np.array(["STABLE", "MODERATE VOLATILITY", "HIGH VOLATILITY", "EXTREME VOLATILITY"])
+_MARKET_BINS = np.array([-20.0, -5.0, 20.0, 50.0]) # Cumulative OOS return (%)
+_MARKET_LABELS = np.array(["HIGHLY ADVERSE", "CHALLENGING", "NEUTRAL", "FAVORABLE", "HIGHLY FAVORABLE"])
+_ZERO_TRADE_RISK_BINS = np.array([20.0, 40.0]) # Share of zero-trade windows (%)
+_ZERO_TRADE_RISK_LABELS = np.array(["LOW RISK", "MODERATE RISK", "HIGH RISK"])
+
+def _classify(value, bins, labels):
+    """Label for value from ascending bin edges (searchsorted counts the edges strictly below it).
+    NaN gets the lowest label, as it fails every '>' test."""
+    return str(labels[0] if np.isnan(value) else labels[np.searchsorted(bins, value)])
+# -------------------------------------------------------------------------------------------------------------------------
+@lru_cache(maxsize=1)
+def _source_fingerprint():
+    """SHA-1 digest of this module and the Numba kernel sources; editing the strategy invalidates cached results"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    key = hashlib.sha1()
+    for path in (os.path.abspath(__file__), os.path.join(here, "backtest_njit.py"), os.path.join(here, "indicators_njit.py")):
+        with open(path, 'rb') as f:
+            key.update(f.read())
+    return key.digest()
+# -------------------------------------------------------------------------------------------------------------------------
+def optimize_cached(prepared_data):
+    """Pareto front of optimize(prepared_data) ([] if it finds none).
+    Memoized on disk (unless OPTIMIZE_CACHE is off) by a SHA-1 of the whole prepared frame, the search and
+    filter settings and the strategy source, so re-running the same experiment (or walk-forward training
+    window) skips the Optuna search entirely, while any change to the data, settings or code re-optimizes."""
+    if not OPTIMIZE_CACHE:
+        return optimize(prepared_data) or []
+
+    key = _frame_fingerprint(prepared_data)
+    key.update(repr((OPTIMIZE_CACHE_VERSION, TRIALS, OPTIMIZATION_DIRECTIONS, OBJECTIVE_WEIGHTS, TARGET_SCORE,
+                     SCORE_TOLERANCE, MIN_OPTIMIZATION_TRADES, OPTIMIZATION_TIMEOUT, SEARCH_SPACE)).encode())
+    key.update(_source_fingerprint())
+    cache_path = os.path.join(OPTIMIZE_CACHE_DIR, f"{key.hexdigest()}.pkl")
+
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)['pareto_front']
+        except Exception as e:
+            print(f"Could not read optimization cache {cache_path}. Re-optimizing. Error: {e}")
+
+    # An empty search is cached too: it would come out empty again on the same data
+    pareto_front = optimize(prepared_data) or []
+
+    try:
+        os.makedirs(OPTIMIZE_CACHE_DIR, exist_ok=True)
+        with open(cache_path, 'wb') as f:
+            pickle.dump({'pareto_front': pareto_front}, f)
+    except Exception as e:
+        print(f"Could not write optimization cache {cache_path}. Error: {e}")
+    return pareto_front
+# -------------------------------------------------------------------------------------------------------------------------
+def _optimize_best_params(prepared_data):
+    """Best-trial parameters of optimize_cached(prepared_data), or None if it finds none"""
+    pareto_front = optimize_cached(prepared_data)
+    return pareto_front[0].params if pareto_front else None
+# -------------------------------------------------------------------------------------------------------------------------
+def _compute_folds(n_available, window_size):
+    """Start/end positions (int64) of the consecutive full OOS windows that fit in the first n_available rows"""
+    n_folds = n_available // window_size if window_size > 0 else 0
+    fold_starts = np.arange(n_folds, dtype=np.int64) * window_size
+    return fold_starts, fold_starts + window_size
+# -------------------------------------------------------------------------------------------------------------------------
+# Per-step fields kept out of the step results DataFrame (TradeLog and dict values)
+_STEP_OBJECT_FIELDS = ('oos_trade_log', 'parameters_used_snapshot')
+
+def walk_forward_analysis(initial_is_data_raw, full_oos_data_raw, initial_parameters, risk_free_annual=RISK_FREE_RATE_ANNUAL,
+                          prepared_data=None):
     
     # Global constants from your script parameters
     oos_window_size = OOS_WINDOW
     opt_frequency_days = OPTIMIZATION_FREQUENCY # Days of OOS data to process before re-optimizing
-    daily_rf_rate = risk_free_annual / 252.0
+    daily_rf_rate = risk_free_annual / TRADING_DAYS_PER_YEAR
     days_in_is_lookback = 252 * 3 # Approx 3 years for the sliding IS window part
 
     # Initialize active parameters with the initial set
     active_parameters_for_momentum = initial_parameters.copy()
     
-    combined_raw_data = pd.concat([initial_is_data_raw, full_oos_data_raw])
-    prepared_full_data = prepare_data(combined_raw_data.copy(), type=2)
+    # Callers that already hold the prepared IS+OOS frame (e.g. parameter sweeps) pass it in; otherwise it is built
+    # here, and prepare_data's indicator cache still serves repeated runs over the same raw data
+    if prepared_data is None:
+        prepared_full_data = prepare_data(pd.concat([initial_is_data_raw, full_oos_data_raw]), type=2)
+    else:
+        prepared_full_data = prepared_data
 
     # This will store the raw training data used for the *last* optimization
     # Initially, it's the full initial in-sample data
-    training_data_at_last_optimization_raw = initial_is_data_raw.copy()
+    training_data_at_last_optimization_raw = initial_is_data_raw
     
     # Get the prepared version of the initial training data from the fully prepared data
     if not initial_is_data_raw.empty:
-        print(f"Slicing initial prepared training data: {initial_is_data_raw.index.min().date()} to {initial_is_data_raw.index.max().date()} ({len(initial_is_data_raw)} days)")
-        prepared_current_train = prepared_full_data.loc[initial_is_data_raw.index.min():initial_is_data_raw.index.max()].copy()
+        logger.info(f"Slicing initial prepared training data: {initial_is_data_raw.index.min().date()} to {initial_is_data_raw.index.max().date()} ({len(initial_is_data_raw)} days)")
+        prepared_current_train = prepared_full_data.loc[initial_is_data_raw.index.min():initial_is_data_raw.index.max()]
         if prepared_current_train.empty:
-            print("Initial training data slice is empty. Aborting WFA.")
+            logger.warning("Initial training data slice is empty. Aborting WFA.")
             return None
     else:
-        print("Initial raw IS data is empty. Cannot create initial prepared training data.")
+        logger.warning("Initial raw IS data is empty. Cannot create initial prepared training data.")
         prepared_current_train = pd.DataFrame() # Will be handled by downstream checks
 
-    # The raw OOS pool remains the same
-    current_oos_pool_raw = full_oos_data_raw.copy()
+    # The raw and prepared OOS pools stay fixed; an integer cursor marks how much of them has been tested
     # Get the prepared version of the OOS pool from the fully prepared data
     if not full_oos_data_raw.empty:
-        print(f"Slicing initial prepared OOS pool: {full_oos_data_raw.index.min().date()} to {full_oos_data_raw.index.max().date()} ({len(full_oos_data_raw)} days)")
-        prepared_oos_pool = prepared_full_data.loc[full_oos_data_raw.index.min():full_oos_data_raw.index.max()].copy()
+        logger.info(f"Slicing initial prepared OOS pool: {full_oos_data_raw.index.min().date()} to {full_oos_data_raw.index.max().date()} ({len(full_oos_data_raw)} days)")
+        prepared_oos_pool = prepared_full_data.loc[full_oos_data_raw.index.min():full_oos_data_raw.index.max()]
         if prepared_oos_pool.empty:
-            print("OOS data pool slice is empty despite raw OOS data existing. Aborting WFA.")
+            logger.warning("OOS data pool slice is empty despite raw OOS data existing. Aborting WFA.")
             return None
     else:
-        print("Raw OOS data pool is empty. WFA might end quickly or not run.")
+        logger.warning("Raw OOS data pool is empty. WFA might end quickly or not run.")
         prepared_oos_pool = pd.DataFrame()
 
     all_step_results = []
     days_processed_since_last_opt = 0 
-    step_number = 0
-    accumulated_raw_oos_for_next_train = pd.DataFrame() # To accumulate raw OOS chunks
-
-    print(f"\nStarting Unanchored Walk-Forward Analysis...")
+    # Every OOS chunk is a full window at a fixed position in both pools, so the fold boundaries are known up front
+    fold_starts, fold_ends = _compute_folds(min(len(full_oos_data_raw), len(prepared_oos_pool)), oos_window_size)
+    step_plan = [] # (step, prepared_current_train, train run index, prepared_oos_chunk, parameters) per step
+    train_runs = [] # (prepared_current_train, parameters) of each reference run, one per parameter segment
+    new_segment = True # prepared_current_train and the active parameters changed since the last reference run
+    accumulated_oos_start = 0 # Raw OOS tested since the last optimization is full_oos_data_raw[accumulated_oos_start:oos_cursor]
+
+    logger.info(f"\nStarting Unanchored Walk-Forward Analysis...")
     if not prepared_current_train.empty:
-        print(f"Initial prepared training data for first cycle: {prepared_current_train.index.min().date()} to {prepared_current_train.index.max().date()} ({len(prepared_current_train)} days)")
+        logger.info(f"Initial prepared training data for first cycle: {prepared_current_train.index.min().date()} to {prepared_current_train.index.max().date()} ({len(prepared_current_train)} days)")
     else:
-        print(f"Initial prepared training data for first cycle is empty.")
-    print(f"Total OOS data available: {len(prepared_oos_pool)} days | OOS Window Size: {oos_window_size} days | Optimization Frequency: {opt_frequency_days} days")
-    print(f"OOS Pool Date Range: {prepared_oos_pool.index.min().date()} to {prepared_oos_pool.index.max().date()} ({len(prepared_oos_pool)} days)")
+        logger.warning(f"Initial prepared training data for first cycle is empty.")
+    logger.info(f"Total OOS data available: {len(prepared_oos_pool)} days | OOS Window Size: {oos_window_size} days | Optimization Frequency: {opt_frequency_days} days")
+    logger.info(f"OOS Pool Date Range: {prepared_oos_pool.index.min().date()} to {prepared_oos_pool.index.max().date()} ({len(prepared_oos_pool)} days)")
     
 
-    total_possible_steps = len(prepared_oos_pool) // oos_window_size if oos_window_size > 0 and not prepared_oos_pool.empty else 0
     progress_bar = tqdm.tqdm(
-        total=total_possible_steps,
+        total=len(fold_starts),
         desc="WFA Progress",
         position=0,
         leave=True,
         ncols=100
     )
     
-    while len(current_oos_pool_raw) >= oos_window_size and len(prepared_oos_pool) >= oos_window_size:
-        step_number += 1
-        
+    for step_number, (oos_cursor, oos_end) in enumerate(zip(fold_starts.tolist(), fold_ends.tolist()), start=1):
         # 1. Re-optimization Check
         if days_processed_since_last_opt >= opt_frequency_days and step_number > 1:
             #print(f"\nStep {step_number}: Re-optimizing parameters...")
+            accumulated_raw_oos_for_next_train = full_oos_data_raw.iloc[accumulated_oos_start:oos_cursor]
             #print(f"Accumulated {len(accumulated_raw_oos_for_next_train)} days of OOS data for new training set.")
             
             if len(training_data_at_last_optimization_raw) < days_in_is_lookback:
-                base_for_new_train_raw_segment = training_data_at_last_optimization_raw.copy()
-                print(f"Warning: Training data used in last optimization ({len(training_data_at_last_optimization_raw)} days) is shorter than IS lookback ({days_in_is_lookback} days). Using all available.")
+                base_for_new_train_raw_segment = training_data_at_last_optimization_raw
+                logger.warning(f"Warning: Training data used in last optimization ({len(training_data_at_last_optimization_raw)} days) is shorter than IS lookback ({days_in_is_lookback} days). Using all available.")
             else:
-                base_for_new_train_raw_segment = training_data_at_last_optimization_raw.iloc[-days_in_is_lookback:].copy()
+                base_for_new_train_raw_segment = training_data_at_last_optimization_raw.iloc[-days_in_is_lookback:]
             
             new_raw_training_data_for_opt = pd.concat([base_for_new_train_raw_segment, accumulated_raw_oos_for_next_train])
             new_raw_training_data_for_opt = new_raw_training_data_for_opt[~new_raw_training_data_for_opt.index.duplicated(keep='first')].sort_index()
@@ -2345,66 +2164,72 @@ def walk_forward_analysis(initial_is_data_raw, full_oos_data_raw, initial_parame
             if not new_raw_training_data_for_opt.empty:
                 #print(f"Slicing new prepared training data for optimization from {new_raw_training_data_for_opt.index.min().date()} to {new_raw_training_data_for_opt.index.max().date()} (length: {len(new_raw_training_data_for_opt)} days)...")
                 try:
-                    prepared_new_training_data_for_opt = prepared_full_data.loc[new_raw_training_data_for_opt.index.min():new_raw_training_data_for_opt.index.max()].copy()
+                    prepared_new_training_data_for_opt = prepared_full_data.loc[new_raw_training_data_for_opt.index.min():new_raw_training_data_for_opt.index.max()]
                 except KeyError:
-                    print(f"Error: Date range for new training data not found in prepared_full_data. Min: {new_raw_training_data_for_opt.index.min()}, Max: {new_raw_training_data_for_opt.index.max()}")
+                    logger.error(f"Error: Date range for new training data not found in prepared_full_data. Min: {new_raw_training_data_for_opt.index.min()}, Max: {new_raw_training_data_for_opt.index.max()}")
                     prepared_new_training_data_for_opt = pd.DataFrame()
 
 
             if prepared_new_training_data_for_opt.empty:
-                print("Cannot optimize: New prepared training data for optimization is empty. Continuing with old parameters.")
+                logger.warning("Cannot optimize: New prepared training data for optimization is empty. Continuing with old parameters.")
             else:
                 #print(f"Optimizing with new training data from {prepared_new_training_data_for_opt.index.min().date()} to {prepared_new_training_data_for_opt.index.max().date()} ({len(prepared_new_training_data_for_opt)} days)")
-                pareto_front = optimize(prepared_new_training_data_for_opt) 
+                best_params = _optimize_best_params(prepared_new_training_data_for_opt)
                 
-                if pareto_front and len(pareto_front) > 0:
-                    best_trial = pareto_front[0] 
-                    active_parameters_for_momentum = best_trial.params.copy()
-                    # Ensure correct types for main strategy parameters
-                    if 'long_risk' in active_parameters_for_momentum:
-                        active_parameters_for_momentum['long_risk'] = float(active_parameters_for_momentum['long_risk'])
-                    if 'max_open_positions' in active_parameters_for_momentum:
-                        active_parameters_for_momentum['max_open_positions'] = int(active_parameters_for_momentum['max_open_positions'])
-                    if 'adx_threshold' in active_parameters_for_momentum:
-                        active_parameters_for_momentum['adx_threshold'] = float(active_parameters_for_momentum['adx_threshold'])
-                    if 'max_position_duration' in active_parameters_for_momentum:
-                        active_parameters_for_momentum['max_position_duration'] = int(active_parameters_for_momentum['max_position_duration'])
+                if best_params:
+                    active_parameters_for_momentum = best_params.copy()
                     #print("Parameters updated after re-optimization.")
                     
-                    training_data_at_last_optimization_raw = new_raw_training_data_for_opt.copy()
-                    prepared_current_train = prepared_new_training_data_for_opt.copy() 
+                    training_data_at_last_optimization_raw = new_raw_training_data_for_opt
+                    prepared_current_train = prepared_new_training_data_for_opt 
+                    new_segment = True # New training window and parameters: the next step needs a new reference run
                 else:
-                    print("Optimization failed or yielded no results. Continuing with previously optimized parameters.")
+                    logger.warning("Optimization failed or yielded no results. Continuing with previously optimized parameters.")
             
             days_processed_since_last_opt = 0 
-            accumulated_raw_oos_for_next_train = pd.DataFrame()
+            accumulated_oos_start = oos_cursor
         
         # 2. Define and Prepare Current Test Window (OOS Chunk)
-        raw_oos_chunk = current_oos_pool_raw.iloc[:oos_window_size].copy()
-        prepared_oos_chunk = prepared_oos_pool.iloc[:oos_window_size].copy()
-
-        if prepared_oos_chunk.empty or raw_oos_chunk.empty:
-            print(f"Step {step_number}: OOS chunk is empty. Ending WFA.")
-            break
+        prepared_oos_chunk = prepared_oos_pool.iloc[oos_cursor:oos_end]
 
-        # 3. Run strategy on the current prepared training data (for reference)
-        # `prepared_current_train` is the data that was used (or would have been used) to get `active_parameters_for_momentum`
+        # 3. Plan the runs for this step; they only depend on the data windows and the active parameters,
+        # so they are executed together after the walk
+        # `prepared_current_train` is the data that was used (or would have been used) to get `active_parameters_for_momentum`.
+        # Both only change together at a re-optimization, so each segment needs a single reference run
         if prepared_current_train.empty:
-            print(f"Step {step_number}: Warning - prepared_current_train for reference run is empty.")
-            train_log, train_stats, train_equity, train_returns = [], {}, pd.Series(dtype='float64'), pd.Series(dtype='float64')
+            logger.warning(f"Step {step_number}: Warning - prepared_current_train for reference run is empty.")
+            train_run = None
         else:
-            train_log, train_stats, train_equity, train_returns = momentum(
-                prepared_current_train.copy(), 
-                params=active_parameters_for_momentum
-            )
-
-        # 4. Run strategy on the prepared OOS chunk (current test window)
-        oos_log, oos_stats, oos_equity, oos_returns = momentum(
-            prepared_oos_chunk.copy(),
-            params=active_parameters_for_momentum
-        )
+            if new_segment:
+                train_runs.append((prepared_current_train, active_parameters_for_momentum))
+                new_segment = False
+            train_run = len(train_runs) - 1
+        step_plan.append((step_number, prepared_current_train, train_run, prepared_oos_chunk, active_parameters_for_momentum))
+        progress_bar.update(1)
         
-        # 5. Record results for this step (existing logic for metrics extraction)
+        # 4. Update data for the next iteration
+        # The tested chunk joins the next training set through the accumulated_oos_start:oos_cursor range
+        # of the next fold, so nothing is concatenated per step
+        days_processed_since_last_opt += oos_end - oos_cursor
+    
+    progress_bar.close()
+
+    # 5. Run the training reference runs and every OOS chunk (current test windows) in one process pool
+    runs = momentum_runs(train_runs + [(prepared_oos_chunk, parameters) for _, _, _, prepared_oos_chunk, parameters in step_plan])
+    train_results, oos_results = runs[:len(train_runs)], runs[len(train_runs):]
+    oos_metrics_state = OOS_METRICS_START
+
+    for (step_number, prepared_current_train, train_run, prepared_oos_chunk, active_parameters_for_momentum), \
+            (oos_log, oos_stats, oos_equity, oos_returns) in zip(step_plan, oos_results):
+        if train_run is None:
+            train_log, train_stats, train_equity, train_returns = [], {}, pd.Series(dtype='float64'), pd.Series(dtype='float64')
+        else:
+            train_log, train_stats, train_equity, train_returns = train_results[train_run]
+
+        # Overall OOS statistics accumulate chunk by chunk, in the same order the returns are concatenated
+        oos_metrics_state = _oos_metrics(oos_returns.to_numpy(np.float64), daily_rf_rate, oos_metrics_state)
+
+        # 6. Record results for this step (existing logic for metrics extraction)
         oos_trade_count = oos_stats.get('Total Trades', 0)
         train_trade_count = train_stats.get('Total Trades', 0)
         
@@ -2479,8 +2304,7 @@ def walk_forward_analysis(initial_is_data_raw, full_oos_data_raw, initial_parame
             'test_days': len(prepared_oos_chunk),
             'train_sharpe': train_sharpe, 'test_sharpe': oos_sharpe, 'decay_ratio': decay_ratio_val,
             'decay_metrics_used': len(valid_decays), 'train_trades': train_trade_count, 'test_trades': oos_trade_count,
-            'oos_trade_log': list(oos_log) if oos_log else [],
-            'oos_returns_series': oos_returns, 
+            'oos_trade_log': oos_log, # Columnar TradeLog; records are only expanded if someone iterates it
             'train_return_pct': train_stats.get('Return (%)', np.nan), 'test_return_pct': oos_stats.get('Return (%)', np.nan),
             'valid_train': is_valid_train_period, 'valid_test': is_valid_oos_period,
             'valid_comparison': is_valid_train_period and is_valid_oos_period,
@@ -2493,48 +2317,29 @@ def walk_forward_analysis(initial_is_data_raw, full_oos_data_raw, initial_parame
             'parameters_used_snapshot': active_parameters_for_momentum.copy()
         })
         all_step_results.append(step_result_data)
-        progress_bar.update(1)
-        
-        # 6. Update data for the next iteration
-        # Accumulate the raw OOS chunk for the next potential training set (if re-optimization occurs)
-        accumulated_raw_oos_for_next_train = pd.concat([accumulated_raw_oos_for_next_train, raw_oos_chunk])
-        accumulated_raw_oos_for_next_train = accumulated_raw_oos_for_next_train[~accumulated_raw_oos_for_next_train.index.duplicated(keep='first')].sort_index()
-
-        # Advance the OOS pool (both raw and prepared)
-        chunk_len = len(raw_oos_chunk) # Number of days in the current OOS chunk
-        current_oos_pool_raw = current_oos_pool_raw.iloc[chunk_len:].copy()
-        prepared_oos_pool = prepared_oos_pool.iloc[chunk_len:].copy()
-        
-        # Update days processed counter for OOS data
-        days_processed_since_last_opt += chunk_len
-    
-    progress_bar.close()
 
     if not all_step_results:
-        print("No walk-forward steps were completed.")
+        logger.warning("No walk-forward steps were completed.")
         return None
     # ----------------------------------------------------------------------------------------------------------------------------
-    # Create results DataFrame
-    results_df = pd.DataFrame(all_step_results)
+    # Create results DataFrame column by column so the numeric metrics land as typed arrays;
+    # the per-step trade logs and parameter dicts stay out of it and are returned alongside
+    step_columns = dict.fromkeys(key for res in all_step_results for key in res if key not in _STEP_OBJECT_FIELDS)
+    results_df = pd.DataFrame({key: np.asarray([res.get(key, np.nan) for res in all_step_results])
+                               for key in step_columns})
     
-    # Process all OOS returns for overall metrics
-    all_oos_log_returns_list = [res['oos_returns_series'] for res in all_step_results 
-                               if isinstance(res['oos_returns_series'], pd.Series) and not res['oos_returns_series'].empty]
+    # Process all OOS returns for overall metrics. They are kept as one concatenated Series plus CSR-style offsets:
+    # step i's returns are concatenated_oos_log_returns.iloc[oos_offsets[i]:oos_offsets[i + 1]]
+    all_oos_log_returns_list = [oos_returns for *_, oos_returns in oos_results if not oos_returns.empty]
+    oos_offsets = np.zeros(len(oos_results) + 1, dtype=np.int64)
+    np.cumsum([len(oos_returns) for *_, oos_returns in oos_results], out=oos_offsets[1:])
     
-    # Collect all OOS trade logs
-    all_oos_trades_list = []
-    for res_dict in all_step_results: # Iterate through the list of dictionaries
-        if 'oos_trade_log' in res_dict and res_dict['oos_trade_log']:
-            all_oos_trades_list.extend(res_dict['oos_trade_log'])
-
-    total_oos_wins = 0
-    total_oos_losses = 0
-    if all_oos_trades_list:
-        for trade in all_oos_trades_list:
-            if isinstance(trade, dict) and trade.get('PnL', 0) > 0:
-                total_oos_wins += 1
-            elif isinstance(trade, dict): # Count non-positive PnL as losses
-                total_oos_losses += 1
+    # Collect the PnL columns of all OOS trade logs into one array
+    all_oos_pnl = np.concatenate([np.empty(0)] + [res_dict['oos_trade_log'].pnl for res_dict in all_step_results
+                                                  if res_dict.get('oos_trade_log')])
+
+    total_oos_wins = int(np.count_nonzero(all_oos_pnl > 0))
+    total_oos_losses = len(all_oos_pnl) - total_oos_wins # Count non-positive PnL as losses
 
     concatenated_oos_log_returns = pd.Series(dtype=float)
     overall_oos_sharpe = np.nan
@@ -2542,55 +2347,72 @@ def walk_forward_analysis(initial_is_data_raw, full_oos_data_raw, initial_parame
     overall_max_drawdown = np.nan
 
     if all_oos_log_returns_list:
-        concatenated_oos_log_returns = pd.concat(all_oos_log_returns_list).sort_index()
-        concatenated_oos_log_returns = concatenated_oos_log_returns[~concatenated_oos_log_returns.index.duplicated(keep='first')]
+        # OOS chunks are consecutive, non-overlapping slices of the pool, so the index is already sorted and unique;
+        # values and index are each joined in one concatenation instead of aligning the Series
+        first_returns = all_oos_log_returns_list[0]
+        concatenated_oos_log_returns = pd.Series(
+            np.concatenate([returns.to_numpy() for returns in all_oos_log_returns_list]),
+            index=first_returns.index.append([returns.index for returns in all_oos_log_returns_list[1:]]),
+            name=first_returns.name
+        )
     
     # Calculate metrics for final report
+    # The valid_* columns are plain bool arrays, so counts and selections are mask reductions
     total_steps = len(results_df)
-    valid_test_results_df = results_df[results_df['valid_test'] == True] if not results_df.empty else pd.DataFrame()
-    valid_comparisons_df = results_df[results_df['valid_comparison'] == True] if not results_df.empty else pd.DataFrame()
+    valid_test_mask = results_df['valid_test'].to_numpy(bool)
+    valid_comparison_mask = results_df['valid_comparison'].to_numpy(bool)
+    valid_test_results_df = results_df[valid_test_mask]
+    valid_comparisons_df = results_df[valid_comparison_mask]
     
-    valid_tests_count = len(valid_test_results_df)
+    valid_tests_count = int(np.count_nonzero(valid_test_mask))
     zero_trade_count = total_steps - valid_tests_count
     
-    # Calculate rolling decay ratios (for detailed analysis)
+    # Calculate rolling decay ratios (for detailed analysis): one mean per full window, as an array
     rolling_decay = None
-    if len(valid_comparisons_df) >= 2:
-        decay_values = valid_comparisons_df['decay_ratio'].dropna()
-        if len(decay_values) >= 2:
-            # Calculate rolling window statistics if enough data points
-            rolling_size = min(3, len(decay_values))
-            rolling_decay = decay_values.rolling(rolling_size).mean()
+    decay_values = results_df['decay_ratio'].to_numpy(np.float64)[valid_comparison_mask]
+    decay_values = decay_values[~np.isnan(decay_values)]
+    if len(decay_values) >= 2:
+        # Calculate rolling window statistics if enough data points
+        rolling_size = min(3, len(decay_values))
+        rolling_decay = np.convolve(decay_values, np.full(rolling_size, 1.0 / rolling_size), mode='valid')
     
     # Calculate overall OOS performance metrics
+    # Every reduction below comes from the state streamed over the OOS chunks, so the series is not scanned again
     active_trading_days = 0
     total_days_in_oos_concat = 0
-    if len(concatenated_oos_log_returns) > 1:
-        active_trading_days = len(concatenated_oos_log_returns[concatenated_oos_log_returns != 0])
-        total_days_in_oos_concat = len(concatenated_oos_log_returns)
+    if oos_metrics_state[1] > 1:
+        (active_trading_days, total_days_in_oos_concat, mean_excess_log_return, m2_excess_log_return,
+         total_cumulative_log_return, _, oos_max_drawdown_pct) = oos_metrics_state
+        std_excess_log_return = math.sqrt(m2_excess_log_return / (total_days_in_oos_concat - 1))
         
         if active_trading_days > 5:
             # Calculate OOS Sharpe
-            excess_concatenated_log_returns = concatenated_oos_log_returns - daily_rf_rate
-            mean_excess_log_return = excess_concatenated_log_returns.mean()
-            std_excess_log_return = excess_concatenated_log_returns.std()
-            
             if std_excess_log_return != 0 and pd.notna(std_excess_log_return):
-                overall_oos_sharpe = (mean_excess_log_return / std_excess_log_return) * np.sqrt(252)
+                overall_oos_sharpe = (mean_excess_log_return / std_excess_log_return) * SQRT_252
             else: 
                 overall_oos_sharpe = 0.0 if mean_excess_log_return == 0 else np.nan
             
             # Calculate cumulative return
-            total_cumulative_log_return = concatenated_oos_log_returns.sum()
             overall_oos_cumulative_return_pct = (np.exp(total_cumulative_log_return) - 1) * 100
             
-            # Calculate max drawdown for overall OOS period
-            cum_rets = concatenated_oos_log_returns.cumsum()
-            cum_rets_exp = np.exp(cum_rets) - 1  # Convert to regular returns for drawdown calc
-            running_max = np.maximum.accumulate(cum_rets_exp)
-            drawdowns = ((cum_rets_exp - running_max) / (running_max + 1)) * 100  # As percentage
-            overall_max_drawdown = np.nanmin(drawdowns)
+            # Max drawdown for overall OOS period
+            overall_max_drawdown = oos_max_drawdown_pct
     
+    wfa_results = {
+        'step_results_df': results_df, 
+        'step_oos_offsets': oos_offsets,
+        'step_oos_trade_logs': [res['oos_trade_log'] for res in all_step_results],
+        'step_parameters': [res['parameters_used_snapshot'] for res in all_step_results],
+        'concatenated_oos_returns': concatenated_oos_log_returns, 
+        'overall_oos_sharpe': overall_oos_sharpe,
+        'overall_oos_return_pct': overall_oos_cumulative_return_pct,
+        'overall_oos_max_drawdown': overall_max_drawdown,
+        'rolling_decay': rolling_decay
+    }
+    # The summary below is report-only: skip building it (and its tables) when nothing would log it
+    if not logger.isEnabledFor(logging.INFO):
+        return wfa_results
+
     # Calculate additional performance metrics before summary
     if not valid_test_results_df.empty:
         # Calculate averages for key metrics
@@ -2614,68 +2436,69 @@ def walk_forward_analysis(initial_is_data_raw, full_oos_data_raw, initial_parame
 
     # ----------------------------------------------------------------------------------------------------------------------------
     # Print the new formatted summary
-    print("\n=== WFA FINAL SUMMARY ===")
+    logger.info("\n=== WFA FINAL SUMMARY ===")
     # ----------------------------------------------------------------------------------------------------------------------------
     # 1. Overview section
-    print("1. Overview:")
+    logger.info("1. Overview:")
     if total_steps > 0:
-        print(f"   - Total WFA Steps: {total_steps}")
-        print(f"   - Valid OOS Windows: {valid_tests_count}/{total_steps} ({valid_tests_count/total_steps*100:.1f}%)")
+        logger.info(f"   - Total WFA Steps: {total_steps}")
+        logger.info(f"   - Valid OOS Windows: {valid_tests_count}/{total_steps} ({valid_tests_count/total_steps*100:.1f}%)")
         
         # Calculate average number of decay metrics used across all valid steps
         if not valid_comparisons_df.empty:
             avg_decay_metrics = valid_comparisons_df['decay_metrics_used'].mean()
-            print(f"   - Decay Metrics Used: {avg_decay_metrics:.1f}")
+            logger.info(f"   - Decay Metrics Used: {avg_decay_metrics:.1f}")
         
         if zero_trade_count > 0:
             zero_trade_pct = zero_trade_count/total_steps*100
-            risk_level = "HIGH RISK" if zero_trade_pct > 40 else "MODERATE RISK" if zero_trade_pct > 20 else "LOW RISK"
-            print(f"   - Zero-Trade Windows: {zero_trade_count}/{total_steps} ({zero_trade_pct:.1f}%) → {risk_level}")
+            risk_level = _classify(zero_trade_pct, _ZERO_TRADE_RISK_BINS, _ZERO_TRADE_RISK_LABELS)
+            logger.info(f"   - Zero-Trade Windows: {zero_trade_count}/{total_steps} ({zero_trade_pct:.1f}%) → {risk_level}")
     else:
-        print("   - No WFA steps completed")
+        logger.info("   - No WFA steps completed")
     # ----------------------------------------------------------------------------------------------------------------------------
     # 2. Performance metrics table
-    print("\n2. Performance (Valid OOS):")
+    logger.info("\n2. Performance (Valid OOS):")
     if not valid_test_results_df.empty:
         metrics = {
-            'OOS Sharpe': valid_test_results_df['test_sharpe'],
-            'OOS Sortino': valid_test_results_df['test_sortino'],
-            'OOS Avg Win/Loss': valid_test_results_df['test_avg_win_loss'],
-            'OOS Expectancy (%)': valid_test_results_df['test_expectancy'],
-            'OOS Profit Factor': valid_test_results_df['test_profit_factor'],
-            'Ann. Return (%)': valid_test_results_df['test_ann_return'],
-            'Max Drawdown (%)': valid_test_results_df['test_max_drawdown']
+            'OOS Sharpe': 'test_sharpe',
+            'OOS Sortino': 'test_sortino',
+            'OOS Avg Win/Loss': 'test_avg_win_loss',
+            'OOS Expectancy (%)': 'test_expectancy',
+            'OOS Profit Factor': 'test_profit_factor',
+            'Ann. Return (%)': 'test_ann_return',
+            'Max Drawdown (%)': 'test_max_drawdown'
         }
 
-        # Calculate statistics for each metric
+        # Calculate statistics for each metric on its NaN-free array (sample std, NaN below two values)
         summary_data = []
-        for name, values in metrics.items():
-            valid_values = values.dropna()
-            if not valid_values.empty:
-                row = [
+        for name, col in metrics.items():
+            valid_values = valid_test_results_df[col].to_numpy(np.float64)
+            valid_values = valid_values[~np.isnan(valid_values)]
+            if valid_values.size:
+                std_value = valid_values.std(ddof=1) if valid_values.size > 1 else np.nan
+                summary_data.append([
                     name,
                     f"{valid_values.mean():.2f}",
-                    f"{valid_values.median():.2f}",
-                    f"{valid_values.std():.2f}",
+                    f"{np.median(valid_values):.2f}",
+                    f"{std_value:.2f}",
                     f"{valid_values.min():.2f}",
                     f"{valid_values.max():.2f}"
-                ]
-                summary_data.append(row)
+                ])
 
         if summary_data:
-            print(tabulate(
+            logger.info(tabulate(
                 summary_data,
                 headers=['Metric', 'Mean', 'Median', 'Std Dev', 'Min', 'Max'],
                 tablefmt='grid',
                 numalign='right'
             ))
         else:
-            print("   No valid metrics data available")
+            logger.info("   No valid metrics data available")
     else:
-        print("   No valid OOS periods with trades for performance analysis")
+        logger.info("   No valid OOS periods with trades for performance analysis")
     # ----------------------------------------------------------------------------------------------------------------------------
     # 3. Decay Analysis
-    print("\n3. Decay Analysis:")
+    logger.info("\n3. Decay Analysis:")
     if not valid_comparisons_df.empty:
         # Ensure 'decay_metrics_used' is excluded from the loop for individual metric decays
         decay_columns = [
@@ -2693,11 +2516,12 @@ def walk_forward_analysis(initial_is_data_raw, full_oos_data_raw, initial_parame
             # Process each individual decay metric (e.g., decay_sharpe, decay_profit_factor)
             for col in decay_columns:
                 metric_name = col.replace('decay_', '').title()
-                values = valid_comparisons_df[col].dropna()
+                values = valid_comparisons_df[col].to_numpy(np.float64)
+                values = values[~np.isnan(values)]
                 
-                if not values.empty:
+                if values.size:
                     mean_decay_val = values.mean()
-                    std_decay_val = values.std()
+                    std_decay_val = values.std(ddof=1) if values.size > 1 else np.nan
                     
                     if pd.notna(mean_decay_val) and pd.notna(std_decay_val):
                         metric_decays_data_for_table.append([
@@ -2719,15 +2543,15 @@ def walk_forward_analysis(initial_is_data_raw, full_oos_data_raw, initial_parame
         
         # Display the table if there's data
         if metric_decays_data_for_table:
-            print(tabulate(
+            logger.info(tabulate(
                 metric_decays_data_for_table,
                 headers=['Metric', 'Decay', 'Std Dev'], # Corrected header from previous suggestions if needed
                 tablefmt='simple',
                 numalign='right'
             ))
-            print()  # Add spacing
+            logger.info("")  # Add spacing
         else:
-            print("   No individual decay metric data to display.")
+            logger.info("   No individual decay metric data to display.")
         
         # Overall decay analysis based on 'decay_ratio'
         decay_values_overall = valid_comparisons_df['decay_avg_win_loss'].dropna() # Use 'decay_avg_win_loss'
@@ -2737,49 +2561,43 @@ def walk_forward_analysis(initial_is_data_raw, full_oos_data_raw, initial_parame
             std_decay = decay_values_overall.std()   # Call std() and use 'decay_avg_win_loss'
             
             # Classify decay ratio (using the same thresholds for now)
-            decay_classification = ("CATASTROPHIC" if mean_decay > 0.7 else
-                                    "SEVERE" if mean_decay > 0.5 else
-                                    "SIGNIFICANT" if mean_decay > 0.3 else
-                                    "MODERATE" if mean_decay > 0.1 else
-                                    "MINIMAL")
+            decay_classification = _classify(mean_decay, _DECAY_BINS, _DECAY_LABELS)
             
             # Classify volatility
-            vol_classification = ("EXTREME VOLATILITY" if std_decay > 0.4 else
-                                "HIGH VOLATILITY" if std_decay > 0.2 else
-                                "MODERATE VOLATILITY" if std_decay > 0.1 else
-                                "STABLE")
+            vol_classification = _classify(std_decay, _DECAY_VOL_BINS, _DECAY_VOL_LABELS)
             
-            print(f"Overall Decay Analysis (Based on Avg Win/Loss Decay):") # Updated label
-            print(f"   - Mean Avg Win/Loss Decay: {mean_decay:.2f} → {decay_classification}")
-            print(f"   - Std Dev Avg Win/Loss Decay: {std_decay:.2f} → {vol_classification}")
+            logger.info(f"Overall Decay Analysis (Based on Avg Win/Loss Decay):") # Updated label
+            logger.info(f"   - Mean Avg Win/Loss Decay: {mean_decay:.2f} → {decay_classification}")
+            logger.info(f"   - Std Dev Avg Win/Loss Decay: {std_decay:.2f} → {vol_classification}")
             
             # Note: 'rolling_decay' should also be calculated based on 'decay_avg_win_loss' (see note below)
             # The 'decay_values_overall' variable used for 'recent_rolling_decay' print is now based on 'decay_avg_win_loss'
-            if rolling_decay is not None and len(rolling_decay.dropna()) > 0:
-                recent_decay_val = rolling_decay.dropna().iloc[-1]
+            if rolling_decay is not None and len(rolling_decay) > 0:
+                recent_decay_val = rolling_decay[-1]
                 if pd.notna(recent_decay_val):
                     # 'decay_values_overall' for rolling_decay print is now consistent.
-                    print(f"   - Recent Rolling Avg Win/Loss Decay (n={min(3, len(decay_values_overall))}): {recent_decay_val:.2f}")
+                    logger.info(f"   - Recent Rolling Avg Win/Loss Decay (n={min(3, len(decay_values_overall))}): {recent_decay_val:.2f}")
         else:
-            print("   No 'decay_avg_win_loss' data available for overall analysis.")
+            logger.info("   No 'decay_avg_win_loss' data available for overall analysis.")
     else:
-        print("   No valid comparison periods to calculate decay metrics")
+        logger.info("   No valid comparison periods to calculate decay metrics")
     # ----------------------------------------------------------------------------------------------------------------------------
     # 4. Activity metrics
-    print("\n4. Activity:")
+    logger.info("\n4. Activity:")
     if total_days_in_oos_concat > 0:
         trading_activity_pct = active_trading_days / total_days_in_oos_concat * 100
-        print(f"   - Trading Days: {active_trading_days}/{total_days_in_oos_concat} ({trading_activity_pct:.1f}%)")
+        logger.info(f"   - Trading Days: {active_trading_days}/{total_days_in_oos_concat} ({trading_activity_pct:.1f}%)")
         
         # Identify potential causes for low activity or zero-trade steps
         # zero_trade_count is already calculated as total_steps - valid_tests_count
         # valid_tests_count is where oos_trade_count > 0. So zero_trade_count is correct.
         
         if trading_activity_pct < 3 and zero_trade_count > 0:
-            print("   - Low overall trading activity (<3%). Analyzing parameters of zero-trade steps:")
-            zero_trade_steps_df = results_df[results_df['test_trades'] == 0]
+            logger.info("   - Low overall trading activity (<3%). Analyzing parameters of zero-trade steps:")
+            # Walk the step dicts directly (iterrows would build a Series per row around the dict-typed snapshot)
+            zero_trade_steps = [step_row for step_row in all_step_results if step_row['test_trades'] == 0]
             
-            for _, step_row in zero_trade_steps_df.iterrows():
+            for step_row in zero_trade_steps:
                 params = step_row['parameters_used_snapshot']
                 step_num = step_row['step']
                 causes_for_step = []
@@ -2812,45 +2630,35 @@ def walk_forward_analysis(initial_is_data_raw, full_oos_data_raw, initial_parame
                     causes_for_step.append(f"low signal weights ({', '.join(low_weights_details)})")
 
                 if causes_for_step:
-                    print(f"     - Step {step_num}: Zero trades. Potential causes: {'; '.join(causes_for_step)}.")
+                    logger.info(f"     - Step {step_num}: Zero trades. Potential causes: {'; '.join(causes_for_step)}.")
                 else:
                     # If no obvious parameter red flags, it might be other combinations or market conditions
-                    print(f"     - Step {step_num}: Zero trades. Cause: Parameter combination or specific market conditions not flagged by simple checks.")
+                    logger.info(f"     - Step {step_num}: Zero trades. Cause: Parameter combination or specific market conditions not flagged by simple checks.")
             
         elif zero_trade_count > 0: # Overall activity is not <3%, but there were still some zero-trade windows
-            print(f"   - Note: {zero_trade_count} OOS window(s) had zero trades. This might indicate parameter instability or specific unresponsive market conditions during those periods.")
+            logger.info(f"   - Note: {zero_trade_count} OOS window(s) had zero trades. This might indicate parameter instability or specific unresponsive market conditions during those periods.")
     else:
-        print("   - No trading activity data available")
+        logger.info("   - No trading activity data available")
     # ----------------------------------------------------------------------------------------------------------------------------
     # 5. Concatenated OOS Performance
-    print("\n5. Concatenated OOS:")
+    logger.info("\n5. Concatenated OOS:")
     if len(concatenated_oos_log_returns) > 5:
-        print(f"   - Ann. Sharpe: {overall_oos_sharpe:.2f} | Cum. Return: {overall_oos_cumulative_return_pct:.2f}% | Max DD: {overall_max_drawdown:.1f}%")
-        print(f"   - Total OOS Trades: {total_oos_wins + total_oos_losses} (Wins: {total_oos_wins}, Losses: {total_oos_losses})")
+        logger.info(f"   - Ann. Sharpe: {overall_oos_sharpe:.2f} | Cum. Return: {overall_oos_cumulative_return_pct:.2f}% | Max DD: {overall_max_drawdown:.1f}%")
+        logger.info(f"   - Total OOS Trades: {total_oos_wins + total_oos_losses} (Wins: {total_oos_wins}, Losses: {total_oos_losses})")
         
         # Market classification based on overall cumulative return
-        market_type = ""
         if pd.notna(overall_oos_cumulative_return_pct):
-            if overall_oos_cumulative_return_pct > 50:
-                market_type = "HIGHLY FAVORABLE"
-            elif overall_oos_cumulative_return_pct > 20:
-                market_type = "FAVORABLE" 
-            elif overall_oos_cumulative_return_pct > -5:
-                market_type = "NEUTRAL"
-            elif overall_oos_cumulative_return_pct > -20:
-                market_type = "CHALLENGING"
-            else:
-                market_type = "HIGHLY ADVERSE"
+            market_type = _classify(overall_oos_cumulative_return_pct, _MARKET_BINS, _MARKET_LABELS)
         else:
             market_type = "UNKNOWN (Return N/A)"
             
-        print(f"   - Market Classification (by Return): {market_type}")
+        logger.info(f"   - Market Classification (by Return): {market_type}")
     else:
-        print("   - Insufficient data for reliable OOS performance metrics")
+        logger.info("   - Insufficient data for reliable OOS performance metrics")
     # ----------------------------------------------------------------------------------------------------------------------------
     # Display detailed results table
     if not results_df.empty:
-        print("\n--- Detailed Step Results ---")
+        logger.info("\n--- Detailed Step Results ---")
         display_cols = [
             'step', 'train_sharpe', 'test_sharpe', 'decay_ratio', 
             'train_ann_return', 'test_ann_return',
@@ -2891,7 +2699,7 @@ def walk_forward_analysis(initial_is_data_raw, full_oos_data_raw, initial_parame
             headers = ['Metric'] + [f'Step {s}' for s in steps]
             
             # Print the transposed table
-            print(tabulate(
+            logger.info(tabulate(
                 metrics_data,
                 headers=headers,
                 tablefmt='grid',
@@ -2900,264 +2708,203 @@ def walk_forward_analysis(initial_is_data_raw, full_oos_data_raw, initial_parame
             ))
     # ----------------------------------------------------------------------------------------------------------------------------
     # Return comprehensive results
-    return {
-        'step_results_df': results_df, 
-        'concatenated_oos_returns': concatenated_oos_log_returns, 
-        'overall_oos_sharpe': overall_oos_sharpe,
-        'overall_oos_return_pct': overall_oos_cumulative_return_pct,
-        'overall_oos_max_drawdown': overall_max_drawdown,
-        'rolling_decay': rolling_decay if rolling_decay is not None else None
-    }
+    return wfa_results
 
 #==========================================================================================================================
 #================== MAIN PROGRAM EXECUTION ================================================================================
 #==========================================================================================================================
+# Stand-in for the Pareto front when optimization is skipped: the default parameters (read-only, callers take
+# a copy) with dummy "good" objective values (1.0 to maximize, 10.0 to minimize, e.g. a low drawdown)
+_DEFAULT_PARAMS = MappingProxyType({
+    'long_risk': DEFAULT_LONG_RISK,
+    'max_open_positions': MAX_OPEN_POSITIONS,
+    'adx_threshold': ADX_THRESHOLD_DEFAULT,
+    'max_position_duration': MAX_POSITION_DURATION,
+
+    'weight_price_trend': DEFAULT_SIGNAL_PROCESSING_PARAMS['weights']['price_trend'],
+    'weight_rsi_zone': DEFAULT_SIGNAL_PROCESSING_PARAMS['weights']['rsi_zone'],
+    'weight_adx_slope': DEFAULT_SIGNAL_PROCESSING_PARAMS['weights']['adx_slope'],
+    'weight_vol_accel': DEFAULT_SIGNAL_PROCESSING_PARAMS['weights']['vol_accel'],
+    'weight_vix_factor': DEFAULT_SIGNAL_PROCESSING_PARAMS['weights']['vix_factor'],
+
+    'threshold_buy_score': DEFAULT_SIGNAL_PROCESSING_PARAMS['thresholds']['buy_score'],
+    'threshold_exit_score': DEFAULT_SIGNAL_PROCESSING_PARAMS['thresholds']['exit_score'],
+    'threshold_immediate_exit_score': DEFAULT_SIGNAL_PROCESSING_PARAMS['thresholds']['immediate_exit_score'],
+    
+    'ranking_lookback_window_opt': DEFAULT_SIGNAL_PROCESSING_PARAMS['ranking_lookback_window'],
+    'momentum_volatility_lookback_opt': DEFAULT_SIGNAL_PROCESSING_PARAMS['momentum_volatility_lookback']
+})
+_DEFAULT_VALUES = tuple(1.0 if direction == 'maximize' else 10.0 for direction in OPTIMIZATION_DIRECTIONS.values())
+_DEFAULT_TRIAL = SimpleNamespace(params=_DEFAULT_PARAMS, values=_DEFAULT_VALUES)
+# -------------------------------------------------------------------------------------------------------------------------
 def main():
-    # Helper class for when optimization is skipped
-    class MockOptunaTrial:
-        def __init__(self, params_dict, optimization_directions_dict):
-            self.params = params_dict
-            # Create dummy objective values based on optimization directions
-            self.values = []
-            for metric_name in optimization_directions_dict.keys():
-                if optimization_directions_dict[metric_name] == 'maximize':
-                    self.values.append(1.0)  # Dummy "good" value for maximization
-                else:  # minimize
-                    self.values.append(10.0) # Dummy "good" value for minimization (e.g., low drawdown)
-
-    default_params_dict = {
-        'long_risk': DEFAULT_LONG_RISK,
-        'max_open_positions': MAX_OPEN_POSITIONS,
-        'adx_threshold': ADX_THRESHOLD_DEFAULT,
-        'max_position_duration': MAX_POSITION_DURATION,
-
-        'weight_price_trend': DEFAULT_SIGNAL_PROCESSING_PARAMS['weights']['price_trend'],
-        'weight_rsi_zone': DEFAULT_SIGNAL_PROCESSING_PARAMS['weights']['rsi_zone'],
-        'weight_adx_slope': DEFAULT_SIGNAL_PROCESSING_PARAMS['weights']['adx_slope'],
-        'weight_vol_accel': DEFAULT_SIGNAL_PROCESSING_PARAMS['weights']['vol_accel'],
-        'weight_vix_factor': DEFAULT_SIGNAL_PROCESSING_PARAMS['weights']['vix_factor'],
-
-        'threshold_buy_score': DEFAULT_SIGNAL_PROCESSING_PARAMS['thresholds']['buy_score'],
-        'threshold_exit_score': DEFAULT_SIGNAL_PROCESSING_PARAMS['thresholds']['exit_score'],
-        'threshold_immediate_exit_score': DEFAULT_SIGNAL_PROCESSING_PARAMS['thresholds']['immediate_exit_score'],
-        
-        'ranking_lookback_window_opt': DEFAULT_SIGNAL_PROCESSING_PARAMS['ranking_lookback_window'],
-        'momentum_volatility_lookback_opt': DEFAULT_SIGNAL_PROCESSING_PARAMS['momentum_volatility_lookback']
-    }
-
+    def _get_pareto(prepared, purpose):
+        """Pareto front of optimize(prepared) (optimize_cached with MAIN_OPTIMIZE_CACHE), or [_DEFAULT_TRIAL]
+        (the default parameters) when OPTIMIZATION is off. An empty or failed optimization gives an empty list."""
+        if OPTIMIZATION:
+            print(f"\nRunning optimization for {purpose}...")
+            return optimize_cached(prepared) if MAIN_OPTIMIZE_CACHE else optimize(prepared) or []
+        print(f"OPTIMIZATION is False. Using default parameters for {purpose}.")
+        return [_DEFAULT_TRIAL]
+
+    # Only the download and indicator preparation are guarded; errors in the analyses propagate with their traceback.
+    # The in-sample data is prepared once here and shared by every TYPE branch
     try:
         IS, OOS = get_data(TICKER)
+        df_prepared_is = prepare_data(IS, type=1)
+    except Exception as e:
+        print(f"Error loading data for {TICKER}: {e}")
+        traceback.print_exc()
+        return None
+
+    # ------------------------------------------------------------------------------------------------------------------
+    if TYPE == 5:
+        df_prepared_for_test = df_prepared_is
+        if df_prepared_for_test is None or df_prepared_for_test.empty:
+            print("Data for test is empty after preparation. Aborting.")
+            return
+        test(df_prepared_for_test)
+    
+    # -------------------------------------------------------------------------------------------------------------------
+    elif TYPE == 4:
+        df_prepared_for_opt = df_prepared_is
+        if df_prepared_for_opt is None or df_prepared_for_opt.empty:
+            print("Data for optimization is empty after preparation. Aborting.")
+            return
+        # Run optimization on in-sample data
+        pareto_front = optimize(df_prepared_for_opt) # Always a fresh search: this mode exists to inspect it
+        if pareto_front:
+            visualize(pareto_front, df_prepared_for_opt)
+        else:
+            print("Optimization did not yield any results.")
 
-        # ------------------------------------------------------------------------------------------------------------------
-        if TYPE == 5:
-            df_prepared_for_test = prepare_data(IS.copy(), type=1)
-            if df_prepared_for_test is None or df_prepared_for_test.empty:
-                print("Data for test is empty after preparation. Aborting.")
-                return
-            test(df_prepared_for_test)
+    # -------------------------------------------------------------------------------------------------------------------
+    elif TYPE == 3:  # Monte Carlo Testing
+        df_prepared_for_mc = df_prepared_is
+        if df_prepared_for_mc is None or df_prepared_for_mc.empty:
+            print("Data for Monte Carlo is empty after preparation. Aborting.")
+            return
         
-        # -------------------------------------------------------------------------------------------------------------------
-        elif TYPE == 4:
-            df_prepared_for_opt = prepare_data(IS.copy(), type=1)
-            if df_prepared_for_opt is None or df_prepared_for_opt.empty:
-                print("Data for optimization is empty after preparation. Aborting.")
-                return
-            # Run optimization on in-sample data
-            pareto_front = optimize(df_prepared_for_opt)
-            if pareto_front:
-                visualize(pareto_front, df_prepared_for_opt)
-            else:
-                print("Optimization did not yield any results.")
-
-        # -------------------------------------------------------------------------------------------------------------------
-        elif TYPE == 3:  # Monte Carlo Testing
-            df_prepared_for_mc = prepare_data(IS.copy(), type=1)
-            if df_prepared_for_mc is None or df_prepared_for_mc.empty:
-                print("Data for Monte Carlo is empty after preparation. Aborting.")
-                return
-            
-            pareto_front_mc = None
-            if OPTIMIZATION:
-                print("\nRunning optimization before Monte Carlo...")
-                pareto_front_mc = optimize(df_prepared_for_mc)[:3] # Optimize first, take top 3
-            else:
-                print("OPTIMIZATION is False. Using default parameters for Monte Carlo.")
-                pareto_front_mc = [MockOptunaTrial(default_params_dict, OPTIMIZATION_DIRECTIONS)]
-            
-            if pareto_front_mc and len(pareto_front_mc) > 0:
-                mc_results_df = monte_carlo(df_prepared_for_mc, pareto_front_mc)
-
-                if mc_results_df is not None and not mc_results_df.empty:
-                    if 'p_values' in mc_results_df.columns and mc_results_df['p_values'].apply(lambda x: isinstance(x, dict)).all() and 'params' in mc_results_df.columns:
-
-                        mc_results_df['p_value_sum'] = mc_results_df['p_values'].apply(
-                            lambda p_dict: sum(val for val in p_dict.values() if pd.notna(val))
-                        )
-
-                        best_idx_loc = mc_results_df['p_value_sum'].idxmin()
-                        best_row = mc_results_df.loc[best_idx_loc]
-                        best_params_mc_flat = best_row['params'] 
-                        
-                        is_significant_p_lt_0_10 = any(p < 0.10 for p in best_row['p_values'].values() if pd.notna(p))
-                        is_marginally_significant_p_lt_0_20 = any(0.10 <= p < 0.20 for p in best_row['p_values'].values() if pd.notna(p))
-
-                        if is_significant_p_lt_0_10:
-                            print("\n✓ Found statistically significant (p < 0.10) parameter set from Monte Carlo.")
-                        elif is_marginally_significant_p_lt_0_20:
-                            print("\n~ Found marginally significant (0.10 <= p < 0.20) parameter set from Monte Carlo. Proceeding with best found.")
-                        else:
-                            print("\n⚠ No statistically significant (p < 0.10) or marginally significant (p < 0.20) parameter sets found from Monte Carlo. Proceeding with best found.")
-                        
-                        print(f"\nTesting with parameters from Monte Carlo: ")
-                        test(df_prepared_for_mc.copy(), params_to_test=best_params_mc_flat)
-                    else:
-                        print("Error: 'p_values' or 'params' column is missing or not in the expected format in mc_results_df.")
-                else:
-                    print("Monte Carlo analysis did not yield any results.")
-            else:
-                if OPTIMIZATION:
-                    print("Optimization did not yield any Pareto front for Monte Carlo.")
-                else:
-                    print("Could not proceed with Monte Carlo using default parameters.")
+        pareto_front_mc = _get_pareto(df_prepared_for_mc, "Monte Carlo")[:3] # Optimize first, take top 3
         
-        # -------------------------------------------------------------------------------------------------------------------
-        elif TYPE == 2: # Walk-Forward Analysis
-            df_prepared_is_for_wfa_opt = prepare_data(IS.copy(), type=1) 
-            if df_prepared_is_for_wfa_opt is None or df_prepared_is_for_wfa_opt.empty:
-                print("In-sample data for WFA initial optimization is empty after preparation. Aborting.")
-                return
+        if pareto_front_mc and len(pareto_front_mc) > 0:
+            mc_results_df = monte_carlo(df_prepared_for_mc, pareto_front_mc)
 
-            pareto_front_wfa = None
+            if mc_results_df is not None and not mc_results_df.empty:
+                if 'p_values' in mc_results_df.columns and 'params' in mc_results_df.columns:
+                    best_params_mc_flat, is_significant_p_lt_0_10, is_marginally_significant_p_lt_0_20 = _select_best_mc(mc_results_df)
 
+                    if is_significant_p_lt_0_10:
+                        print("\n✓ Found statistically significant (p < 0.10) parameter set from Monte Carlo.")
+                    elif is_marginally_significant_p_lt_0_20:
+                        print("\n~ Found marginally significant (0.10 <= p < 0.20) parameter set from Monte Carlo. Proceeding with best found.")
+                    else:
+                        print("\n⚠ No statistically significant (p < 0.10) or marginally significant (p < 0.20) parameter sets found from Monte Carlo. Proceeding with best found.")
+                    
+                    print(f"\nTesting with parameters from Monte Carlo: ")
+                    test(df_prepared_for_mc, params_to_test=best_params_mc_flat)
+                else:
+                    print("Error: 'p_values' or 'params' column is missing or not in the expected format in mc_results_df.")
+            else:
+                print("Monte Carlo analysis did not yield any results.")
+        else:
             if OPTIMIZATION:
-                print("Running initial optimization for Walk-Forward Analysis...")
-                pareto_front_wfa = optimize(df_prepared_is_for_wfa_opt)
+                print("Optimization did not yield any Pareto front for Monte Carlo.")
             else:
-                print("OPTIMIZATION is False. Using default parameters for initial WFA step.")
-                pareto_front_wfa = [MockOptunaTrial(default_params_dict, OPTIMIZATION_DIRECTIONS)]
+                print("Could not proceed with Monte Carlo using default parameters.")
+    
+    # -------------------------------------------------------------------------------------------------------------------
+    elif TYPE == 2: # Walk-Forward Analysis
+        df_prepared_is_for_wfa_opt = df_prepared_is
+        if df_prepared_is_for_wfa_opt is None or df_prepared_is_for_wfa_opt.empty:
+            print("In-sample data for WFA initial optimization is empty after preparation. Aborting.")
+            return
 
-            if pareto_front_wfa and len(pareto_front_wfa) > 0:
-                best_trial = pareto_front_wfa[0]
-                
-                # Use the complete parameter set from the best trial
-                current_wfa_parameters = best_trial.params.copy()
-                
-                # Ensure correct types for main strategy parameters
-                if 'long_risk' in current_wfa_parameters:
-                    current_wfa_parameters['long_risk'] = float(current_wfa_parameters['long_risk'])
-                if 'max_open_positions' in current_wfa_parameters:
-                    current_wfa_parameters['max_open_positions'] = int(current_wfa_parameters['max_open_positions'])
-                if 'adx_threshold' in current_wfa_parameters:
-                    current_wfa_parameters['adx_threshold'] = float(current_wfa_parameters['adx_threshold'])
-                if 'max_position_duration' in current_wfa_parameters:
-                    current_wfa_parameters['max_position_duration'] = int(current_wfa_parameters['max_position_duration'])
-
-                # Determine the first objective's name for display
-                print(f"Using optimized parameters from initial IS for WFA start.")
-                
-                wfa_summary = walk_forward_analysis(IS, OOS, current_wfa_parameters) 
-                
-                if wfa_summary:
-                    print("\nAnchored Walk-Forward Analysis completed.")
-                else:
-                    print("Anchored Walk-Forward Analysis failed or produced no results.")
-            else:
-                if OPTIMIZATION:
-                    print("Initial optimization for WFA failed or yielded no results.")
-                else:
-                    print("Could not proceed with WFA using default parameters.")
+        pareto_front_wfa = _get_pareto(df_prepared_is_for_wfa_opt, "the initial WFA step")
+
+        if pareto_front_wfa and len(pareto_front_wfa) > 0:
+            best_trial = pareto_front_wfa[0]
             
-        # -------------------------------------------------------------------------------------------------------------------
-        elif TYPE == 1: # Full Run (Opt -> MC -> WFA)
-            df_prepared_full_run = prepare_data(IS.copy(), type=1)
-            if df_prepared_full_run is None or df_prepared_full_run.empty:
-                print("Data for Full Run (Type 1) is empty after preparation. Aborting.")
-                return
-
-            pareto_front_full_run_opt = None
+            # Use the complete parameter set from the best trial
+            current_wfa_parameters = best_trial.params.copy()
+
+            print(f"Using optimized parameters from initial IS for WFA start.")
+            
+            wfa_summary = walk_forward_analysis(IS, OOS, current_wfa_parameters) 
+            
+            if wfa_summary:
+                print("\nAnchored Walk-Forward Analysis completed.")
+            else:
+                print("Anchored Walk-Forward Analysis failed or produced no results.")
+        else:
             if OPTIMIZATION:
-                print("Running optimization for Full Run...")
-                pareto_front_full_run_opt = optimize(df_prepared_full_run)
+                print("Initial optimization for WFA failed or yielded no results.")
             else:
-                print("OPTIMIZATION is False. Using default parameters for Full Run optimization step.")
-                pareto_front_full_run_opt = [MockOptunaTrial(default_params_dict, OPTIMIZATION_DIRECTIONS)]
+                print("Could not proceed with WFA using default parameters.")
+        
+    # -------------------------------------------------------------------------------------------------------------------
+    elif TYPE == 1: # Full Run (Opt -> MC -> WFA)
+        df_prepared_full_run = df_prepared_is
+        if df_prepared_full_run is None or df_prepared_full_run.empty:
+            print("Data for Full Run (Type 1) is empty after preparation. Aborting.")
+            return
 
-            if pareto_front_full_run_opt and len(pareto_front_full_run_opt) > 0:
-                mc_candidate_trials = pareto_front_full_run_opt[:3] # Use top 3 from Pareto for MC
-                mc_results_df_full_run = monte_carlo(df_prepared_full_run, mc_candidate_trials)
-                
-                initial_params_for_wfa = None 
-                
-                if mc_results_df_full_run is not None and not mc_results_df_full_run.empty:
-                    if 'p_values' in mc_results_df_full_run.columns and \
-                       mc_results_df_full_run['p_values'].apply(lambda x: isinstance(x, dict)).all() and \
-                       'params' in mc_results_df_full_run.columns:
-                        
-                        mc_results_df_full_run['p_value_sum'] = mc_results_df_full_run['p_values'].apply(
-                            lambda p_dict: sum(val for val in p_dict.values() if pd.notna(val))
-                        )
-                        best_idx_loc_mc = mc_results_df_full_run['p_value_sum'].idxmin()
-                        best_row_mc = mc_results_df_full_run.loc[best_idx_loc_mc]
-                        best_params_from_mc_dict = best_row_mc['params'] 
-                        
-                        is_significant_p_lt_0_10 = any(p < 0.10 for p in best_row_mc['p_values'].values() if pd.notna(p))
-                        is_marginally_significant_p_lt_0_20 = any(0.10 <= p < 0.20 for p in best_row_mc['p_values'].values() if pd.notna(p))
-
-                        if is_significant_p_lt_0_10:
-                            print("\n✓ Found statistically significant (p < 0.10) parameter set from Monte Carlo for Full Run. Using for WFA.")
-                            initial_params_for_wfa = best_params_from_mc_dict.copy()
-                        elif is_marginally_significant_p_lt_0_20:
-                            print("\n~ Found marginally significant (0.10 <= p < 0.20) parameter set from MC for Full Run. Using for WFA.")
-                            initial_params_for_wfa = best_params_from_mc_dict.copy()
-                        else:
-                            print("⚠ No statistically significant (p < 0.10) or marginally significant (p < 0.20) parameters from MC.")
-                            # initial_params_for_wfa remains None, will trigger fallback
+        pareto_front_full_run_opt = _get_pareto(df_prepared_full_run, "the Full Run")
+
+        if pareto_front_full_run_opt and len(pareto_front_full_run_opt) > 0:
+            mc_candidate_trials = pareto_front_full_run_opt[:3] # Use top 3 from Pareto for MC
+            mc_results_df_full_run = monte_carlo(df_prepared_full_run, mc_candidate_trials)
+            
+            initial_params_for_wfa = None 
+            
+            if mc_results_df_full_run is not None and not mc_results_df_full_run.empty:
+                if 'p_values' in mc_results_df_full_run.columns and 'params' in mc_results_df_full_run.columns:
+                    best_params_from_mc_dict, is_significant_p_lt_0_10, is_marginally_significant_p_lt_0_20 = \
+                        _select_best_mc(mc_results_df_full_run)
+
+                    if is_significant_p_lt_0_10:
+                        print("\n✓ Found statistically significant (p < 0.10) parameter set from Monte Carlo for Full Run. Using for WFA.")
+                        initial_params_for_wfa = best_params_from_mc_dict.copy()
+                    elif is_marginally_significant_p_lt_0_20:
+                        print("\n~ Found marginally significant (0.10 <= p < 0.20) parameter set from MC for Full Run. Using for WFA.")
+                        initial_params_for_wfa = best_params_from_mc_dict.copy()
                     else:
-                        print("Error in MC results format for Full Run. 'p_values' or 'params' column missing/invalid.")
+                        print("⚠ No statistically significant (p < 0.10) or marginally significant (p < 0.20) parameters from MC.")
+                        # initial_params_for_wfa remains None, will trigger fallback
                 else:
-                    print("Monte Carlo analysis for Full Run did not yield results.")
-
-                # Fallback logic
-                if initial_params_for_wfa is None: # True if MC failed, or was not significant enough
-                    print("Falling back to best parameters from initial optimization for WFA.")
-                    if pareto_front_full_run_opt: # Ensure Optuna results exist
-                        best_optuna_trial_for_wfa = pareto_front_full_run_opt[0]
-                        initial_params_for_wfa = best_optuna_trial_for_wfa.params.copy()
-                    else: # This case should ideally not be reached if OPTIMIZATION=False (MockTrial)
-                          # or if Optuna itself failed to produce a front.
-                        print("Initial optimization also yielded no parameters. Cannot proceed with WFA.")
-                
-                # Common type conversion block and WFA execution
-                if initial_params_for_wfa:
-                    # Ensure correct types for main strategy parameters
-                    if 'long_risk' in initial_params_for_wfa:
-                        initial_params_for_wfa['long_risk'] = float(initial_params_for_wfa['long_risk'])
-                    if 'max_open_positions' in initial_params_for_wfa:
-                        initial_params_for_wfa['max_open_positions'] = int(initial_params_for_wfa['max_open_positions'])
-                    if 'adx_threshold' in initial_params_for_wfa:
-                        initial_params_for_wfa['adx_threshold'] = float(initial_params_for_wfa['adx_threshold'])
-                    if 'max_position_duration' in initial_params_for_wfa:
-                        initial_params_for_wfa['max_position_duration'] = int(initial_params_for_wfa['max_position_duration'])
-
-                    print("\nProceeding to Walk-Forward Analysis for Full Run...")
-                    wfa_summary_full_run = walk_forward_analysis(IS, OOS, initial_params_for_wfa)
-                    if wfa_summary_full_run:
-                        print("\nFull Run Walk-Forward Analysis completed.")
-                    else:
-                        print("\nFull Run Walk-Forward Analysis failed or produced no results.")
+                    print("Error in MC results format for Full Run. 'p_values' or 'params' column missing/invalid.")
+            else:
+                print("Monte Carlo analysis for Full Run did not yield results.")
+
+            # Fallback logic
+            if initial_params_for_wfa is None: # True if MC failed, or was not significant enough
+                print("Falling back to best parameters from initial optimization for WFA.")
+                if pareto_front_full_run_opt: # Ensure Optuna results exist
+                    best_optuna_trial_for_wfa = pareto_front_full_run_opt[0]
+                    initial_params_for_wfa = best_optuna_trial_for_wfa.params.copy()
+                else: # This case should ideally not be reached if OPTIMIZATION=False (MockTrial)
+                      # or if Optuna itself failed to produce a front.
+                    print("Initial optimization also yielded no parameters. Cannot proceed with WFA.")
+            
+            # Common WFA execution
+            if initial_params_for_wfa:
+                print("\nProceeding to Walk-Forward Analysis for Full Run...")
+                wfa_summary_full_run = walk_forward_analysis(IS, OOS, initial_params_for_wfa)
+                if wfa_summary_full_run:
+                    print("\nFull Run Walk-Forward Analysis completed.")
                 else:
-                    print("Could not determine initial parameters for WFA for Full Run.")
-            else: # Optuna part failed or yielded no results
-                if OPTIMIZATION:
-                    print("Initial optimization for Full Run did not yield results.")
-                else: 
-                    print("Could not proceed with Full Run using default parameters (initial parameter setup failed).")
-        
-        # -------------------------------------------------------------------------------------------------------------------
-    except Exception as e:
-        print(f"Error in main function: {e}")
-        traceback.print_exc()
-        return None
+                    print("\nFull Run Walk-Forward Analysis failed or produced no results.")
+            else:
+                print("Could not determine initial parameters for WFA for Full Run.")
+        else: # Optuna part failed or yielded no results
+            if OPTIMIZATION:
+                print("Initial optimization for Full Run did not yield results.")
+            else: 
+                print("Could not proceed with Full Run using default parameters (initial parameter setup failed).")
+    
+    # -------------------------------------------------------------------------------------------------------------------
 # -------------------------------------------------------------------------------------------------------------------------
 if __name__ == "__main__":
+    # The walk-forward report is logged at INFO; print it plainly to stdout like the rest of the output
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
     main()
\ No newline at end of file
@@ -0,0 +1,246 @@
+import numpy as np
+from numba import njit, prange
+#==========================================================================================================================
+#================== NUMBA INDICATOR KERNELS ===============================================================================
+#==========================================================================================================================
+# Single-pass indicator kernels used by prepare_data (Wilder smoothing replaces pandas_ta).
+# Inputs are 1-D numpy arrays, outputs are float64 arrays with NaN during the warm-up period.
+
+@njit(cache=True, fastmath=True)
+def rsi_wilder(close, n):
+    """Relative Strength Index with Wilder smoothing"""
+    size = close.shape[0]
+    out = np.full(size, np.nan)
+    if size <= n:
+        return out
+
+    # Seed average gain/loss with a simple mean of the first n changes
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, n + 1):
+        change = close[i] - close[i - 1]
+        if change > 0:
+            avg_gain += change
+        else:
+            avg_loss -= change
+    avg_gain /= n
+    avg_loss /= n
+    out[n] = 100.0 if avg_loss == 0 else 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+    for i in range(n + 1, size):
+        change = close[i] - close[i - 1]
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+        avg_gain = (avg_gain * (n - 1) + gain) / n
+        avg_loss = (avg_loss * (n - 1) + loss) / n
+        out[i] = 100.0 if avg_loss == 0 else 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return out
+# --------------------------------------------------------------------------------------------------------------------------
+@njit(cache=True, fastmath=True)
+def atr_wilder(high, low, close, n):
+    """Average True Range with Wilder smoothing"""
+    size = close.shape[0]
+    out = np.full(size, np.nan)
+    if size < n:
+        return out
+
+    atr = 0.0
+    for i in range(size):
+        if i == 0:
+            tr = high[0] - low[0]
+        else:
+            tr = max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+
+        if i < n - 1:
+            atr += tr
+        elif i == n - 1:
+            atr = (atr + tr) / n
+            out[i] = atr
+        else:
+            atr = (atr * (n - 1) + tr) / n
+            out[i] = atr
+    return out
+# --------------------------------------------------------------------------------------------------------------------------
+@njit(cache=True, fastmath=True)
+def adx_wilder(high, low, close, n):
+    """Average Directional Index with Wilder smoothing (returns the ADX line only)"""
+    size = close.shape[0]
+    out = np.full(size, np.nan)
+    if size < 2 * n:
+        return out
+
+    tr_s = 0.0
+    plus_dm_s = 0.0
+    minus_dm_s = 0.0
+    dx_sum = 0.0
+    adx = 0.0
+    for i in range(1, size):
+        up_move = high[i] - high[i - 1]
+        down_move = low[i - 1] - low[i]
+        plus_dm = up_move if (up_move > down_move and up_move > 0) else 0.0
+        minus_dm = down_move if (down_move > up_move and down_move > 0) else 0.0
+        tr = max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+
+        # Wilder sums over the first n bars, then recursive smoothing
+        if i <= n:
+            tr_s += tr
+            plus_dm_s += plus_dm
+            minus_dm_s += minus_dm
+            if i < n:
+                continue
+        else:
+            tr_s = tr_s - tr_s / n + tr
+            plus_dm_s = plus_dm_s - plus_dm_s / n + plus_dm
+            minus_dm_s = minus_dm_s - minus_dm_s / n + minus_dm
+
+        plus_di = 100.0 * plus_dm_s / tr_s if tr_s > 0 else 0.0
+        minus_di = 100.0 * minus_dm_s / tr_s if tr_s > 0 else 0.0
+        di_sum = plus_di + minus_di
+        dx = 100.0 * abs(plus_di - minus_di) / di_sum if di_sum > 0 else 0.0
+
+        # ADX is the Wilder average of DX, seeded with the mean of the first n DX values
+        if i < 2 * n - 1:
+            dx_sum += dx
+        elif i == 2 * n - 1:
+            adx = (dx_sum + dx) / n
+            out[i] = adx
+        else:
+            adx = (adx * (n - 1) + dx) / n
+            out[i] = adx
+    return out
+# --------------------------------------------------------------------------------------------------------------------------
+@njit(cache=True, fastmath=True)
+def bbands(close, n, k):
+    """Bollinger Bands (population std), returns (upper, lower)"""
+    size = close.shape[0]
+    upper = np.full(size, np.nan)
+    lower = np.full(size, np.nan)
+    if size < n:
+        return upper, lower
+
+    # Running sum and sum of squares over the window
+    s = 0.0
+    sq = 0.0
+    for i in range(size):
+        x = close[i]
+        s += x
+        sq += x * x
+        if i >= n:
+            old = close[i - n]
+            s -= old
+            sq -= old * old
+        if i >= n - 1:
+            mean = s / n
+            var = sq / n - mean * mean
+            std = np.sqrt(var) if var > 0 else 0.0
+            upper[i] = mean + k * std
+            lower[i] = mean - k * std
+    return upper, lower
+# --------------------------------------------------------------------------------------------------------------------------
+@njit(cache=True, fastmath=True)
+def rolling_means(close, vol, vix, fast, slow, vol_n, vix_n):
+    """Fused rolling means (min_periods=1) of Close (fast/slow), Volume and VIX in one pass"""
+    size = close.shape[0]
+    ma_f = np.empty(size)
+    ma_s = np.empty(size)
+    vol_ma = np.empty(size)
+    vix_ma = np.empty(size)
+
+    # Running sums: add the new value, subtract the one leaving the window
+    s_f = 0.0
+    s_s = 0.0
+    s_v = 0.0
+    s_x = 0.0
+    for i in range(size):
+        c = close[i]
+        s_f += c
+        s_s += c
+        s_v += vol[i]
+        s_x += vix[i]
+        if i >= fast:
+            s_f -= close[i - fast]
+        if i >= slow:
+            s_s -= close[i - slow]
+        if i >= vol_n:
+            s_v -= vol[i - vol_n]
+        if i >= vix_n:
+            s_x -= vix[i - vix_n]
+        ma_f[i] = s_f / min(i + 1, fast)
+        ma_s[i] = s_s / min(i + 1, slow)
+        vol_ma[i] = s_v / min(i + 1, vol_n)
+        vix_ma[i] = s_x / min(i + 1, vix_n)
+    return ma_f, ma_s, vol_ma, vix_ma
+# --------------------------------------------------------------------------------------------------------------------------
+@njit(cache=True)
+def weekly_ma(close, week_id, period):
+    """Rolling mean of completed weekly closes (min_periods=1), forward-filled onto the daily rows"""
+    size = close.shape[0]
+    out = np.zeros(size, dtype=np.float32)
+    buffer = np.zeros(period)  # Circular buffer of the last `period` weekly closes
+    count = 0
+    head = 0
+    running_sum = 0.0
+    current_ma = 0.0  # 0 until the first week completes (matches the old fillna(0))
+
+    for i in range(size):
+        # New week: push the previous day's close (last close of the completed week)
+        if i > 0 and week_id[i] != week_id[i - 1]:
+            if count == period:
+                running_sum -= buffer[head]
+            else:
+                count += 1
+            buffer[head] = close[i - 1]
+            running_sum += close[i - 1]
+            head = (head + 1) % period
+            current_ma = running_sum / count
+        out[i] = current_ma
+    return out
+# --------------------------------------------------------------------------------------------------------------------------
+@njit(cache=True, nogil=True)
+def rolling_rank_pct(values, window):
+    """Rolling percentile rank of each value within its trailing window (min_periods=1, average ties, NaN -> 0.5).
+    Keeps the window sorted so each step is a binary search plus one insert/remove instead of a full re-rank."""
+    size = values.shape[0]
+    out = np.empty(size)
+    window_sorted = np.empty(window)  # Sorted non-NaN values currently in the window
+    count = 0
+
+    for i in range(size):
+        # Drop the value leaving the window
+        if i >= window:
+            old = values[i - window]
+            if not np.isnan(old):
+                pos = np.searchsorted(window_sorted[:count], old)
+                for j in range(pos, count - 1):
+                    window_sorted[j] = window_sorted[j + 1]
+                count -= 1
+
+        x = values[i]
+        if np.isnan(x):
+            out[i] = 0.5
+            continue
+
+        # Insert the new value, then rank it against the window
+        pos = np.searchsorted(window_sorted[:count], x)
+        for j in range(count, pos, -1):
+            window_sorted[j] = window_sorted[j - 1]
+        window_sorted[pos] = x
+        count += 1
+
+        below = np.searchsorted(window_sorted[:count], x)
+        equal = np.searchsorted(window_sorted[:count], x, side='right') - below
+        out[i] = (below + (equal + 1) / 2.0) / count
+    return out
+# --------------------------------------------------------------------------------------------------------------------------
+@njit(parallel=True, cache=True)
+def rolling_rank_pct_batch(values, window):
+    """rolling_rank_pct over every (sample, column) series of an (n_samples, size, n_columns) array, e.g. the
+    feature columns of all bootstrap samples at once. The flat task index covers samples and columns together.
+    Returns an (n_columns, n_samples, size) array so each column's batch is contiguous."""
+    n_samples, size, n_columns = values.shape
+    out = np.empty((n_columns, n_samples, size))
+    for task in prange(n_samples * n_columns):
+        s = task // n_columns
+        j = task % n_columns
+        out[j, s] = rolling_rank_pct(values[s, :, j], window)
+    return out